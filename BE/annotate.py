@@ -0,0 +1,47 @@
+# Annotate - Class colours and the boxes/labels drawn on processed videos
+# Kept free of Flask, the database and the model, so video segment worker processes
+# (video_segments.py) can import it without loading the web app.
+
+import cv2
+
+
+def get_color_for_class(class_name):
+    """Get BGR color for detection class (consistent colors for all detection modes)"""
+    if class_name == "Drowsiness":
+        return (0, 0, 255)  # Red (BGR format)
+    elif class_name == "yawn":
+        return (0, 255, 255)  # Yellow (BGR format)
+    elif class_name == "awake":
+        return (0, 255, 0)  # Green (BGR format)
+    else:
+        return (255, 255, 255)  # White default
+
+
+def draw_detections(frame, frame_detections):
+    """Draw boxes and labels of one video frame in place (annotate stage of the video pipeline)"""
+    for detection in frame_detections.to_list():
+        class_name = detection['class']
+        confidence = detection['confidence']
+
+        # Draw detection box on frame
+        x1, y1, x2, y2 = map(int, detection['bbox'])
+        color = get_color_for_class(class_name)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 3)
+
+        # Add background for text
+        label = f"{class_name}: {confidence:.2f}"
+        label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0]
+
+        # Ensure label is within frame
+        label_y = max(20, y1 - 5)  # Keep label at least 5px from top
+        label_y = min(frame.shape[0] - 10, label_y)  # Keep label within bottom
+
+        # Draw background for label
+        cv2.rectangle(frame,
+                      (x1, label_y - label_size[1] - 10),
+                      (x1 + label_size[0], label_y + 5),
+                      color, -1)
+
+        # Draw text
+        cv2.putText(frame, label, (x1, label_y),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
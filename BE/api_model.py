@@ -14,9 +14,23 @@ from datetime import datetime
 import tempfile
 from PIL import Image
 import io
-from ultralytics import YOLO
+import json
+import socketserver
+import threading
 from sqlalchemy.orm import sessionmaker
 from database import engine, DetectionSession, DetectionResult, UploadedFile
+from config import Config
+from inference_client import (OP_DETECT, OP_DETECT_BATCH, OP_NAMES, OP_STATS, STATUS_OK, STATUS_ERROR,
+                              REQUEST_HEADER, BATCH_HEADER, pack_batch, recv_exact, recv_into_exact,
+                              result_to_array, send_response)
+from micro_batcher import MicroBatcher, yolo_batch_inference
+from model_backends import load_model, supports_batching, supports_imgsz
+from detection_engine import DetectionEngine
+from frame_sampler import video_sampler
+from annotate import get_color_for_class
+from video_segments import process_video
+from model_manager import ModelManager, parse_shapes, warm_up
+from model_registry import ModelRegistry, watch_registry
 
 app = Flask(__name__)
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-in-production')
@@ -35,28 +49,25 @@ os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
 # Database session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Load YOLO model
-MODEL_PATH = os.path.join("model", "best.pt")
+# Load YOLO model (same weights as app.py: the registry's ACTIVE version, else model/best.pt)
+MODEL_PATH = Config.MODEL_PATH
+model_registry = ModelRegistry()
+model_version = model_registry.active_version()
 try:
-    model = YOLO(MODEL_PATH)
-    print(f"YOLO model loaded successfully from {MODEL_PATH}")
+    weights_path = model_registry.weights_path(model_version) if model_version else MODEL_PATH
+    model, model_backend = load_model(weights_path, Config.INFERENCE_BACKEND)
+    print(f"YOLO model loaded successfully from {weights_path} ({model_backend} backend)")
 except Exception as e:
     print(f"Warning: Could not load YOLO model from {MODEL_PATH}: {e}")
     model = None
+    model_backend = None
+
+# Shared detection engine (same class map, threshold and post-processing as app.py)
+# Not 'engine': that name is the SQLAlchemy engine from database
+detection_engine = DetectionEngine(model) if model is not None else None
 
 # Detection class names
-CLASS_NAMES = ["Drowsiness", "awake", "yawn"]
-
-def get_color_for_class(class_name):
-    """Get BGR color for detection class (consistent colors for all detection modes)"""
-    if class_name == "Drowsiness":
-        return (0, 0, 255)  # Red (BGR format)
-    elif class_name == "yawn":
-        return (0, 255, 255)  # Yellow (BGR format)
-    elif class_name == "awake":
-        return (0, 255, 0)  # Green (BGR format)
-    else:
-        return (255, 255, 255)  # White default
+CLASS_NAMES = [Config.DETECTION_CLASSES[i] for i in sorted(Config.DETECTION_CLASSES)]
 
 def detect_drowsiness(image):
     """
@@ -65,7 +76,7 @@ def detect_drowsiness(image):
     Uses: YOLO model from model/best.pt
     """
     try:
-        if model is None:
+        if detection_engine is None:
             # Fallback mock detection for testing
             import random
             detected_class = random.choice(CLASS_NAMES)
@@ -82,24 +93,15 @@ def detect_drowsiness(image):
                 'timestamp': datetime.utcnow()
             }
         
-        # Real YOLO inference
-        results = model(image)
-        
-        if results and len(results) > 0:
-            result = results[0]
-            if result.boxes is not None and len(result.boxes) > 0:
-                # Get the first detection
-                box = result.boxes[0]
-                class_id = int(box.cls)
-                confidence = float(box.conf)
-                bbox = box.xyxy[0].tolist()  # [x1, y1, x2, y2]
-                
-                return {
-                    'class': CLASS_NAMES[class_id],
-                    'confidence': confidence,
-                    'bbox': tuple(map(int, bbox)),
-                    'timestamp': datetime.utcnow()
-                }
+        # Real YOLO inference, most confident detection
+        detection = detection_engine.detect(image).best()
+        if detection:
+            return {
+                'class': detection['class'],
+                'confidence': detection['confidence'],
+                'bbox': tuple(map(int, detection['bbox'])),  # [x1, y1, x2, y2]
+                'timestamp': datetime.utcnow()
+            }
         
         # No detection found
         return {
@@ -402,48 +404,61 @@ def process_video_file(file_path, file_id):
         # Setup output video
         processed_filename = f"processed_{file_id}.mp4"
         processed_path = os.path.join(app.config['PROCESSED_FOLDER'], processed_filename)
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(processed_path, fourcc, fps, (width, height))
         
-        # Process video frames
-        frame_count = 0
+        # Process video frames with the shared sampling policy (VIDEO_SAMPLING)
         detection_results = []
         drowsiness_count = 0
         awake_count = 0
         yawn_count = 0
         
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
+        if detection_engine is not None:
+            cap.release()
             
-            # Process every 30th frame for performance
-            if frame_count % 30 == 0:
-                result = detect_drowsiness(frame)
+            def record(index, frame_detections, inferred):
+                # One result per inferred frame (most confident box), skipped frames are only drawn
+                nonlocal drowsiness_count, awake_count, yawn_count
+                if not inferred:
+                    return
+                detection = frame_detections.best()
+                result = {
+                    'class': detection['class'] if detection else 'awake',
+                    'confidence': detection['confidence'] if detection else 0.0,
+                    'bbox': tuple(map(int, detection['bbox'])) if detection else (0, 0, 100, 100),
+                    'timestamp': datetime.utcnow()
+                }
                 detection_results.append(result)
-                
-                # Count detections
                 if result['class'] == 'Drowsiness':
                     drowsiness_count += 1
                 elif result['class'] == 'awake':
                     awake_count += 1
                 elif result['class'] == 'yawn':
                     yawn_count += 1
-                
-                # Draw bounding box
-                if result['bbox']:
-                    x1, y1, x2, y2 = result['bbox']
-                    color = get_color_for_class(result['class'])
-                    
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                    cv2.putText(frame, f"{result['class']}: {result['confidence']:.2f}", 
-                               (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
             
-            out.write(frame)
-            frame_count += 1
-        
-        cap.release()
-        out.release()
+            # Long videos are split into segments across worker processes (VIDEO_SEGMENT_WORKERS)
+            weights_path = model_registry.weights_path(model_version) if model_version else MODEL_PATH
+            process_video(file_path, processed_path, detection_engine, weights_path, on_frame=record)
+        else:
+            # Mock detections on the sampled frames only
+            out = cv2.VideoWriter(processed_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+            sampler = video_sampler(fps)
+            frame_count = 0
+            while cap.isOpened():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if sampler.should_infer(frame_count, frame):
+                    result = detect_drowsiness(frame)
+                    detection_results.append(result)
+                    if result['class'] == 'Drowsiness':
+                        drowsiness_count += 1
+                    elif result['class'] == 'awake':
+                        awake_count += 1
+                    elif result['class'] == 'yawn':
+                        yawn_count += 1
+                out.write(frame)
+                frame_count += 1
+            cap.release()
+            out.release()
         
         return {
             'total_detections': len(detection_results),
@@ -485,9 +500,168 @@ def health_check():
         'status': 'healthy',
         'model_loaded': model is not None,
         'model_path': MODEL_PATH,
+        'backend': model_backend,
+        'model_version': model_version or Config.DEFAULT_MODEL_VERSION,
         'timestamp': datetime.utcnow().isoformat()
     }), 200
 
+# Shared inference server
+# Run with: python api_model.py --inference-server
+# gunicorn workers in app.py connect through inference_client.InferenceClient (INFERENCE_SOCKET)
+# Frames travel as raw bytes behind a fixed header, so no ndarray is ever pickled
+
+# ultralytics predictors are not safe to call from several threads at once
+inference_lock = threading.Lock()
+
+# Frames from concurrent worker connections are micro-batched into one forward pass
+frame_batcher = None
+
+def run_inference(frame, conf, imgsz=None):
+    """Run the model on one frame and return an (N, 6) float32 array of boxes"""
+    if not supports_imgsz(model_backend):
+        imgsz = None
+    if frame_batcher is not None:
+        return frame_batcher.infer(frame, conf, imgsz)
+    kwargs = {'imgsz': imgsz} if imgsz else {}
+    with inference_lock:
+        results = model(frame, conf=conf, verbose=False, **kwargs)
+    return result_to_array(results[0] if results else None)
+
+def run_batch_inference(frames, conf, imgsz=None):
+    """Run the model on a list of frames in one forward pass, one (N, 6) array per frame"""
+    if not supports_imgsz(model_backend):
+        imgsz = None
+    if frame_batcher is not None:
+        # Queued together, so they share a pass (with any live frames waiting) up to BATCH_MAX_SIZE
+        futures = [frame_batcher.submit(frame, conf, imgsz) for frame in frames]
+        return [future.result() for future in futures]
+    if not supports_batching(model_backend):
+        return [run_inference(frame, conf, imgsz) for frame in frames]
+    return yolo_batch_inference(model, inference_lock)(frames, conf, imgsz)
+
+def inference_server_stats():
+    """Metrics returned to clients for OP_STATS"""
+    stats = {
+        'model_loaded': model is not None,
+        'backend': model_backend,
+        'model_version': model_version or Config.DEFAULT_MODEL_VERSION,
+    }
+    if frame_batcher is not None:
+        stats['batching'] = frame_batcher.stats()
+    if hasattr(model, 'synthetic_stats'):
+        stats['synthetic'] = model.synthetic_stats()
+    if hasattr(model, 'preprocess_stats'):
+        stats['preprocess'] = model.preprocess_stats()
+    return stats
+
+class InferenceRequestHandler(socketserver.BaseRequestHandler):
+    """Serves detection requests from one worker connection until it disconnects"""
+
+    def handle(self):
+        conn = self.request
+        # Receive buffer is reused for every frame on this connection
+        frame_buffer = bytearray()
+        while True:
+            header = recv_exact(conn, REQUEST_HEADER.size)
+            if header is None:
+                return
+            op, height, width, channels, conf, imgsz = REQUEST_HEADER.unpack(header)
+            frame_size = height * width * channels
+
+            if op == OP_DETECT:
+                if len(frame_buffer) < frame_size:
+                    frame_buffer = bytearray(frame_size)
+                if not recv_into_exact(conn, memoryview(frame_buffer)[:frame_size]):
+                    return
+                frame = np.frombuffer(frame_buffer, dtype=np.uint8, count=frame_size)
+                frame = frame.reshape(height, width, channels)
+                if model is None:
+                    send_response(conn, STATUS_ERROR, b'Model not loaded')
+                    continue
+                try:
+                    boxes = run_inference(frame, conf, imgsz or None)
+                    send_response(conn, STATUS_OK, boxes.tobytes())
+                except Exception as e:
+                    print(f"Inference server error: {e}")
+                    send_response(conn, STATUS_ERROR, str(e).encode('utf-8'))
+            elif op == OP_DETECT_BATCH:
+                count_header = recv_exact(conn, BATCH_HEADER.size)
+                if count_header is None:
+                    return
+                count = BATCH_HEADER.unpack(count_header)[0]
+                batch_size = frame_size * count
+                if len(frame_buffer) < batch_size:
+                    frame_buffer = bytearray(batch_size)
+                if not recv_into_exact(conn, memoryview(frame_buffer)[:batch_size]):
+                    return
+                frames = np.frombuffer(frame_buffer, dtype=np.uint8, count=batch_size)
+                frames = list(frames.reshape(count, height, width, channels))
+                if model is None:
+                    send_response(conn, STATUS_ERROR, b'Model not loaded')
+                    continue
+                try:
+                    send_response(conn, STATUS_OK, pack_batch(run_batch_inference(frames, conf, imgsz or None)))
+                except Exception as e:
+                    print(f"Inference server error: {e}")
+                    send_response(conn, STATUS_ERROR, str(e).encode('utf-8'))
+            elif op == OP_NAMES:
+                names = model.names if model is not None else dict(enumerate(CLASS_NAMES))
+                send_response(conn, STATUS_OK, json.dumps(names).encode('utf-8'))
+            elif op == OP_STATS:
+                send_response(conn, STATUS_OK, json.dumps(inference_server_stats()).encode('utf-8'))
+            else:
+                send_response(conn, STATUS_ERROR, f'Unknown op {op}'.encode('utf-8'))
+                return
+
+class InferenceServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+def load_registry_model(version):
+    """ModelManager loader for hot-swaps to a registry version"""
+    weights_path = model_registry.weights_path(version) if version else MODEL_PATH
+    return load_model(weights_path, Config.INFERENCE_BACKEND)
+
+def publish_model(loaded_model, backend, version):
+    """Switch the served model (and its batcher) once the new version is warm"""
+    global model, model_backend, model_version, frame_batcher, detection_engine
+    new_batcher = None
+    if Config.BATCHING_ENABLED:
+        # Fixed-shape backends (torchscript, onnx-int8) only accept a batch of 1
+        max_batch_size = Config.BATCH_MAX_SIZE if supports_batching(backend) else 1
+        new_batcher = MicroBatcher(yolo_batch_inference(loaded_model, inference_lock),
+                                   max_batch_size=max_batch_size,
+                                   max_wait_ms=Config.BATCH_WINDOW_MS)
+        print(f"Micro-batching enabled: up to {max_batch_size} frames / {Config.BATCH_WINDOW_MS} ms")
+    # Taken under inference_lock so no forward pass runs while the globals change
+    with inference_lock:
+        old_batcher = frame_batcher
+        model, model_backend, model_version = loaded_model, backend, version
+        detection_engine = DetectionEngine(loaded_model)
+        frame_batcher = new_batcher
+    if old_batcher is not None:
+        threading.Timer(Config.MODEL_SWAP_GRACE_SECONDS, old_batcher.close).start()
+
+def run_inference_server(socket_path):
+    """Serve the loaded model on a Unix domain socket until interrupted"""
+    if model is not None:
+        # Warm up before the socket exists, so workers never see a cold model
+        print(f"Warm-up latency (ms): {warm_up(model, parse_shapes(Config.WARMUP_SHAPES))}")
+        publish_model(model, model_backend, model_version)
+        # Follow the registry's ACTIVE pointer; swaps load and warm in the background
+        manager = ModelManager(load_registry_model, on_ready=publish_model,
+                               warmup_shapes=parse_shapes(Config.WARMUP_SHAPES))
+        manager.adopt(model, model_backend, model_version)
+        watch_registry(model_registry, manager)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    with InferenceServer(socket_path, InferenceRequestHandler) as server:
+        print(f"Inference server listening on {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
@@ -498,5 +672,17 @@ def internal_error(error):
     return jsonify({'message': 'Internal server error'}), 500
 
 if __name__ == '__main__':
-    # Run the application
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DrowsyGuard model API')
+    parser.add_argument('--inference-server', action='store_true',
+                        help='Serve the model to app.py workers over a Unix socket instead of HTTP')
+    parser.add_argument('--socket', default=Config.INFERENCE_SOCKET or '/tmp/drowsyguard-inference.sock',
+                        help='Unix socket path for --inference-server')
+    args = parser.parse_args()
+
+    if args.inference_server:
+        run_inference_server(args.socket)
+    else:
+        # Run the application
+        app.run(debug=True, host='0.0.0.0', port=5000)
@@ -8,8 +8,6 @@ import sys
 from datetime import datetime, timedelta
 import uuid
 import cv2
-import numpy as np
-from ultralytics import YOLO
 from PIL import Image
 import json
 import base64
@@ -17,6 +15,7 @@ from collections import defaultdict, deque
 import threading
 import time
 import traceback
+import atexit
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -24,6 +23,12 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Import database models
 from database import *
 from sqlalchemy import func
+from config import Config
+from motion_gate import MotionGate
+from roi_tracker import RoiTracker
+from detection_engine import DetectionEngine
+from annotate import get_color_for_class
+from video_segments import process_video
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -48,7 +53,8 @@ CORS(app,
          r"/api/*": {
              "origins": ["http://localhost:8080", "http://127.0.0.1:8080"],
              "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
-             "allow_headers": ["Content-Type", "Authorization", "X-Requested-With", "Accept", "Origin"],
+             "allow_headers": ["Content-Type", "Authorization", "X-Requested-With", "Accept", "Origin",
+                               "X-Session-Id", "X-Frame-Seq"],
              "supports_credentials": True,
              "expose_headers": ["Content-Disposition", "X-Total-Count"],
              "max_age": 600  # Cache preflight request for 10 minutes
@@ -58,8 +64,9 @@ CORS(app,
 )
 
 # Detection Configuration
-app.config['DETECTION_CLASSES'] = {0: 'Normal', 1: 'Drowsiness', 2: 'yawn'}
-app.config['DEFAULT_CONFIDENCE_THRESHOLD'] = 0.5
+# One class map and threshold for every detection path (see detection_engine.py)
+app.config['DETECTION_CLASSES'] = Config.DETECTION_CLASSES
+app.config['DEFAULT_CONFIDENCE_THRESHOLD'] = Config.DETECTION_CONFIDENCE
 app.config['MIN_DETECTION_STABILITY'] = 0.5
 app.config['DETECTION_SMOOTHING_FRAMES'] = 3
 app.config['MIN_VOTES_REQUIRED'] = 2
@@ -77,49 +84,206 @@ CORS(app, origins=['http://localhost:8080', 'http://localhost:3000'], supports_c
 
 # Global variables
 model = None
+model_backend = None
 active_sessions = {}
 camera = None
 
 # Model path
 MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model', 'best.pt')
 
-# Load YOLO model
-try:
-    # Try loading with explicit task specification to avoid compatibility issues
-    model = YOLO(MODEL_PATH, task='detect')
-    print("Model loaded successfully")
-    print(f"Model classes: {model.names}")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    print("Attempting fallback model loading...")
+def load_detection_model(version=None):
+    """Load the YOLO model (a registry version or model/best.pt), returns (model, backend) or (None, None)"""
+    if Config.INFERENCE_SOCKET:
+        # Model is owned by the shared inference server (python api_model.py --inference-server),
+        # so this worker never imports torch or loads its own copy of the weights
+        from inference_client import InferenceClient
+        # The server only creates its socket once its model is loaded and warm
+        deadline = time.time() + Config.INFERENCE_SERVER_WAIT
+        while not os.path.exists(Config.INFERENCE_SOCKET) and time.time() < deadline:
+            time.sleep(0.5)
+        print(f"Using shared inference server at {Config.INFERENCE_SOCKET}")
+        return InferenceClient(Config.INFERENCE_SOCKET), 'inference-server'
+
+    weights_path = model_registry.weights_path(version) if version else MODEL_PATH
     try:
-        # Fallback: try loading with older ultralytics version compatibility
-        from ultralytics import YOLO
-        import torch
+        # Configured backend (onnx / openvino / torchscript) with fallback to best.pt
+        from model_backends import load_model
+        loaded_model, backend = load_model(weights_path, Config.INFERENCE_BACKEND)
+        print("Model loaded successfully")
+        print(f"Model classes: {loaded_model.names}")
+        return loaded_model, backend
+    except Exception as e:
+        print(f"Error loading model: {e}")
+        print("Attempting fallback model loading...")
+        try:
+            # Fallback: try loading with older ultralytics version compatibility
+            from ultralytics import YOLO
+            import torch
         
-        # Check if it's a custom trained model that needs specific handling
-        if MODEL_PATH.endswith('.pt'):
-            # Try direct torch loading first
-            try:
-                model = torch.load(MODEL_PATH, map_location='cpu')
-                print("Model loaded with torch.load")
-            except:
-                # Try YOLO with force_reload
-                model = YOLO(MODEL_PATH)
-                print("Model loaded with YOLO fallback")
-                print(f"Model classes: {model.names}")
+            # Check if it's a custom trained model that needs specific handling
+            if weights_path.endswith('.pt'):
+                # Try direct torch loading first
+                try:
+                    loaded_model = torch.load(weights_path, map_location='cpu')
+                    print("Model loaded with torch.load")
+                except:
+                    # Try YOLO with force_reload
+                    loaded_model = YOLO(weights_path)
+                    print("Model loaded with YOLO fallback")
+                    print(f"Model classes: {loaded_model.names}")
+            else:
+                loaded_model = YOLO(weights_path)
+                print("Model loaded with fallback method")
+                print(f"Model classes: {loaded_model.names}")
+            return loaded_model, 'pytorch'
+        except Exception as e2:
+            print(f"Fallback model loading also failed: {e2}")
+            return None, None
+
+def on_model_ready(loaded_model, backend, version):
+    """Publish a warmed-up model to the request handlers (initial load and hot-swaps)"""
+    global model, model_backend, detection_engine, frame_batcher, tier_engines
+    # Detection goes through detection_engine; with BATCHING_ENABLED, frames from concurrent sessions
+    # share one forward pass (the shared inference server batches on its own side)
+    batched_model = loaded_model
+    new_batcher = None
+    if Config.BATCHING_ENABLED and not Config.INFERENCE_SOCKET:
+        from micro_batcher import MicroBatcher, BatchedModel, yolo_batch_inference
+        from model_backends import supports_batching
+        # Fixed-shape backends (torchscript, onnx-int8) only accept a batch of 1
+        max_batch_size = Config.BATCH_MAX_SIZE if supports_batching(backend) else 1
+        new_batcher = MicroBatcher(yolo_batch_inference(loaded_model),
+                                   max_batch_size=max_batch_size,
+                                   max_wait_ms=Config.BATCH_WINDOW_MS)
+        batched_model = BatchedModel(loaded_model, new_batcher)
+        print(f"Micro-batching enabled: up to {max_batch_size} frames / {Config.BATCH_WINDOW_MS} ms")
+
+    # Lighter models used by the latency tier ladder are reloaded with every model (a registry
+    # promote can change them too), so no tier keeps serving the previous weights
+    new_tier_engines = {}
+    if Config.ADAPTIVE_TIERS_ENABLED and not Config.INFERENCE_SOCKET:
+        new_tier_engines = load_tier_models()
+
+    # Plain global assignments: requests already holding the previous model finish on it
+    old_batcher = frame_batcher
+    model_backend = backend
+    detection_engine = DetectionEngine(batched_model, names=loaded_model.names)
+    model = loaded_model
+    frame_batcher = new_batcher
+    tier_engines = new_tier_engines
+    if old_batcher is not None:
+        # Give in-flight frames time to drain from the previous batcher
+        threading.Timer(Config.MODEL_SWAP_GRACE_SECONDS, old_batcher.close).start()
+
+def serving_weights_path():
+    """Weights of the model this worker serves, loaded by video segment workers"""
+    return model_registry.weights_path(model_manager.version) if model_manager.version else MODEL_PATH
+
+def serving_model_version():
+    """Model version recorded with each DetectionResult"""
+    # With the shared inference server the server decides which version is live
+    version = getattr(model, 'model_version', None) if Config.INFERENCE_SOCKET else model_manager.version
+    return version or Config.DEFAULT_MODEL_VERSION
+
+# Not 'engine': that name is the SQLAlchemy engine from database
+detection_engine = None
+frame_batcher = None
+
+# Latency tiers: every live session steps down the imgsz / model ladder together under load
+from tier_controller import TierController, parse_ladder
+tier_controller = TierController(parse_ladder(Config.LATENCY_TIER_LADDER),
+                                 target_p95_ms=Config.LATENCY_TARGET_P95_MS,
+                                 max_queue_depth=Config.LATENCY_MAX_QUEUE_DEPTH,
+                                 cooldown=Config.LATENCY_TIER_COOLDOWN,
+                                 queue_depth=lambda: frame_batcher.queue_depth() if frame_batcher else 0)
+tier_engines = {}
+
+# Live frames are decoded at the smallest JPEG scale that still covers the tier's imgsz
+from frame_decoder import FrameDecoder, scale_bbox
+frame_decoder = FrameDecoder(backend=Config.FRAME_DECODER,
+                             max_dim=Config.FRAME_MAX_DIM,
+                             reduced_decode=Config.FRAME_REDUCED_DECODE)
+
+def load_tier_models():
+    """
+    Load the lighter model variants named in LATENCY_TIER_LADDER into a new {name: DetectionEngine}
+    (tiers that fail to load fall back to the main model)
+    """
+    from model_backends import load_model
+    engines = {}
+    for tier in tier_controller.tiers:
+        name = tier['model']
+        if not name or name in engines:
+            continue
+        if model_registry.exists(name):
+            weights_path = model_registry.weights_path(name)
         else:
-            model = YOLO(MODEL_PATH)
-            print("Model loaded with fallback method")
-            print(f"Model classes: {model.names}")
-    except Exception as e2:
-        print(f"Fallback model loading also failed: {e2}")
-        print("Server will continue without model - detection features disabled")
-        model = None
+            weights_path = os.path.join(os.path.dirname(MODEL_PATH), name if name.endswith('.pt') else f"{name}.pt")
+        try:
+            tier_model, _ = load_model(weights_path, Config.INFERENCE_BACKEND)
+            engines[name] = DetectionEngine(tier_model)
+            print(f"Loaded tier model {name} from {weights_path}")
+        except Exception as e:
+            print(f"Could not load tier model {name} ({weights_path}): {e}")
+    return engines
+
+def inference_imgsz(imgsz):
+    """imgsz to request from the model, None for backends exported at a fixed input size"""
+    from model_backends import supports_imgsz
+    return imgsz if supports_imgsz(model_backend) else None
+
+# Versioned weights (model/registry); ACTIVE picks the version, model/best.pt if empty
+from model_registry import ModelRegistry, watch_registry
+model_registry = ModelRegistry()
+
+# Load and warm up the model in the background so Flask can bind immediately;
+# detection endpoints answer 503 + Retry-After until model_manager.ready
+from model_manager import ModelManager, parse_shapes
+model_manager = ModelManager(load_detection_model,
+                             on_ready=on_model_ready,
+                             warmup_shapes=parse_shapes(Config.WARMUP_SHAPES),
+                             max_attempts=Config.MODEL_LOAD_ATTEMPTS)
+if Config.INFERENCE_SOCKET:
+    model_manager.start()
+else:
+    model_manager.start(model_registry.active_version())
+    # Follow ACTIVE so activating a version on one worker rolls it out to every worker
+    watch_registry(model_registry, model_manager)
+
+def model_unavailable_response():
+    """Fast 503 while the model is loading or warming up"""
+    status = model_manager.status()
+    response = jsonify({
+        'error': 'Model is not ready yet' if status['status'] != 'failed' else 'Model not loaded',
+        'model_status': status['status']
+    })
+    response.headers['Retry-After'] = str(Config.MODEL_RETRY_AFTER)
+    return response, 503
 
 # Initialize database
 init_db()
 
+# Queued upload analyses are drained by `python job_queue.py` processes; JOB_WORKER_ENABLED also
+# runs a job thread in every worker process (e.g. a single-process development server)
+from job_queue import JobWorker, analyze_video, enqueue, queue_stats
+from progress import progress_board
+job_worker = None
+if Config.JOB_QUEUE_ENABLED and Config.JOB_WORKER_ENABLED:
+    job_worker = JobWorker(lambda job, uploaded_file, progress: analyze_video(detection_engine,
+                                                                              serving_weights_path(),
+                                                                              uploaded_file, progress),
+                           session_factory=SessionLocal,
+                           ready=lambda: model_manager.ready,
+                           progress_board=progress_board()).start()
+
+# Live detection rows are buffered and written in batches (result_writer.py); whatever is
+# left is flushed when the worker exits
+from result_writer import ResultWriter
+result_writer = None
+if Config.RESULT_WRITE_BEHIND:
+    result_writer = ResultWriter(SessionLocal).start()
+    atexit.register(result_writer.stop)
+
 # Create upload directories
 os.makedirs('uploads', exist_ok=True)
 os.makedirs('uploads/detection', exist_ok=True)
@@ -714,14 +878,139 @@ def serve_owner_profile():
 
 @app.route('/api/model/health', methods=['GET'])
 def model_health():
-    """Check model health - DETECTION PAGE"""
-    return jsonify({
-        'status': 'healthy' if model else 'error',
-        'model_loaded': model is not None,
+    """Check model health - DETECTION PAGE (also the Railway healthcheck)"""
+    # status is 'loading', 'warming', 'ready' or 'failed'; only 'ready' answers 200
+    response = jsonify({
+        **model_manager.status(),
         'model_path': app.config['MODEL_PATH'],
         'classes': app.config['DETECTION_CLASSES']
+    })
+    if not model_manager.ready:
+        response.headers['Retry-After'] = str(Config.MODEL_RETRY_AFTER)
+        return response, 503
+    return response, 200
+
+def is_admin_user(user_id):
+    """Model administration is limited to Config.ADMIN_EMAILS"""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        return user is not None and user.email in Config.ADMIN_EMAILS
+    finally:
+        db.close()
+
+@app.route('/api/admin/models', methods=['GET'])
+@jwt_required()
+def list_model_versions():
+    """List registered model versions and the one this worker serves - ADMIN"""
+    if not is_admin_user(int(get_jwt_identity())):
+        return jsonify({'error': 'Admin access required'}), 403
+    return jsonify({
+        'versions': model_registry.list_versions(),
+        'active_version': model_registry.active_version(),
+        'serving': model_manager.status()
     }), 200
 
+@app.route('/api/admin/models/activate', methods=['POST'])
+@jwt_required()
+def activate_model_version():
+    """Load, warm and hot-swap a registered model version without a restart - ADMIN"""
+    if not is_admin_user(int(get_jwt_identity())):
+        return jsonify({'error': 'Admin access required'}), 403
+    data = request.get_json() or {}
+    version = data.get('version')
+    if not version or not model_registry.exists(version):
+        return jsonify({'error': f'Model version {version} is not registered'}), 404
+
+    # Other workers (and the shared inference server) pick this up through watch_registry
+    model_registry.set_active(version)
+    started = False
+    if not Config.INFERENCE_SOCKET and model_manager.ready and version != model_manager.version:
+        started = model_manager.swap(version)
+    print(f"Model version {version} activated (swap started on this worker: {started})")
+    return jsonify({
+        'message': f'Model version {version} is being rolled out',
+        'active_version': version,
+        'serving': model_manager.status()
+    }), 202
+
+@app.route('/api/admin/models/compare', methods=['GET'])
+@jwt_required()
+def compare_model_versions():
+    """Latency and detection statistics per model version, e.g. before/after a rollout - ADMIN"""
+    if not is_admin_user(int(get_jwt_identity())):
+        return jsonify({'error': 'Admin access required'}), 403
+    db = SessionLocal()
+    try:
+        query = db.query(
+            DetectionResult.model_version,
+            DetectionResult.detection_class,
+            func.count(DetectionResult.id),
+            func.avg(DetectionResult.confidence),
+            func.avg(DetectionResult.processing_time)
+        )
+        since = request.args.get('since')
+        if since:
+            query = query.filter(DetectionResult.timestamp >= datetime.fromisoformat(since))
+        rows = query.group_by(DetectionResult.model_version, DetectionResult.detection_class).all()
+
+        versions = {}
+        for version, detection_class, count, avg_confidence, avg_processing_time in rows:
+            entry = versions.setdefault(version or 'unknown', {'total': 0, 'processing_time_sum': 0.0, 'classes': {}})
+            entry['total'] += count
+            entry['processing_time_sum'] += (avg_processing_time or 0.0) * count
+            entry['classes'][detection_class] = {
+                'count': count,
+                'avg_confidence': round(avg_confidence or 0.0, 4)
+            }
+        for entry in versions.values():
+            entry['avg_processing_time_ms'] = round(entry.pop('processing_time_sum') / entry['total'], 2) if entry['total'] else None
+        return jsonify({'versions': versions}), 200
+    except ValueError:
+        return jsonify({'error': 'since must be an ISO date'}), 400
+    finally:
+        db.close()
+
+@app.route('/api/model/metrics', methods=['GET'])
+def model_metrics():
+    """Inference metrics for tuning throughput against latency"""
+    metrics = {}
+    if frame_batcher is not None:
+        metrics['batching'] = frame_batcher.stats()
+    if hasattr(model, 'stats'):
+        try:
+            metrics['inference_server'] = model.stats()
+        except Exception as e:
+            metrics['inference_server'] = {'error': str(e)}
+    if hasattr(model, 'synthetic_stats'):
+        metrics['synthetic'] = model.synthetic_stats()
+    if hasattr(model, 'preprocess_stats'):
+        metrics['preprocess'] = model.preprocess_stats()
+    # Per-session motion gate counters (skip ratio, CPU time saved); list() since sessions come and go
+    metrics['motion_gate'] = {
+        str(session_id): session_data['motion_gate'].stats()
+        for session_id, session_data in list(active_sessions.items())
+        if 'motion_gate' in session_data
+    }
+    metrics['latency_tiers'] = tier_controller.stats()
+    metrics['frame_decoder'] = frame_decoder.stats()
+    metrics['live_socket'] = channel_stats.stats() if live_sock is not None else None
+    metrics['frame_slot'] = slot_totals.stats() if Config.FRAME_SLOT_ENABLED else None
+    metrics['result_writer'] = result_writer.stats() if result_writer is not None else None
+    metrics['roi_tracking'] = {
+        str(session_id): session_data['roi_tracker'].stats()
+        for session_id, session_data in list(active_sessions.items())
+        if 'roi_tracker' in session_data
+    }
+    if Config.JOB_QUEUE_ENABLED:
+        db = SessionLocal()
+        try:
+            metrics['job_queue'] = {'jobs': queue_stats(db),
+                                    'worker': job_worker.stats() if job_worker is not None else None}
+        finally:
+            db.close()
+    return jsonify(metrics), 200
+
 @app.route('/api/detection/start-session', methods=['POST'])
 @jwt_required()
 def start_detection_session():
@@ -803,50 +1092,136 @@ def start_detection_session():
         if db:
             db.close()
 
-def get_color_for_class(class_name):
-    """Get BGR color for detection class (consistent colors for all detection modes)"""
-    if class_name == "Drowsiness":
-        return (0, 0, 255)  # Red (BGR format)
-    elif class_name == "yawn":
-        return (0, 255, 255)  # Yellow (BGR format)
-    elif class_name == "awake":
-        return (0, 255, 0)  # Green (BGR format)
-    else:
-        return (255, 255, 255)  # White default
+# Content types accepted by /api/detection/analyze-frame-binary
+BINARY_FRAME_TYPES = ('image/jpeg', 'image/webp')
 
 @app.route('/api/detection/analyze-frame', methods=['POST'])
 @jwt_required()
 def analyze_frame():
     """Analyze camera frame for drowsiness - DETECTION PAGE (Live Camera)"""
+    # Base64 data URL in a JSON body; kept for clients that do not send binary frames
+    if not model_manager.ready:
+        return model_unavailable_response()
+    data = request.get_json(silent=True) or {}
+    return analyze_latest_frame(data.get('session_id'), data.get('image_data'), seq=data.get('seq'))
+
+@app.route('/api/detection/analyze-frame-binary', methods=['POST'])
+@jwt_required()
+def analyze_frame_binary():
+    """
+    Analyze a raw image/jpeg or image/webp camera frame - DETECTION PAGE (Live Camera)
+    Session id and sequence number (or X-Frame-Timestamp, in ms) come in the X-Session-Id and
+    X-Frame-Seq headers; the body is read into a per-thread buffer and decoded from there,
+    without JSON or base64 in between
+    """
+    if not model_manager.ready:
+        return model_unavailable_response()
+    if request.mimetype not in BINARY_FRAME_TYPES:
+        return jsonify({'error': f"Content-Type must be one of {', '.join(BINARY_FRAME_TYPES)}"}), 415
+    length = request.content_length
+    if not length:
+        return jsonify({'error': 'No image data received'}), 400
+    if length > Config.FRAME_MAX_BYTES:
+        return jsonify({'error': 'Frame too large'}), 413
+    session_id = request.headers.get('X-Session-Id', type=int)
+    seq = request.headers.get('X-Frame-Seq', type=int)
+    if seq is None:
+        seq = request.headers.get('X-Frame-Timestamp', type=int)
+    frame_data = frame_decoder.read_body(request.stream, length)
+    if frame_data is None:
+        return jsonify({'error': 'Incomplete image data'}), 400
+    return analyze_latest_frame(session_id, frame_data, seq=seq)
+
+def analyze_latest_frame(session_id, frame_data, seq=None):
+    """
+    analyze_live_frame behind the session's latest-frame-wins slot (frame_slot.py): a frame that is
+    stale or superseded while waiting gets {'dropped': True} without being decoded or inferred
+    """
+    session_data = active_sessions.get(session_id)
+    if session_data is None or not Config.FRAME_SLOT_ENABLED:
+        return analyze_live_frame(session_id, frame_data, seq=seq)
+    slot = session_data.get('frame_slot')
+    if slot is None:
+        slot = session_data.setdefault('frame_slot', FrameSlot())
+    if not slot.acquire(seq):
+        return {'dropped': True, 'seq': seq, 'session_id': session_id, 'frame_slot': slot.stats()}, 200
+    try:
+        return analyze_live_frame(session_id, frame_data, seq=seq)
+    finally:
+        slot.release()
+
+# WebSocket channel for live sessions: authenticated once, then binary frames up and compact
+# results down (live_socket.py). Needs flask-sock and threaded gunicorn workers (railway.toml)
+from live_socket import LiveChannel, channel_stats, dumps
+from frame_slot import FrameSlot, slot_totals
+live_sock = None
+if Config.LIVE_SOCKET_ENABLED:
+    try:
+        from flask_sock import Sock
+        live_sock = Sock(app)
+    except ImportError:
+        print("flask-sock not installed, live WebSocket channel disabled (frames use HTTP)")
+
+def live_session_channel(ws):
+    """WebSocket /api/detection/live?token=<jwt>&session_id=<id> - DETECTION PAGE (Live Camera)"""
+    from flask_jwt_extended import decode_token
+
+    session_id = request.args.get('session_id', type=int)
+    try:
+        user_id = int(decode_token(request.args.get('token', ''))['sub'])
+    except Exception as e:
+        print(f"Invalid token for live socket: {e}")
+        ws.send(dumps({'type': 'error', 'error': 'Invalid token'}))
+        ws.close(1008)
+        return
+    session_data = active_sessions.get(session_id)
+    if session_data is None or session_data.get('user_id') != user_id:
+        ws.send(dumps({'type': 'error', 'error': 'Invalid session'}))
+        ws.close(1008)
+        return
+
+    def handle_frame(seq, frame_data):
+        if session_id not in active_sessions:
+            return {'stopped': True, 'message': 'Session stopped'}, 200
+        if not model_manager.ready:
+            return {'error': 'Model is not ready yet', 'model_status': model_manager.status()['status']}, 503
+        return analyze_latest_frame(session_id, frame_data, seq=seq)
+
+    channel = LiveChannel(ws, handle_frame)
+    print(f"Live socket opened for session {session_id} (user {user_id})")
+    ws.send(dumps({'type': 'ready', 'session_id': session_id}))
+    channel.run()
+    print(f"Live socket closed for session {session_id}")
+
+if live_sock is not None:
+    live_sock.route('/api/detection/live')(live_session_channel)
+
+def analyze_live_frame(session_id, frame_data, seq=None):
+    """
+    Shared body of the analyze-frame routes and the live WebSocket: frame_data is a base64 data URL
+    or raw image bytes. Returns (payload dict, HTTP status); callers check model_manager.ready first
+    """
     db = None
     try:
-        if not model:
-            return jsonify({'error': 'Model not loaded'}), 500
-        
-        user_id = int(get_jwt_identity())
-        data = request.get_json()
-        
-        session_id = data.get('session_id')
-        frame_data = data.get('image_data')
+        # Pin the engine for this request so a hot-swap mid-request cannot mix versions
+        current_engine = detection_engine
+        model_version = serving_model_version()
         
         if not session_id or session_id not in active_sessions:
-            return jsonify({'error': 'Invalid session'}), 400
+            return {'error': 'Invalid session'}, 400
             
         if not frame_data:
-            return jsonify({'error': 'No image data received'}), 400
+            return {'error': 'No image data received'}, 400
         
-        # Decode base64 image
-        import base64
-        image_data = base64.b64decode(frame_data.split(',')[1])
-        nparr = np.frombuffer(image_data, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        # Decode the image; frame_scale maps boxes on the (possibly reduced) frame back to the client's
+        frame, frame_scale = frame_decoder.decode(frame_data, target_size=tier_controller.tier['imgsz'])
         
         if frame is None:
-            return jsonify({'error': 'Failed to decode image'}), 400
+            return {'error': 'Failed to decode image'}, 400
         
         # If session was stopped after decode, abort immediately to avoid needless processing
         if session_id not in active_sessions:
-            return jsonify({'stopped': True, 'message': 'Session stopped'}), 200
+            return {'stopped': True, 'message': 'Session stopped'}, 200
         
         # Run YOLO detection (same as testing model)
         # Timing will be captured around the actual inference call below
@@ -854,7 +1229,7 @@ def analyze_frame():
         
         print(f"=== ANALYZE-FRAME DEBUG ===")
         print(f"Session ID: {session_id}")
-        print(f"Frame shape: {frame.shape}")
+        print(f"Frame shape: {frame.shape} (decode scale {frame_scale:.2f})")
         print(f"Processing time: {processing_time:.1f}ms")
         
         detections = []
@@ -862,7 +1237,7 @@ def analyze_frame():
         
         # Initialize session smoothing data
         if session_id not in active_sessions:
-            return jsonify({'error': 'Session not found. Please start a new session.'}), 400
+            return {'error': 'Session not found. Please start a new session.'}, 400
             
         session_data = active_sessions[session_id]
         if 'detection_history' not in session_data:
@@ -876,93 +1251,112 @@ def analyze_frame():
         current_detection = None
         best_confidence = 0.0
         
-        if model:
+        # Motion gate: while the frame barely differs from the last inferred one,
+        # reuse the previous detection instead of running YOLO again
+        gate = None
+        if Config.MOTION_GATE_ENABLED:
+            if 'motion_gate' not in session_data:
+                session_data['motion_gate'] = MotionGate(threshold=Config.MOTION_GATE_THRESHOLD,
+                                                         width=Config.MOTION_GATE_WIDTH,
+                                                         max_skip_frames=Config.MOTION_GATE_MAX_SKIP_FRAMES,
+                                                         max_skip_seconds=Config.MOTION_GATE_MAX_SKIP_SECONDS)
+            gate = session_data['motion_gate']
+        # ROI tracking: infer on a padded crop around the last face at a smaller imgsz
+        tracker = None
+        if Config.ROI_TRACKING_ENABLED:
+            if 'roi_tracker' not in session_data:
+                session_data['roi_tracker'] = RoiTracker(padding=Config.ROI_PADDING,
+                                                         imgsz=Config.ROI_IMGSZ,
+                                                         full_frame_interval=Config.ROI_FULL_FRAME_INTERVAL)
+            tracker = session_data['roi_tracker']
+        tier = tier_controller.tier
+        reused_detection = (gate is not None and current_engine is not None
+                            and not gate.should_infer(frame, cached=session_data['current_detection'] is not None))
+        
+        if reused_detection:
+            current_detection = dict(session_data['current_detection'])
+            best_confidence = current_detection['confidence']
+            print(f"Frame unchanged (score {gate.last_score:.2f}), reusing {current_detection['class']}")
+        elif current_engine is not None:
+            region = None
+            inference_ms = None
+            tier = tier_controller.begin() if Config.ADAPTIVE_TIERS_ENABLED else tier
+            tier_engine = tier_engines.get(tier['model'], current_engine) if tier['model'] else current_engine
             try:
+                # Filter by size (40 pixels of the frame the client sent, whatever the decode scale)
+                min_size = 40 / frame_scale
+                max_size = min(frame.shape[0], frame.shape[1]) * 0.8
                 start_time = time.time()
-                # Increased confidence threshold to 0.5 for better accuracy
-                results = model(frame, conf=0.5)
+                region = tracker.region(frame, frame_scale) if tracker is not None else None
+                if region is not None:
+                    # Crop boxes are mapped back to frame coordinates
+                    rx1, ry1, rx2, ry2 = region
+                    frame_detections = tier_engine.detect(frame[ry1:ry2, rx1:rx2], offset=(rx1, ry1),
+                                                          imgsz=inference_imgsz(min(tracker.imgsz, tier['imgsz'])),
+                                                          min_size=min_size, max_size=max_size)
+                else:
+                    frame_detections = tier_engine.detect(frame, imgsz=inference_imgsz(tier['imgsz']),
+                                                          min_size=min_size, max_size=max_size)
                 processing_time = (time.time() - start_time) * 1000
+                inference_ms = processing_time
+                if gate is not None:
+                    gate.record_inference(processing_time)
                 
-                if results and len(results) > 0:
-                    result = results[0]
-                    valid_detections = []
+                current_detection = frame_detections.best()
+                if current_detection:
+                    # Session state (history, cached detection, ROI box) stays in client coordinates,
+                    # so it is consistent when the tier changes the decode scale between frames
+                    current_detection['bbox'] = scale_bbox(current_detection['bbox'], frame_scale)
+                    best_confidence = current_detection['confidence']
                     
-                    if result.boxes is not None and len(result.boxes) > 0:
-                        # Process all detections first
-                        for i, box in enumerate(result.boxes):
-                            class_id = int(box.cls[0])
-                            confidence = float(box.conf[0])
-                            
-                            # Get class name from model
-                            if hasattr(model, 'names') and class_id in model.names:
-                                class_name = model.names[class_id]
-                            else:
-                                class_name = app.config['DETECTION_CLASSES'].get(class_id, f'Unknown_{class_id}')
-                            
-                            # Get bounding box
-                            bbox = box.xyxy[0].tolist()
-                            x1, y1, x2, y2 = map(int, bbox)
-                            
-                            # Filter by size
-                            min_size = 40  # pixels
-                            max_size = min(frame.shape[0], frame.shape[1]) * 0.8
-                            width = x2 - x1
-                            height = y2 - y1
-                            
-                            if (min_size <= width <= max_size and 
-                                min_size <= height <= max_size):
-                                valid_detections.append({
-                                    'class': class_name,
-                                    'confidence': confidence,
-                                    'bbox': bbox
-                                })
-                        
-                        # Sort by confidence and take top detection
-                        valid_detections.sort(key=lambda x: x['confidence'], reverse=True)
+                    print(f"Best detection: {current_detection['class']} ({best_confidence:.3f})")
+                    
+                    # Add smoothing using detection history
+                    session_data['detection_history'].append(current_detection)
+                    
+                    # Apply temporal smoothing if we have enough history
+                    if len(session_data['detection_history']) >= 3:
+                        # Get last 3 detections of same class
+                        same_class = [
+                            d for d in session_data['detection_history'] 
+                            if d['class'] == current_detection['class']
+                        ][-3:]
                         
-                        if valid_detections:
-                            current_detection = valid_detections[0]
-                            best_confidence = current_detection['confidence']
+                        if same_class:
+                            # Average bbox coordinates
+                            avg_bbox = [
+                                sum(d['bbox'][i] for d in same_class) / len(same_class)
+                                for i in range(4)
+                            ]
                             
-                            print(f"Best detection: {current_detection['class']} ({best_confidence:.3f})")
+                            # Apply smoothing (70% current, 30% history)
+                            current_bbox = current_detection['bbox']
+                            current_detection['bbox'] = [
+                                0.7 * current_bbox[i] + 0.3 * avg_bbox[i]
+                                for i in range(4)
+                            ]
                             
-                            # Add smoothing using detection history
-                            session_data['detection_history'].append(current_detection)
-                            
-                            # Apply temporal smoothing if we have enough history
-                            if len(session_data['detection_history']) >= 3:
-                                # Get last 3 detections of same class
-                                same_class = [
-                                    d for d in session_data['detection_history'] 
-                                    if d['class'] == current_detection['class']
-                                ][-3:]
-                                
-                                if same_class:
-                                    # Average bbox coordinates
-                                    avg_bbox = [
-                                        sum(d['bbox'][i] for d in same_class) / len(same_class)
-                                        for i in range(4)
-                                    ]
-                                    
-                                    # Apply smoothing (70% current, 30% history)
-                                    current_bbox = current_detection['bbox']
-                                    current_detection['bbox'] = [
-                                        0.7 * current_bbox[i] + 0.3 * avg_bbox[i]
-                                        for i in range(4)
-                                    ]
-                                    
-                                    # Ensure box is within frame
-                                    h, w = frame.shape[:2]
-                                    x1, y1, x2, y2 = map(int, current_detection['bbox'])
-                                    x1 = max(0, min(x1, w-1))
-                                    y1 = max(0, min(y1, h-1))
-                                    x2 = max(0, min(x2, w-1))
-                                    y2 = max(0, min(y2, h-1))
-                                    current_detection['bbox'] = [x1, y1, x2, y2]
+                            # Ensure box is within frame (client size)
+                            h, w = (round(v * frame_scale) for v in frame.shape[:2])
+                            x1, y1, x2, y2 = map(int, current_detection['bbox'])
+                            x1 = max(0, min(x1, w-1))
+                            y1 = max(0, min(y1, h-1))
+                            x2 = max(0, min(x2, w-1))
+                            y2 = max(0, min(y2, h-1))
+                            current_detection['bbox'] = [x1, y1, x2, y2]
+        
+                if tracker is not None:
+                    if current_detection:
+                        tracker.update(current_detection['bbox'])
+                    else:
+                        tracker.miss(region)
                         
             except Exception as e:
                 print(f"Detection error: {e}")
                 traceback.print_exc()
+            finally:
+                if Config.ADAPTIVE_TIERS_ENABLED:
+                    tier_controller.end(inference_ms)
         else:
             print("No YOLO results for frame")
         
@@ -984,8 +1378,8 @@ def analyze_frame():
         else:
             # Always show a detection box with valid bbox coordinates
             # Use center of frame for consistent display
-            frame_center_x = frame.shape[1] // 2
-            frame_center_y = frame.shape[0] // 2
+            frame_center_x = round(frame.shape[1] * frame_scale) // 2
+            frame_center_y = round(frame.shape[0] * frame_scale) // 2
             box_size = 100
             
             default_detection = {
@@ -995,12 +1389,12 @@ def analyze_frame():
                         frame_center_x + box_size, frame_center_y + box_size],
                 'color': get_color_for_class('awake')
             }
-            detections.append(default_detection)
+            detections.append(dict(default_detection))
             session_data['current_detection'] = default_detection
         
         # Update session tracking - check if session still exists
         if session_id not in active_sessions:
-            return jsonify({'error': 'Session not found or already stopped'}), 400
+            return {'error': 'Session not found or already stopped'}, 400
         
         session_data = active_sessions[session_id]
         
@@ -1014,23 +1408,29 @@ def analyze_frame():
                 should_save = current_streak >= app.config['DEFAULT_TRIGGER_TIME']
             
             if should_save:
-                db = SessionLocal()
-                try:
-                    detection_result = DetectionResult(
-                        session_id=session_id,
-                        detection_class=detection['class'],
-                        confidence=detection['confidence'],
-                        bbox_x1=detection['bbox'][0],
-                        bbox_y1=detection['bbox'][1],
-                        bbox_x2=detection['bbox'][2],
-                        bbox_y2=detection['bbox'][3],
-                        processing_time=processing_time
-                    )
-                    db.add(detection_result)
-                    db.commit()
-                finally:
-                    db.close()
-                    db = None
+                saved_bbox = detection['bbox']
+                row = {
+                    'session_id': session_id,
+                    'detection_class': detection['class'],
+                    'confidence': detection['confidence'],
+                    'bbox_x1': saved_bbox[0],
+                    'bbox_y1': saved_bbox[1],
+                    'bbox_x2': saved_bbox[2],
+                    'bbox_y2': saved_bbox[3],
+                    'processing_time': processing_time,
+                    'model_version': model_version
+                }
+                if result_writer is not None:
+                    # Batched with other frames' rows by the write-behind thread
+                    result_writer.add(row)
+                else:
+                    db = SessionLocal()
+                    try:
+                        db.add(DetectionResult(**row))
+                        db.commit()
+                    finally:
+                        db.close()
+                        db = None
         
         # Update detection counts
         if session_data.get('current_detection'):
@@ -1062,21 +1462,28 @@ def analyze_frame():
                 # Only count drowsiness when alarm is triggered (after 5+ consecutive detections)
 
         # Send back response
-        return jsonify({
+        return {
             'detections': detections,
             'drowsiness_detected': drowsiness_detected,
             'alarm_triggered': alarm_triggered,
             'processing_time': f"{processing_time:.1f}ms",
-            'session_id': session_id
-        }), 200
+            'model_version': model_version,
+            'reused_detection': reused_detection,
+            'motion_gate': gate.stats() if gate is not None else None,
+            'roi_tracking': tracker.stats() if tracker is not None else None,
+            'frame_slot': session_data['frame_slot'].stats() if 'frame_slot' in session_data else None,
+            'tier': tier['name'],
+            'session_id': session_id,
+            'seq': seq
+        }, 200
 
     except Exception as e:
         error_traceback = traceback.format_exc()
         print(f"--- ERROR IN /api/detection/analyze-frame ---\n{error_traceback}")
         # If session was removed due to an error, notify client
         if 'session_id' in locals() and session_id not in active_sessions:
-            return jsonify({'stopped': True, 'message': 'Session ended due to an error.'}), 200
-        return jsonify({'error': 'An internal error occurred while analyzing frame.'}), 500
+            return {'stopped': True, 'message': 'Session ended due to an error.'}, 200
+        return {'error': 'An internal error occurred while analyzing frame.'}, 500
     finally:
         if db:
             db.close()
@@ -1086,8 +1493,9 @@ def analyze_frame():
 def analyze_file():
     db = None  # Initialize db to None
     try:
-        if not model:
-            return jsonify({'error': 'Model not loaded'}), 500
+        if not model_manager.ready:
+            return model_unavailable_response()
+        current_engine = detection_engine
         
         user_id = int(get_jwt_identity())  # Convert back to int from string
         
@@ -1111,7 +1519,18 @@ def analyze_file():
         print(f"DEBUG: Raw filename from request: {file.filename}")  # Debug log
         print(f"DEBUG: Secured original_filename: {original_filename}")  # Debug log
         file_ext = original_filename.rsplit('.', 1)[1].lower()
-        saved_filename = f"detection_{current_user}.{file_ext}"
+        
+        # Determine file type
+        image_extensions = {'jpg', 'jpeg', 'png', 'gif', 'bmp'}
+        video_extensions = {'mp4', 'avi', 'mov', 'mkv'}
+        
+        is_video = file_ext in video_extensions
+        queued = is_video and Config.JOB_QUEUE_ENABLED
+        if queued:
+            # A queued video keeps its own file until a job worker has processed it
+            saved_filename = f"detection_{current_user}_{uuid.uuid4().hex[:12]}.{file_ext}"
+        else:
+            saved_filename = f"detection_{current_user}.{file_ext}"
         file_path = os.path.join(app.config['UPLOAD_FOLDER'], saved_filename)
         
         # Remove old file if exists (to replace, not accumulate)
@@ -1120,11 +1539,6 @@ def analyze_file():
         
         file.save(file_path)
         
-        # Determine file type
-        image_extensions = {'jpg', 'jpeg', 'png', 'gif', 'bmp'}
-        video_extensions = {'mp4', 'avi', 'mov', 'mkv'}
-        
-        is_video = file_ext in video_extensions
         if is_video:
             file_type = 'video'
         elif file_ext in image_extensions:
@@ -1132,6 +1546,44 @@ def analyze_file():
         else:
             return jsonify({'error': 'Unsupported file type'}), 400
         
+        if queued:
+            # Videos can outlive the request (and gunicorn's worker timeout): enqueue and return the job id
+            cap = cv2.VideoCapture(file_path)
+            valid = cap.isOpened() and cap.get(cv2.CAP_PROP_FPS) > 0 and int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) > 0
+            cap.release()
+            if not valid:
+                os.remove(file_path)
+                return jsonify({'error': 'Invalid video file or corrupted video'}), 400
+            db = SessionLocal()
+            try:
+                uploaded_file = UploadedFile(
+                    user_id=current_user,
+                    session_id=session_id,
+                    original_filename=original_filename,
+                    file_path=file_path,
+                    file_type=file_type,
+                    file_size=os.path.getsize(file_path),
+                    processing_status='pending'
+                )
+                db.add(uploaded_file)
+                db.flush()
+                job = enqueue(db, uploaded_file)
+                db.commit()
+                print(f"Queued analysis job {job.id} for {original_filename} (file {uploaded_file.id})")
+                return jsonify({
+                    'job_id': job.id,
+                    'status': job.status,
+                    'file_id': uploaded_file.id,
+                    'file_type': file_type,
+                    'original_filename': original_filename
+                }), 202
+            except Exception as db_error:
+                db.rollback()
+                print(f"Database error: {str(db_error)}")
+                raise db_error
+            finally:
+                db.close()
+        
         # Initialize counters for all file types
         total_detections = 0
         drowsiness_count = 0
@@ -1144,6 +1596,7 @@ def analyze_file():
         processed_media_path = None
         db_error = None
         video_error = None
+        video_summary = None
 
         if is_video:
             try:
@@ -1156,10 +1609,10 @@ def analyze_file():
                 fps = cap.get(cv2.CAP_PROP_FPS)
                 width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
                 height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+                cap.release()
                 
                 # Validate video properties
                 if fps <= 0 or width <= 0 or height <= 0:
-                    cap.release()
                     return jsonify({'error': 'Invalid video file or corrupted video'}), 400
                 
                 # Create temporary processed video file for download
@@ -1175,85 +1628,28 @@ def analyze_file():
                 if os.path.exists(temp_processed_path):
                     os.remove(temp_processed_path)
                     print(f"Removed old processed video: {temp_processed_path}")
-                fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                out = cv2.VideoWriter(temp_processed_path, fourcc, fps, (width, height))
                 
                 try:
-                    while True:
-                        ret, frame = cap.read()
-                        if not ret:
-                            break
-                        
-                        frame_count += 1
-                        processed_frame = frame.copy()
-                        
-                        # Run detection on frame (use same confidence threshold as other parts)
-                        results = model(frame, conf=app.config['DEFAULT_CONFIDENCE_THRESHOLD'])
-                        
-                        # Process detections - Add debug for every frame
-                        print(f"Frame {frame_count}: Processing...")
-                        if results and len(results) > 0:
-                            detections = results[0].boxes
-                            print(f"Frame {frame_count}: Found {len(detections) if detections is not None else 0} detections")
-                            if detections is not None and len(detections) > 0:
-                                # Process all valid detections
-                                for i in range(len(detections)):
-                                    confidence = float(detections.conf[i].cpu().numpy())
-
-                                    if confidence > app.config['DEFAULT_CONFIDENCE_THRESHOLD']:
-                                        class_id = int(detections.cls[i].cpu().numpy())
-                                        class_name = model.names[class_id]
-                                        bbox = detections.xyxy[i].cpu().numpy()
-
-                                        # Increment counts for each valid detection
-                                        total_detections += 1
-                                        if class_name == 'Drowsiness':
-                                            drowsiness_count += 1
-                                        elif class_name == 'yawn':
-                                            yawn_count += 1
-                                        elif class_name == 'awake':
-                                            awake_count += 1
-
-                                        # Draw detection box on frame
-                                        x1, y1, x2, y2 = map(int, bbox)
-                                        color = get_color_for_class(class_name)
-                                        cv2.rectangle(processed_frame, (x1, y1), (x2, y2), color, 3)
-                                        
-                                        # Add background for text
-                                        label = f"{class_name}: {confidence:.2f}"
-                                        label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0]
-                                        
-                                        # Ensure label is within frame
-                                        label_y = max(20, y1 - 5)  # Keep label at least 5px from top
-                                        label_y = min(processed_frame.shape[0] - 10, label_y)  # Keep label within bottom
-                                        
-                                        # Draw background for label
-                                        cv2.rectangle(processed_frame, 
-                                                    (x1, label_y - label_size[1] - 10), 
-                                                    (x1 + label_size[0], label_y + 5), 
-                                                    color, -1)
-                                        
-                                        # Draw text
-                                        cv2.putText(processed_frame, label, (x1, label_y), 
-                                                  cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-                                else:
-                                    print(f"Frame {frame_count}: No detections above confidence threshold")
-                            else:
-                                print(f"Frame {frame_count}: No detections found")
-                        
-                        # Write processed frame to output video
-                        out.write(processed_frame)
+                    # Decode, sampled batched inference and annotate+encode run as overlapping stages;
+                    # long videos are split into segments across worker processes (VIDEO_SEGMENT_WORKERS)
+                    summary = video_summary = process_video(file_path, temp_processed_path, current_engine,
+                                                            serving_weights_path())
+                    frame_count = summary['frames']
+                    total_detections += summary['total_detections']
+                    drowsiness_count += summary['counts'].get('Drowsiness', 0)
+                    yawn_count += summary['counts'].get('yawn', 0)
+                    awake_count += summary['counts'].get('awake', 0)
+                    stages = summary['stages']
+                    print(f"Video processed: {frame_count} frames ({summary['inferred_frames']} inferred, "
+                          f"{Config.VIDEO_SAMPLING} sampling, {summary.get('workers', 1)} worker(s)) in "
+                          f"{summary['wall_s']}s ({summary['fps']} fps, avg batch {summary['avg_batch']}) - "
+                          f"stage fps: decode {stages['decode']['fps']}, infer {stages['infer']['fps']}, "
+                          f"encode {stages['encode']['fps']}")
                         
                 except Exception as video_error:
                     print(f"Video processing error: {str(video_error)}")
                     # We will let the main exception handler deal with this
                     raise video_error
-                finally:
-                    # Release video resources
-                    if 'cap' in locals() and cap.isOpened():
-                        cap.release()
-                    if 'out' in locals() and out.isOpened():
-                        out.release()
             except Exception as e:
                 print(f"Error processing video: {str(e)}")
                 raise e
@@ -1264,42 +1660,33 @@ def analyze_file():
                 processed_img = img.copy()
                 
                 # Run detection on image (use same confidence threshold as other parts)
-                results = model(img, conf=app.config['DEFAULT_CONFIDENCE_THRESHOLD'])
+                frame_detections = current_engine.detect(img)
                 
                 # Process detections
-                if results and len(results) > 0:
-                    detections = results[0].boxes
-                    print(f"Found {len(detections) if detections is not None else 0} detections")
-                    if detections is not None and len(detections) > 0:
-                        for i in range(len(detections)):
-                            confidence = float(detections.conf[i].cpu().numpy())
-                            if confidence > app.config['DEFAULT_CONFIDENCE_THRESHOLD']:
-                                class_id = int(detections.cls[i].cpu().numpy())
-                                class_name = model.names[class_id]
-                                bbox = detections.xyxy[i].cpu().numpy()
-
-                                # Increment counts for each valid detection
-                                total_detections += 1
-                                if class_name == 'Drowsiness':
-                                    drowsiness_count += 1
-                                elif class_name == 'yawn':
-                                    yawn_count += 1
-                                elif class_name == 'awake':
-                                    awake_count += 1
-
-                                # Draw detection box on the image
-                                x1, y1, x2, y2 = map(int, bbox)
-                                color = get_color_for_class(class_name)
-                                cv2.rectangle(processed_img, (x1, y1), (x2, y2), color, 3)
-                                label = f"{class_name}: {confidence:.2f}"
-                                label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0]
-                                cv2.rectangle(processed_img, (x1, y1 - label_size[1] - 10), (x1 + label_size[0], y1), color, -1)
-                                cv2.putText(processed_img, label, (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-
-                        # After processing all detections, encode the image if detections were found
-                        if total_detections > 0:
-                            _, buffer = cv2.imencode('.jpg', processed_img)
-                            processed_image_base64 = base64.b64encode(buffer).decode('utf-8')
+                print(f"Found {len(frame_detections)} detections")
+                if len(frame_detections) > 0:
+                    counts = frame_detections.counts()
+                    total_detections += len(frame_detections)
+                    drowsiness_count += counts.get('Drowsiness', 0)
+                    yawn_count += counts.get('yawn', 0)
+                    awake_count += counts.get('awake', 0)
+
+                    for detection in frame_detections.to_list():
+                        class_name = detection['class']
+                        confidence = detection['confidence']
+
+                        # Draw detection box on the image
+                        x1, y1, x2, y2 = map(int, detection['bbox'])
+                        color = get_color_for_class(class_name)
+                        cv2.rectangle(processed_img, (x1, y1), (x2, y2), color, 3)
+                        label = f"{class_name}: {confidence:.2f}"
+                        label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0]
+                        cv2.rectangle(processed_img, (x1, y1 - label_size[1] - 10), (x1 + label_size[0], y1), color, -1)
+                        cv2.putText(processed_img, label, (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+
+                    # After processing all detections, encode the image if detections were found
+                    _, buffer = cv2.imencode('.jpg', processed_img)
+                    processed_image_base64 = base64.b64encode(buffer).decode('utf-8')
         
         # Save file record to database
         db = SessionLocal()
@@ -1348,6 +1735,10 @@ def analyze_file():
             if file_type == 'image' and processed_image_base64:
                 response_data['processed_image'] = f"data:image/jpeg;base64,{processed_image_base64}"
             
+            # Per-stage throughput of the video pipeline
+            if video_summary:
+                response_data['pipeline'] = video_summary
+            
             return jsonify(response_data), 200
             
         except Exception as db_error:
@@ -1364,6 +1755,108 @@ def analyze_file():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/detection/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_analysis_job(job_id):
+    """Status of a queued upload analysis, with the counts once completed - DETECTION PAGE"""
+    db = SessionLocal()
+    try:
+        user_id = int(get_jwt_identity())
+        job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id, AnalysisJob.user_id == user_id).first()
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(job.to_dict()), 200
+    except Exception as e:
+        print(f"Error getting job {job_id}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        db.close()
+
+def job_progress(job_id, user_id, db=None):
+    """
+    Live progress of a job from the shared progress board; jobs this node has not run yet (queued,
+    or running on another node) fall back to their database status. None when the job is unknown
+    """
+    progress = progress_board().read(job_id, user_id)
+    if progress is not None and progress['state'] == 'running':
+        return progress
+    own_db = db is None
+    db = db or SessionLocal()
+    try:
+        job = db.query(AnalysisJob).filter(AnalysisJob.id == job_id, AnalysisJob.user_id == user_id).first()
+        if not job:
+            return None
+        if progress is None or progress['state'] != job.status:
+            progress = {'job_id': job_id, 'state': job.status, 'frames_done': None, 'frames_total': None,
+                        'percent': 100.0 if job.status == 'completed' else None, 'fps': None,
+                        'eta_seconds': None, 'elapsed_seconds': None, 'updated_at': None}
+        if job.status in ('completed', 'failed'):
+            progress['job'] = job.to_dict()
+        return progress
+    finally:
+        if own_db:
+            db.close()
+
+@app.route('/api/detection/jobs/<int:job_id>/progress', methods=['GET'])
+@jwt_required()
+def get_analysis_job_progress(job_id):
+    """Frames processed, total frames, fps and ETA of a queued upload analysis - DETECTION PAGE"""
+    try:
+        progress = job_progress(job_id, int(get_jwt_identity()))
+        if progress is None:
+            return jsonify({'error': 'Job not found'}), 404
+        return jsonify(progress), 200
+    except Exception as e:
+        print(f"Error getting progress of job {job_id}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/detection/jobs/<int:job_id>/events', methods=['GET'])
+def stream_analysis_job_progress(job_id):
+    """
+    Server-Sent Events stream of a job's progress - DETECTION PAGE
+    EventSource cannot send headers, so the JWT comes as ?token= like the download endpoint.
+    Sends a 'progress' event whenever the frame count changes and a final 'done' event
+    """
+    from flask import stream_with_context
+    from flask_jwt_extended import decode_token
+
+    token = request.args.get('token')
+    if not token:
+        return jsonify({'error': 'Token required'}), 401
+    try:
+        user_id = int(decode_token(token)['sub'])
+    except Exception as e:
+        print(f"Invalid token for job events: {e}")
+        return jsonify({'error': 'Invalid token'}), 401
+    if job_progress(job_id, user_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def events():
+        deadline = time.time() + Config.PROGRESS_STREAM_SECONDS
+        last, last_sent = None, time.time()
+        while time.time() < deadline:
+            progress = job_progress(job_id, user_id)
+            if progress is None:
+                return
+            if progress['state'] in ('completed', 'failed'):
+                yield f"event: done\ndata: {json.dumps(progress)}\n\n"
+                return
+            key = (progress['state'], progress['frames_done'])
+            if key != last:
+                last, last_sent = key, time.time()
+                yield f"event: progress\ndata: {json.dumps(progress)}\n\n"
+            elif time.time() - last_sent > 15:
+                # Comment line keeps proxies from closing an idle stream
+                last_sent = time.time()
+                yield ": keep-alive\n\n"
+            time.sleep(Config.PROGRESS_INTERVAL)
+        # Stream ends after PROGRESS_STREAM_SECONDS; EventSource reconnects on its own
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/detection/stop-session/<int:session_id>', methods=['POST', 'OPTIONS'])
 @jwt_required()
 def stop_detection_session(session_id):
@@ -1401,6 +1894,10 @@ def stop_detection_session(session_id):
                 del active_sessions[sid]
                 print(f"Removed user's other active session {sid}")
 
+        # Buffered detection rows land before the session is finalised
+        if result_writer is not None:
+            result_writer.flush()
+
         db = SessionLocal()
         session = db.query(DetectionSession).filter(DetectionSession.id == session_id, DetectionSession.user_id == user_id).first()
         
@@ -1546,6 +2043,10 @@ def end_detection_session():
             del active_sessions[session_id]  # Now delete from active sessions
             print(f"Removed session {session_id} from active_sessions. Remaining: {list(active_sessions.keys())}")
         
+        # Buffered detection rows land before the session is finalised
+        if result_writer is not None:
+            result_writer.flush()
+
         # Update database and mark as interrupted
         db = SessionLocal()
         try:
@@ -0,0 +1,90 @@
+# Micro-benchmark: analyze_frame decode before frame_decoder.py vs FrameDecoder
+#
+# Usage:  python bench_decode.py [--sizes 640x480 1280x720 1920x1080] [--imgsz 640 320] [--repeats 50]
+#
+# Frames are synthetic camera-like JPEGs (gradients + noise, quality 80) sent as data URLs
+# (/api/detection/analyze-frame) and as raw bytes read from the request stream
+# (/api/detection/analyze-frame-binary, what FE/js/detection.js posts).
+
+import base64
+import io
+import time
+
+import cv2
+import numpy as np
+
+from frame_decoder import FrameDecoder
+
+
+def camera_frame(width, height, rng):
+    """Smooth background with a bright 'face' and sensor noise, so JPEG size is realistic"""
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    frame = np.empty((height, width, 3), dtype=np.float32)
+    frame[..., 0] = 80 + 60 * x / width
+    frame[..., 1] = 90 + 50 * y / height
+    frame[..., 2] = 110 + 30 * (x + y) / (width + height)
+    cv2.ellipse(frame, (width // 2, height // 2), (width // 8, height // 5), 0, 0, 360, (150, 170, 210), -1)
+    frame += rng.normal(0, 6, frame.shape)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def jpeg_bytes(frame):
+    ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
+    return buffer.tobytes()
+
+
+def data_url(jpeg):
+    return 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode('ascii')
+
+
+def binary_decode(decoder, jpeg, target_size):
+    """Binary route: body read into the decoder's per-thread buffer, decoded in place"""
+    body = decoder.read_body(io.BytesIO(jpeg), len(jpeg))
+    return decoder.decode(body, target_size=target_size)
+
+
+def baseline_decode(data):
+    """analyze_frame before frame_decoder.py"""
+    image_data = base64.b64decode(data.split(',')[1])
+    nparr = np.frombuffer(image_data, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+
+def time_ms(fn, repeats):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark live frame decoding')
+    parser.add_argument('--sizes', nargs='*', default=['640x480', '1280x720', '1920x1080'])
+    parser.add_argument('--imgsz', type=int, nargs='*', default=[640, 320])
+    parser.add_argument('--max-dim', type=int, default=1280)
+    parser.add_argument('--decoder', default='opencv', help="'opencv' or 'turbojpeg'")
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    decoder = FrameDecoder(backend=args.decoder, max_dim=args.max_dim)
+    print(f"{'source':>10} {'imgsz':>6} | {'baseline':>9} {'decoder':>9} {'binary':>9} {'speedup':>7} | "
+          f"decoded to (scale)   (ms per frame)")
+    for size in args.sizes:
+        width, height = (int(v) for v in size.split('x'))
+        jpeg = jpeg_bytes(camera_frame(width, height, rng))
+        data = data_url(jpeg)
+        baseline = time_ms(lambda: baseline_decode(data), args.repeats)
+        for imgsz in args.imgsz:
+            frame, scale = decoder.decode(data, target_size=imgsz)
+            # Decoded frame still covers the model input and maps back to the source size
+            assert max(frame.shape[:2]) >= min(imgsz, max(width, height))
+            assert abs(max(frame.shape[:2]) * scale - max(width, height)) <= scale
+            fast = time_ms(lambda: decoder.decode(data, target_size=imgsz), args.repeats)
+            binary = time_ms(lambda: binary_decode(decoder, jpeg, imgsz), args.repeats)
+            print(f"{size:>10} {imgsz:>6} | {baseline:>9.2f} {fast:>9.2f} {binary:>9.2f} {baseline / binary:>6.1f}x | "
+                  f"{frame.shape[1]}x{frame.shape[0]} ({scale:.2f})")
+        print(f"{'':>10} payload: {len(jpeg) / 1024:.0f} KB binary, {len(data) / 1024:.0f} KB as data URL")
@@ -0,0 +1,72 @@
+# Benchmark: per-call overhead of YOLO(frame) vs PreprocessedModel vs LeanPredictor
+#
+# Usage:  python bench_inference.py [--weights model/best.pt] [--shapes 480x640 200x160] [--batch 1 8]
+#
+# Needs ultralytics + torch and the weights. "forward" is the AutoBackend forward pass alone on
+# an already prepared tensor; "overhead" is what each path spends around it (pre-processing,
+# NMS, Results / array conversion). The YOLO path is the model(frame, conf=...) call app.py
+# made before preprocess.py / lean_predictor.py.
+
+import time
+
+import numpy as np
+
+from config import Config
+from lean_predictor import LeanPredictor
+from preprocess import PreprocessedModel, input_size
+from postprocess import boxes_array
+
+
+def median_ms(fn, repeats):
+    fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+if __name__ == '__main__':
+    import argparse
+
+    import torch
+    from ultralytics import YOLO
+
+    parser = argparse.ArgumentParser(description='Compare per-call inference overhead')
+    parser.add_argument('--weights', default=Config.MODEL_PATH)
+    parser.add_argument('--shapes', nargs='*', default=['480x640', '200x160'],
+                        help='Frame shapes (HxW); 200x160 is a typical ROI crop')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--batch', type=int, nargs='*', default=[1, 8])
+    parser.add_argument('--conf', type=float, default=Config.DETECTION_CONFIDENCE)
+    parser.add_argument('--repeats', type=int, default=30)
+    args = parser.parse_args()
+
+    yolo = YOLO(args.weights, task='detect')
+    preprocessed = PreprocessedModel(YOLO(args.weights, task='detect'), imgsz=args.imgsz)
+    lean = LeanPredictor(args.weights, imgsz=args.imgsz)
+    paths = {
+        'yolo': lambda frames: [boxes_array([r]) for r in yolo(frames, conf=args.conf, imgsz=args.imgsz, verbose=False)],
+        'preprocessed': lambda frames: [r.boxes.data for r in preprocessed(frames, conf=args.conf)],
+        'lean': lambda frames: lean.predict_arrays(frames, conf=args.conf),
+    }
+
+    rng = np.random.default_rng(0)
+    print(f"{'frames':>9} {'batch':>5} | {'forward':>8} | " + ' | '.join(f"{name:>12} {'overhead':>8}" for name in paths)
+          + '   (median ms per call)')
+    for shape in args.shapes:
+        height, width = (int(v) for v in shape.split('x'))
+        for batch in args.batch:
+            frames = [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(batch)]
+            tensor, _ = lean.buffers.letterbox(frames, input_size(args.imgsz))
+            prepared = torch.from_numpy(tensor)
+
+            def forward():
+                with torch.inference_mode():
+                    lean.backend(prepared)
+
+            forward_ms = median_ms(forward, args.repeats)
+            row = [median_ms(lambda: fn(frames), args.repeats) for fn in paths.values()]
+            print(f"{shape:>9} {batch:>5} | {forward_ms:>8.2f} | "
+                  + ' | '.join(f"{total:>12.2f} {total - forward_ms:>8.2f}" for total in row))
@@ -0,0 +1,106 @@
+# Micro-benchmark: per-box Python post-processing vs postprocess.py array operations
+#
+# Usage:  python bench_postprocess.py [--boxes 1 10 50 100 300] [--repeats 200]
+#
+# Uses real ultralytics Boxes (torch tensors) when ultralytics is installed, otherwise the
+# NumPy FrameBoxes the inference server returns.
+
+import time
+
+import numpy as np
+
+from inference_client import FrameBoxes, FrameResult
+from postprocess import boxes_array, class_counts, filter_boxes, to_detections, top_k
+
+NAMES = {0: 'Drowsiness', 1: 'awake', 2: 'yawn'}
+FRAME_SHAPE = (480, 640, 3)
+CONF_THRESHOLD = 0.5
+
+
+def random_boxes(count, rng):
+    height, width = FRAME_SHAPE[:2]
+    x1 = rng.uniform(0, width * 0.7, count)
+    y1 = rng.uniform(0, height * 0.7, count)
+    x2 = x1 + rng.uniform(10, width * 0.3, count)
+    y2 = y1 + rng.uniform(10, height * 0.3, count)
+    conf = rng.uniform(0.25, 1.0, count)
+    cls = rng.integers(0, len(NAMES), count)
+    return np.stack([x1, y1, x2, y2, conf, cls], axis=1).astype(np.float32)
+
+
+def make_results(data):
+    try:
+        import torch
+        from ultralytics.engine.results import Boxes
+        boxes = Boxes(torch.from_numpy(data), FRAME_SHAPE[:2])
+    except ImportError:
+        boxes = FrameBoxes(data)
+    return [FrameResult(boxes, NAMES)]
+
+
+def loop_live(results):
+    """analyze_frame before postprocess.py: per-box conversion, size filter, sort"""
+    valid = []
+    for box in results[0].boxes:
+        class_id = int(box.cls[0])
+        confidence = float(box.conf[0])
+        class_name = NAMES.get(class_id, f'Unknown_{class_id}')
+        bbox = box.xyxy[0].tolist()
+        x1, y1, x2, y2 = map(int, bbox)
+        max_size = min(FRAME_SHAPE[0], FRAME_SHAPE[1]) * 0.8
+        if 40 <= x2 - x1 <= max_size and 40 <= y2 - y1 <= max_size:
+            valid.append({'class': class_name, 'confidence': confidence, 'bbox': bbox})
+    valid.sort(key=lambda d: d['confidence'], reverse=True)
+    return valid[:1]
+
+
+def array_live(results):
+    boxes = filter_boxes(boxes_array(results), min_size=40, max_size=min(FRAME_SHAPE[:2]) * 0.8)
+    return to_detections(top_k(boxes, 1), NAMES)
+
+
+def loop_file(results):
+    """analyze_file before postprocess.py: per-box threshold and counting"""
+    detections = results[0].boxes
+    counts = {}
+    for i in range(len(detections)):
+        confidence = float(detections.conf[i])
+        if confidence > CONF_THRESHOLD:
+            class_name = NAMES[int(detections.cls[i])]
+            detections.xyxy[i].tolist()
+            counts[class_name] = counts.get(class_name, 0) + 1
+    return counts
+
+
+def array_file(results):
+    return class_counts(filter_boxes(boxes_array(results), conf_above=CONF_THRESHOLD), NAMES)
+
+
+def time_us(fn, results, repeats):
+    fn(results)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn(results)
+    return (time.perf_counter() - start) / repeats * 1e6
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark detection post-processing')
+    parser.add_argument('--boxes', type=int, nargs='*', default=[1, 10, 50, 100, 300])
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'boxes':>6} | {'live loop':>10} {'live array':>10} {'speedup':>7} | "
+          f"{'file loop':>10} {'file array':>10} {'speedup':>7}   (us per frame)")
+    for count in args.boxes:
+        results = make_results(random_boxes(count, rng))
+        # Same answers either way
+        assert [d['class'] for d in loop_live(results)] == [d['class'] for d in array_live(results)]
+        assert loop_file(results) == array_file(results)
+        live = (time_us(loop_live, results, args.repeats), time_us(array_live, results, args.repeats))
+        file = (time_us(loop_file, results, args.repeats), time_us(array_file, results, args.repeats))
+        print(f"{count:>6} | {live[0]:>10.1f} {live[1]:>10.1f} {live[0] / live[1]:>6.1f}x | "
+              f"{file[0]:>10.1f} {file[1]:>10.1f} {file[0] / file[1]:>6.1f}x")
@@ -0,0 +1,83 @@
+# Micro-benchmark: per-frame ultralytics-style pre-processing vs preprocess.py preallocated buffers
+#
+# Usage:  python bench_preprocess.py [--shapes 480x640 720x1280 200x160] [--imgsz 640 320] [--batch 1 8]
+#
+# "allocated" is the tracemalloc peak of one call above what was live before it, i.e. the
+# temporary arrays a frame costs (NumPy and OpenCV both report their buffers to tracemalloc);
+# "buffers" is how many buffer sets LetterboxBuffers allocated after warm-up (should stay 0).
+# The baseline mirrors ultralytics' predictor: LetterBox (resize + copyMakeBorder), np.stack,
+# BGR->RGB + HWC->CHW, ascontiguousarray, float conversion and /255 - without torch.
+
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from preprocess import PAD_VALUE, LetterboxBuffers, letterbox_geometry
+
+
+def baseline_preprocess(frames, imgsz):
+    padded = []
+    for frame in frames:
+        ratio, (new_w, new_h), (left, top) = letterbox_geometry(*frame.shape[:2], imgsz)
+        resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        padded.append(cv2.copyMakeBorder(resized, top, imgsz - new_h - top, left, imgsz - new_w - left,
+                                         cv2.BORDER_CONSTANT, value=(PAD_VALUE,) * 3))
+    batch = np.stack(padded)
+    batch = np.ascontiguousarray(batch[..., ::-1].transpose(0, 3, 1, 2))
+    tensor = batch.astype(np.float32)
+    tensor /= 255
+    return tensor
+
+
+def allocated_mb(fn):
+    tracemalloc.start()
+    fn()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return max(0, peak - before) / 1e6
+
+
+def time_ms(fn, repeats):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark frame pre-processing allocations')
+    parser.add_argument('--shapes', nargs='*', default=['480x640', '720x1280', '200x160'],
+                        help='Frame shapes (HxW); 200x160 is a typical ROI crop')
+    parser.add_argument('--imgsz', type=int, nargs='*', default=[640, 320])
+    parser.add_argument('--batch', type=int, nargs='*', default=[1, 8])
+    parser.add_argument('--repeats', type=int, default=30)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    buffers = LetterboxBuffers()
+    print(f"{'frames':>9} {'imgsz':>5} {'batch':>5} | {'baseline':>8} {'prealloc':>8} {'speedup':>7} | "
+          f"{'allocated MB':>12} {'prealloc MB':>11} {'buffers':>7}   (ms per call)")
+    for shape in args.shapes:
+        height, width = (int(v) for v in shape.split('x'))
+        for imgsz in args.imgsz:
+            for batch in args.batch:
+                frames = [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(batch)]
+                expected = baseline_preprocess(frames, imgsz)
+                tensor, _ = buffers.letterbox(frames, imgsz)
+                # Same input tensor either way
+                assert np.array_equal(tensor, expected)
+                warm_allocations = buffers.allocations
+                baseline = time_ms(lambda: baseline_preprocess(frames, imgsz), args.repeats)
+                fast = time_ms(lambda: buffers.letterbox(frames, imgsz), args.repeats)
+                print(f"{shape:>9} {imgsz:>5} {batch:>5} | {baseline:>8.2f} {fast:>8.2f} {baseline / fast:>6.1f}x | "
+                      f"{allocated_mb(lambda: baseline_preprocess(frames, imgsz)):>12.2f} "
+                      f"{allocated_mb(lambda: buffers.letterbox(frames, imgsz)):>11.2f} "
+                      f"{buffers.allocations - warm_allocations:>7}")
@@ -0,0 +1,59 @@
+# Benchmark: uploaded-video wall time with 1..N segment worker processes (video_segments.py)
+#
+# Usage:  python bench_segments.py [--video clip.mp4] [--workers 1 2 4] [--seconds 120]
+#
+# Without --video a synthetic clip of --seconds is written first. Uses the configured backend
+# (INFERENCE_BACKEND=synthetic with SYNTHETIC_LATENCY_MS runs without weights) and sampling.
+# Worker start-up (model load) is paid once per pool and excluded by a warm-up run.
+
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import video_segments
+from config import Config
+from detection_engine import default_engine
+
+
+def synthetic_video(path, seconds, fps=30, size=(640, 480)):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+    for i in range(int(seconds * fps)):
+        writer.write(np.roll(base, i, axis=1))
+    writer.release()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Compare video processing time across segment worker counts')
+    parser.add_argument('--video')
+    parser.add_argument('--workers', type=int, nargs='*', default=[1, 2, 4])
+    parser.add_argument('--seconds', type=float, default=120)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_segments_')
+    video = args.video or os.path.join(workdir, 'input.mp4')
+    if not args.video:
+        synthetic_video(video, args.seconds)
+    engine = default_engine()
+    Config.VIDEO_SEGMENT_MIN_SECONDS = 1.0
+
+    print(f"{'workers':>7} | {'wall s':>7} | {'fps':>7} | {'speedup':>7} | {'stitch s':>8}")
+    baseline = None
+    for workers in args.workers:
+        Config.VIDEO_SEGMENT_WORKERS = workers
+        output = os.path.join(workdir, f'output_{workers}.mp4')
+        if workers > 1:
+            video_segments.process_video(video, output, engine, Config.MODEL_PATH)  # start and warm the pool
+        start = time.perf_counter()
+        summary = video_segments.process_video(video, output, engine, Config.MODEL_PATH)
+        wall = time.perf_counter() - start
+        baseline = baseline or wall
+        stitch = summary.get('stitch', {}).get('wall_s', 0.0)
+        print(f"{workers:>7} | {wall:>7.2f} | {summary['frames'] / wall:>7.1f} | {baseline / wall:>6.2f}x | {stitch:>8.2f}")
+    video_segments.segment_pool.reset()
@@ -33,12 +33,127 @@ class Config:
     # Model Configuration  
     MODEL_PATH = os.path.join(PROJECT_ROOT, 'model', 'best.pt')
     
+    # Versioned model weights (see model_registry.py)
+    MODEL_REGISTRY_DIR = os.getenv('MODEL_REGISTRY_DIR', os.path.join(PROJECT_ROOT, 'model', 'registry'))
+    MODEL_REGISTRY_POLL_SECONDS = 5  # how often servers check the ACTIVE pointer
+    MODEL_SWAP_GRACE_SECONDS = 30  # keep the previous batcher alive for in-flight frames
+    DEFAULT_MODEL_VERSION = 'base'  # recorded when serving model/best.pt outside the registry
+    ADMIN_EMAILS = os.getenv('ADMIN_EMAILS', 'admin@drowsyguard.com').split(',')
+    
+    # Background model loading / warm-up (see model_manager.py)
+    WARMUP_SHAPES = os.getenv('WARMUP_SHAPES', '480x640,720x1280')  # live camera and typical upload (HxW)
+    MODEL_LOAD_ATTEMPTS = int(os.getenv('MODEL_LOAD_ATTEMPTS', '3'))
+    MODEL_RETRY_AFTER = 5  # seconds, sent with 503 responses while the model is not ready
+    
+    # Inference backend: pytorch, onnx, openvino, torchscript, onnx-int8 or synthetic (see model_backends.py)
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'pytorch')
+    INFERENCE_BACKEND_REQUIRE_VERIFIED = os.getenv('INFERENCE_BACKEND_REQUIRE_VERIFIED', 'True').lower() == 'true'
+    
+    # Behaviour flags of the live/inference optimisations below default to off; see README "Feature Flags"
+    # Letterboxing into preallocated buffers at a fixed square input shape (see preprocess.py)
+    PREALLOCATED_PREPROCESS = os.getenv('PREALLOCATED_PREPROCESS', 'False').lower() == 'true'
+    MODEL_IMGSZ = int(os.getenv('MODEL_IMGSZ', '640'))  # default input size, the export size for fixed-shape backends
+    
+    # Network + NMS straight to NumPy arrays, skipping ultralytics' predictor and Results (see lean_predictor.py)
+    LEAN_INFERENCE = os.getenv('LEAN_INFERENCE', 'False').lower() == 'true'
+    LEAN_CHANNELS_LAST = os.getenv('LEAN_CHANNELS_LAST', 'True').lower() == 'true'  # PyTorch weights only
+    
+    # Synthetic backend for load tests (INFERENCE_BACKEND=synthetic, see synthetic_backend.py)
+    SYNTHETIC_SEED = int(os.getenv('SYNTHETIC_SEED', '0'))
+    SYNTHETIC_LATENCY_MS = os.getenv('SYNTHETIC_LATENCY_MS', '40')  # '40', 'uniform:20,60', 'normal:40,8', 'lognormal:40,0.3'
+    SYNTHETIC_CLASS_WEIGHTS = os.getenv('SYNTHETIC_CLASS_WEIGHTS', '0.2,0.6,0.2')  # Drowsiness, awake, yawn
+    SYNTHETIC_EMPTY_RATE = float(os.getenv('SYNTHETIC_EMPTY_RATE', '0.05'))  # share of frames without a face
+    SYNTHETIC_BATCH_SCALING = float(os.getenv('SYNTHETIC_BATCH_SCALING', '0.35'))  # cost of each extra frame in a batch
+    
+    # Sample frames used to verify exported / quantized models
+    SAMPLE_FRAME_FOLDERS = [os.path.join(BASE_DIR, 'uploads', 'detection'), os.path.join(BASE_DIR, 'processed')]
+    
+    # Shared inference server (python api_model.py --inference-server)
+    # When set, app.py workers send frames to this Unix socket instead of loading YOLO themselves
+    INFERENCE_SOCKET = os.getenv('INFERENCE_SOCKET')
+    INFERENCE_SERVER_WAIT = int(os.getenv('INFERENCE_SERVER_WAIT', '300'))  # seconds to wait for the socket at startup
+    
+    # Micro-batching of live frames across sessions (see micro_batcher.py)
+    BATCHING_ENABLED = os.getenv('BATCHING_ENABLED', 'False').lower() == 'true'
+    BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', '8'))  # frames per forward pass
+    BATCH_WINDOW_MS = float(os.getenv('BATCH_WINDOW_MS', '10'))  # max wait for a batch to fill
+    
+    # Motion gating of live frames (see motion_gate.py)
+    MOTION_GATE_ENABLED = os.getenv('MOTION_GATE_ENABLED', 'False').lower() == 'true'
+    MOTION_GATE_THRESHOLD = float(os.getenv('MOTION_GATE_THRESHOLD', '3.0'))  # mean abs diff (0-255) below which a frame is skipped
+    MOTION_GATE_WIDTH = 64  # width of the grayscale thumbnail compared between frames
+    MOTION_GATE_MAX_SKIP_FRAMES = int(os.getenv('MOTION_GATE_MAX_SKIP_FRAMES', '10'))  # force inference after this many skips
+    MOTION_GATE_MAX_SKIP_SECONDS = float(os.getenv('MOTION_GATE_MAX_SKIP_SECONDS', '1.0'))  # ... or after this long
+    
+    # ROI tracking of live frames (see roi_tracker.py)
+    ROI_TRACKING_ENABLED = os.getenv('ROI_TRACKING_ENABLED', 'False').lower() == 'true'
+    ROI_IMGSZ = int(os.getenv('ROI_IMGSZ', '320'))  # inference size for the face crop (multiple of 32)
+    ROI_PADDING = float(os.getenv('ROI_PADDING', '0.5'))  # crop padding on each side, relative to the box size
+    ROI_FULL_FRAME_INTERVAL = int(os.getenv('ROI_FULL_FRAME_INTERVAL', '15'))  # crop inferences between full-frame passes
+    
+    # Decoding of live frames (see frame_decoder.py)
+    FRAME_DECODER = os.getenv('FRAME_DECODER', 'opencv')  # 'opencv' or 'turbojpeg' (needs PyTurboJPEG)
+    FRAME_REDUCED_DECODE = os.getenv('FRAME_REDUCED_DECODE', 'False').lower() == 'true'  # JPEG 1/2, 1/4, 1/8 scale decode
+    FRAME_MAX_DIM = int(os.getenv('FRAME_MAX_DIM', '1280'))  # longer frames are shrunk to this (0 = no cap)
+    FRAME_MAX_BYTES = int(os.getenv('FRAME_MAX_BYTES', str(8 * 1024 * 1024)))  # largest binary frame upload
+    # Latest-frame-wins admission of live frames per session (see frame_slot.py)
+    FRAME_SLOT_ENABLED = os.getenv('FRAME_SLOT_ENABLED', 'False').lower() == 'true'
+    FRAME_SLOT_STALE_SECONDS = float(os.getenv('FRAME_SLOT_STALE_SECONDS', '10'))  # window in which an old seq is stale
+    FRAME_SLOT_WAIT_TIMEOUT = float(os.getenv('FRAME_SLOT_WAIT_TIMEOUT', '10'))  # longest wait behind a running frame
+    # WebSocket channel for live sessions (see live_socket.py)
+    LIVE_SOCKET_ENABLED = os.getenv('LIVE_SOCKET_ENABLED', 'False').lower() == 'true'
+    LIVE_IDLE_TIMEOUT = float(os.getenv('LIVE_IDLE_TIMEOUT', '60'))  # close a channel that sends nothing this long
+    
+    # Latency-driven quality ladder for live frames (see tier_controller.py)
+    # Comma separated imgsz[:model] tiers, best first; model is a registry version or a file in model/
+    ADAPTIVE_TIERS_ENABLED = os.getenv('ADAPTIVE_TIERS_ENABLED', 'False').lower() == 'true'
+    LATENCY_TIER_LADDER = os.getenv('LATENCY_TIER_LADDER', '640,480,320')
+    LATENCY_TARGET_P95_MS = float(os.getenv('LATENCY_TARGET_P95_MS', '150'))
+    LATENCY_MAX_QUEUE_DEPTH = int(os.getenv('LATENCY_MAX_QUEUE_DEPTH', '8'))  # step down when more frames are waiting
+    LATENCY_TIER_COOLDOWN = 5  # seconds between tier changes
+    
+    # Uploaded video processing (see video_pipeline.py)
+    # Frames sent to the model (see frame_sampler.py): 'all', 'stride:N', 'time:R' (R per second of video)
+    # or 'scene:T' (scene change threshold); skipped frames get interpolated boxes.
+    # Opt-in: upload counts only cover inferred frames, so sampling lowers them (e.g. 'time:3')
+    VIDEO_SAMPLING = os.getenv('VIDEO_SAMPLING', 'all')
+    VIDEO_SCENE_MAX_GAP_SECONDS = float(os.getenv('VIDEO_SCENE_MAX_GAP_SECONDS', '2.0'))  # 'scene' still infers this often
+    VIDEO_BATCH_SIZE = int(os.getenv('VIDEO_BATCH_SIZE', '0'))  # frames per model call, 0 = adapt to memory and resolution
+    VIDEO_BATCH_MIN = int(os.getenv('VIDEO_BATCH_MIN', '1'))
+    VIDEO_BATCH_MAX = int(os.getenv('VIDEO_BATCH_MAX', '32'))
+    VIDEO_BATCH_MEMORY_FRACTION = float(os.getenv('VIDEO_BATCH_MEMORY_FRACTION', '0.25'))  # share of available memory a batch may use
+    VIDEO_MODEL_MB_PER_FRAME = float(os.getenv('VIDEO_MODEL_MB_PER_FRAME', '60'))  # model activations per frame at imgsz 640
+    VIDEO_QUEUE_SIZE = int(os.getenv('VIDEO_QUEUE_SIZE', '32'))  # frames buffered between pipeline stages (at least 2 batches)
+    # Long videos are split into time segments processed by a pool of worker processes (see video_segments.py)
+    VIDEO_SEGMENT_WORKERS = int(os.getenv('VIDEO_SEGMENT_WORKERS', '0'))  # 0 = half the cores, 1 = always in-process
+    VIDEO_SEGMENT_MIN_SECONDS = float(os.getenv('VIDEO_SEGMENT_MIN_SECONDS', '30'))  # shortest segment worth a worker
+    
+    # Background analysis of uploaded videos (see job_queue.py)
+    JOB_QUEUE_ENABLED = os.getenv('JOB_QUEUE_ENABLED', 'False').lower() == 'true'  # False = process inside the request
+    # Jobs are drained by `python job_queue.py`; True also runs a job thread in every gunicorn worker
+    JOB_WORKER_ENABLED = os.getenv('JOB_WORKER_ENABLED', 'False').lower() == 'true'
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+    JOB_RETRY_BACKOFF_SECONDS = float(os.getenv('JOB_RETRY_BACKOFF_SECONDS', '10'))  # doubled on every retry
+    JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '120'))  # a job whose worker stops renewing is reclaimed
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1.0'))  # seconds between claims when the queue is empty
+    # Live job progress shared by every process on the node (see progress.py)
+    PROGRESS_FILE = os.getenv('PROGRESS_FILE', '')  # memory-mapped slots, default /dev/shm/drowsyguard-progress
+    PROGRESS_SLOTS = int(os.getenv('PROGRESS_SLOTS', '512'))
+    PROGRESS_INTERVAL = float(os.getenv('PROGRESS_INTERVAL', '0.25'))  # seconds between progress writes per job
+    PROGRESS_STREAM_SECONDS = float(os.getenv('PROGRESS_STREAM_SECONDS', '300'))  # SSE stream length, clients reconnect
+    # Write-behind buffer for live detection_results rows (see result_writer.py)
+    RESULT_WRITE_BEHIND = os.getenv('RESULT_WRITE_BEHIND', 'False').lower() == 'true'
+    RESULT_FLUSH_ROWS = int(os.getenv('RESULT_FLUSH_ROWS', '200'))  # flush once this many rows are buffered
+    RESULT_FLUSH_INTERVAL_MS = float(os.getenv('RESULT_FLUSH_INTERVAL_MS', '500'))  # ... or this often
+    RESULT_BUFFER_MAX_ROWS = int(os.getenv('RESULT_BUFFER_MAX_ROWS', '50000'))  # kept while the database is down
+    
     # CORS Configuration
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:3000,http://127.0.0.1:3000,http://localhost:8080').split(',')
     
     # Detection Configuration
     DETECTION_CLASSES = {0: 'Drowsiness', 1: 'awake', 2: 'yawn'}
     DEFAULT_CONFIDENCE_THRESHOLD = 0.7  # Increased for stability
+    DETECTION_CONFIDENCE = float(os.getenv('DETECTION_CONFIDENCE', '0.5'))  # model threshold for every detection path
     DEFAULT_TRIGGER_TIME = 5  # seconds
     DEFAULT_ALARM_VOLUME = 0.8
     
@@ -0,0 +1,99 @@
+# Detection Engine - The one place frames go through the model
+# Used by app.py (live + upload endpoints), api_model.py and the Streamlit tester (testing-model/app.py),
+# so all of them share one model handle, one class map, one confidence threshold and one post-processor.
+#
+#   engine = DetectionEngine(model)
+#   engine.detect(frame).best()                  -> {'class', 'confidence', 'bbox'} or None
+#   engine.detect_batch(frames)                  -> [FrameDetections], one model call
+#   engine.detect_stream(frames, batch_size=8)   -> yields (frame, FrameDetections) in order
+
+from config import Config
+from postprocess import boxes_array, class_counts, filter_boxes, offset_boxes, to_detections, top_k
+
+
+class FrameDetections:
+    """Filtered (N, 6) [x1, y1, x2, y2, conf, cls] boxes of one frame with their class map"""
+
+    def __init__(self, boxes, names):
+        self.boxes = boxes
+        self.names = names
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def best(self):
+        """Most confident detection as a dict, None when nothing was found"""
+        detections = to_detections(top_k(self.boxes, 1), self.names)
+        return detections[0] if detections else None
+
+    def to_list(self):
+        return to_detections(self.boxes, self.names)
+
+    def counts(self):
+        return class_counts(self.boxes, self.names)
+
+
+class DetectionEngine:
+    """
+    Wraps a model handle (YOLO, BatchedModel or InferenceClient) with the shared post-processing
+    conf defaults to Config.DETECTION_CONFIDENCE; names prefer the model's own class map,
+    with Config.DETECTION_CLASSES filling any gaps
+    """
+
+    def __init__(self, model, conf=None, names=None):
+        self.model = model
+        self.conf = Config.DETECTION_CONFIDENCE if conf is None else conf
+        model_names = names if names is not None else getattr(model, 'names', None)
+        self.names = {**Config.DETECTION_CLASSES, **dict(model_names or {})}
+
+    def _call(self, source, conf, imgsz):
+        kwargs = {'imgsz': imgsz} if imgsz else {}
+        return self.model(source, conf=self.conf if conf is None else conf, verbose=False, **kwargs)
+
+    def _postprocess(self, boxes, offset=None, min_size=None, max_size=None):
+        if offset is not None:
+            boxes = offset_boxes(boxes, *offset)
+        if min_size is not None or max_size is not None:
+            boxes = filter_boxes(boxes, min_size=min_size, max_size=max_size)
+        return FrameDetections(boxes, self.names)
+
+    def detect(self, frame, conf=None, imgsz=None, offset=None, min_size=None, max_size=None):
+        """
+        Detect on one frame
+        offset=(dx, dy) maps boxes found in a crop back to frame coordinates;
+        min_size / max_size drop boxes whose width or height is outside the range (pixels)
+        """
+        results = self._call(frame, conf, imgsz)
+        return self._postprocess(boxes_array(results), offset, min_size, max_size)
+
+    def detect_batch(self, frames, conf=None, imgsz=None, min_size=None, max_size=None):
+        """Detect on several frames with a single model call"""
+        if not frames:
+            return []
+        results = self._call(list(frames), conf, imgsz)
+        return [self._postprocess(boxes_array([result]), None, min_size, max_size) for result in results]
+
+    def detect_stream(self, frames, batch_size=1, **kwargs):
+        """Yield (frame, FrameDetections) for every frame of an iterable, batch_size frames per model call"""
+        batch = []
+        for frame in frames:
+            batch.append(frame)
+            if len(batch) >= batch_size:
+                yield from zip(batch, self.detect_batch(batch, **kwargs))
+                batch = []
+        if batch:
+            yield from zip(batch, self.detect_batch(batch, **kwargs))
+
+
+_default_engine = None
+
+
+def default_engine():
+    """Process-wide engine on the configured backend, loaded on first use (used by the Streamlit tester)"""
+    global _default_engine
+    if _default_engine is None:
+        from model_backends import load_model
+        model, backend = load_model(Config.MODEL_PATH, Config.INFERENCE_BACKEND)
+        print(f"Detection engine loaded {Config.MODEL_PATH} ({backend} backend)")
+        _default_engine = DetectionEngine(model)
+    return _default_engine
@@ -0,0 +1,175 @@
+# Frame Decoder - Fast decode of live camera frames (base64 data URLs or raw bytes)
+# JPEG frames are decoded straight at 1/2, 1/4 or 1/8 scale when the model input size still fits
+# (the DCT scaling in libjpeg skips most of the IDCT work), frames above max_dim are shrunk into
+# a per-thread buffer that is reused between requests, and the decoder itself is pluggable:
+# 'opencv' (default) or 'turbojpeg' (PyTurboJPEG, optional). Binary uploads are read into a
+# per-thread body buffer (read_body) and decoded from it in place.
+#
+#   decoder = FrameDecoder(max_dim=1280)
+#   frame, scale = decoder.decode(data_url, target_size=640)
+#   # detections on frame * scale -> coordinates in the frame the client sent
+
+import binascii
+import threading
+
+import cv2
+import numpy as np
+
+DECODERS = ('opencv', 'turbojpeg')
+REDUCTIONS = (1, 2, 4, 8)
+OPENCV_REDUCED_FLAGS = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                        4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+# JPEG start-of-frame markers (baseline, progressive, ...) carry the image size
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def payload_bytes(data):
+    """Image bytes from a 'data:image/jpeg;base64,...' URL, a bare base64 string or raw bytes"""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return data
+    _, _, encoded = data.rpartition(',')
+    return binascii.a2b_base64(encoded)
+
+
+def jpeg_size(buf):
+    """(height, width) from the JPEG header without decoding, None for anything else"""
+    view = memoryview(buf)
+    if len(view) < 4 or view[0] != 0xFF or view[1] != 0xD8:
+        return None
+    pos = 2
+    while pos + 9 < len(view):
+        if view[pos] != 0xFF:
+            return None
+        marker = view[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        length = (view[pos + 2] << 8) | view[pos + 3]
+        if marker in _SOF_MARKERS:
+            return (view[pos + 5] << 8) | view[pos + 6], (view[pos + 7] << 8) | view[pos + 8]
+        pos += 2 + length
+    return None
+
+
+def choose_reduction(size, target_size):
+    """Largest 1/2/4/8 reduction that keeps the long side at or above target_size"""
+    if size is None or not target_size:
+        return 1
+    long_side = max(size)
+    reduction = 1
+    for candidate in REDUCTIONS[1:]:
+        if long_side / candidate < target_size:
+            break
+        reduction = candidate
+    return reduction
+
+
+class FrameDecoder:
+    """
+    Decodes frames to BGR arrays and returns (frame, scale), where scale maps decoded
+    coordinates back to the original image (1.0 when decoded at full size)
+
+    The returned frame may live in a buffer owned by the calling thread, which is
+    overwritten by that thread's next decode: copy it if it has to outlive the request.
+    """
+
+    def __init__(self, backend='opencv', max_dim=1280, reduced_decode=True):
+        if backend not in DECODERS:
+            raise ValueError(f"Unknown frame decoder '{backend}', expected one of {', '.join(DECODERS)}")
+        self.backend = backend
+        self.max_dim = max_dim
+        self.reduced_decode = reduced_decode
+        self._turbo = None
+        if backend == 'turbojpeg':
+            try:
+                from turbojpeg import TurboJPEG
+                self._turbo = TurboJPEG()
+            except (ImportError, RuntimeError) as e:
+                print(f"TurboJPEG unavailable ({e}), decoding frames with OpenCV")
+                self.backend = 'opencv'
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.reduced = 0
+        self.resized = 0
+
+    def _decode(self, buf, size, reduction):
+        if self._turbo is not None and size is not None:
+            frame = self._turbo.decode(bytes(buf), scaling_factor=(1, reduction))
+            return frame, reduction
+        flags = OPENCV_REDUCED_FLAGS[reduction] if size is not None else cv2.IMREAD_COLOR
+        frame = cv2.imdecode(np.frombuffer(buf, np.uint8), flags)
+        return frame, reduction if size is not None else 1
+
+    def _shrink(self, frame):
+        """Resize into this thread's reusable buffer so the long side is max_dim"""
+        height, width = frame.shape[:2]
+        factor = self.max_dim / max(height, width)
+        shape = (max(1, round(height * factor)), max(1, round(width * factor)), 3)
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None or buffer.shape != shape:
+            buffer = self._local.buffer = np.empty(shape, dtype=np.uint8)
+        cv2.resize(frame, (shape[1], shape[0]), dst=buffer, interpolation=cv2.INTER_AREA)
+        return buffer
+
+    def read_body(self, stream, length):
+        """
+        Read a length-byte request body into this thread's reusable buffer; returns a memoryview
+        over it (valid until the thread's next read_body) or None when the body ends early
+        """
+        buffer = getattr(self._local, 'body', None)
+        if buffer is None or len(buffer) < length:
+            buffer = self._local.body = bytearray(max(length, 2 * len(buffer or b'')))
+        view = memoryview(buffer)[:length]
+        pos = 0
+        while pos < length:
+            count = stream.readinto(view[pos:])
+            if not count:
+                return None
+            pos += count
+        return view
+
+    def decode(self, data, target_size=None):
+        """
+        Decode one frame; target_size is the model input size, the smallest long side
+        worth decoding. Returns (None, 1.0) when the data is not a readable image
+        """
+        try:
+            buf = payload_bytes(data)
+        except (binascii.Error, ValueError):
+            return None, 1.0
+        size = jpeg_size(buf)
+        original_long_side = max(size) if size else None
+        reduction = choose_reduction(size, target_size) if self.reduced_decode else 1
+        frame, reduction = self._decode(buf, size, reduction)
+        if frame is None or frame.size == 0:
+            return None, 1.0
+        if original_long_side is None:
+            original_long_side = max(frame.shape[:2])
+        resized = bool(self.max_dim) and max(frame.shape[:2]) > self.max_dim
+        if resized:
+            frame = self._shrink(frame)
+        with self._lock:
+            self.frames += 1
+            self.reduced += reduction > 1
+            self.resized += resized
+        return frame, original_long_side / max(frame.shape[:2])
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': self.backend,
+                'max_dim': self.max_dim,
+                'reduced_decode': self.reduced_decode,
+                'frames': self.frames,
+                'reduced': self.reduced,
+                'resized': self.resized,
+            }
+
+
+def scale_bbox(bbox, scale):
+    """Map a decoded-frame [x1, y1, x2, y2] back to the coordinates of the frame the client sent"""
+    if scale == 1.0:
+        return bbox
+    return [value * scale for value in bbox]
@@ -0,0 +1,145 @@
+# Frame Sampler - Which frames of an uploaded video go through the model, and boxes for the rest
+# One policy for every video path (VIDEO_SAMPLING):
+#   'all'       every frame
+#   'stride:N'  every Nth frame
+#   'time:R'    R inferences per second of video, whatever the frame rate
+#   'scene:T'   when the frame differs from the last inferred one by more than T (MotionGate score),
+#               and at least every VIDEO_SCENE_MAX_GAP_SECONDS of video
+# Frames in between get boxes interpolated linearly from the inferred frames on either side, so
+# the annotated video stays smooth. The first and last frame are always inferred.
+
+import math
+
+import numpy as np
+
+from config import Config
+from motion_gate import MotionGate
+from postprocess import EMPTY_BOXES
+
+SAMPLING_POLICIES = ('all', 'stride', 'time', 'scene')
+
+
+def parse_sampling(spec):
+    """'time:3' -> ('time', 3.0); 'all' -> ('all', None)"""
+    policy, _, value = str(spec).strip().lower().partition(':')
+    if policy not in SAMPLING_POLICIES:
+        raise ValueError(f"Unknown sampling policy '{spec}', expected one of {', '.join(SAMPLING_POLICIES)}")
+    if policy == 'all':
+        return policy, None
+    if not value:
+        if policy != 'scene':
+            raise ValueError(f"Sampling policy '{policy}' needs a value, e.g. '{policy}:5'")
+        return policy, Config.MOTION_GATE_THRESHOLD
+    value = float(value)
+    if value <= 0:
+        raise ValueError(f"Invalid sampling value in '{spec}'")
+    return policy, value
+
+
+class FrameSampler:
+    """
+    Decides per frame index whether to run the model; max_gap is the most frames between two
+    inferred frames, which bounds how many frames wait for interpolation
+    """
+
+    def __init__(self, policy='all', value=None, fps=30.0, max_gap_seconds=2.0):
+        self.policy = policy
+        self.value = value
+        self.fps = fps if fps and fps > 0 else 30.0
+        self._gate = None
+        if policy == 'all':
+            self.max_gap = 1
+        elif policy == 'stride':
+            self.max_gap = max(1, int(value))
+        elif policy == 'time':
+            self.max_gap = max(1, math.ceil(self.fps / value))
+        else:
+            self.max_gap = max(1, int(round(max_gap_seconds * self.fps)))
+            # Video time, not wall time, bounds the gap: max_skip_seconds is disabled
+            self._gate = MotionGate(threshold=value, width=Config.MOTION_GATE_WIDTH,
+                                    max_skip_frames=self.max_gap - 1, max_skip_seconds=float('inf'))
+        self.frames = 0
+        self.inferred = 0
+
+    @classmethod
+    def from_spec(cls, spec, fps, max_gap_seconds=2.0):
+        policy, value = parse_sampling(spec)
+        return cls(policy, value, fps=fps, max_gap_seconds=max_gap_seconds)
+
+    def should_infer(self, index, frame, last=False):
+        self.frames += 1
+        if self.policy == 'all':
+            infer = True
+        elif self.policy == 'stride':
+            infer = index % self.max_gap == 0
+        elif self.policy == 'time':
+            infer = index == 0 or math.floor(index * self.value / self.fps) != math.floor((index - 1) * self.value / self.fps)
+        else:
+            infer = self._gate.should_infer(frame)
+        infer = infer or index == 0 or last
+        if infer:
+            if self._gate is not None:
+                self._gate.record_inference(0.0)
+            self.inferred += 1
+        return infer
+
+    def stats(self):
+        return {
+            'policy': self.policy,
+            'value': self.value,
+            'max_gap': self.max_gap,
+            'frames': self.frames,
+            'inferred': self.inferred,
+            'inferred_ratio': round(self.inferred / self.frames, 3) if self.frames else 0.0,
+        }
+
+
+def video_sampler(fps):
+    """FrameSampler for a video from Config.VIDEO_SAMPLING"""
+    return FrameSampler.from_spec(Config.VIDEO_SAMPLING, fps, max_gap_seconds=Config.VIDEO_SCENE_MAX_GAP_SECONDS)
+
+
+def box_distances(a, b):
+    """Pairwise centre distance between (N, 4) and (M, 4) boxes, relative to the larger box diagonal"""
+    centre_a = (a[:, None, :2] + a[:, None, 2:4]) / 2
+    centre_b = (b[None, :, :2] + b[None, :, 2:4]) / 2
+    diagonal_a = np.hypot(a[:, 2] - a[:, 0], a[:, 3] - a[:, 1])
+    diagonal_b = np.hypot(b[:, 2] - b[:, 0], b[:, 3] - b[:, 1])
+    scale = np.maximum(np.maximum(diagonal_a[:, None], diagonal_b[None, :]), 1e-6)
+    return np.linalg.norm(centre_a - centre_b, axis=2) / scale
+
+
+def interpolate_boxes(before, after, t, max_distance=1.0):
+    """
+    (N, 6) boxes at fraction t (0 = before, 1 = after) between two inferred frames
+    Boxes of the same class are paired greedily by centre distance (at most max_distance box
+    diagonals apart, so moving faces still pair) and moved linearly, coordinates and confidence;
+    unpaired boxes are kept from whichever inferred frame is nearer
+    """
+    if len(before) == 0 and len(after) == 0:
+        return EMPTY_BOXES
+    distances = np.full((len(before), len(after)), np.inf, dtype=np.float32)
+    if distances.size:
+        distances = np.where(before[:, None, 5] == after[None, :, 5],
+                             box_distances(before[:, :4], after[:, :4]), np.inf)
+    pairs = []
+    used_before, used_after = set(), set()
+    for flat in np.argsort(distances, axis=None):
+        i, j = np.unravel_index(flat, distances.shape)
+        if distances[i, j] > max_distance:
+            break
+        if i in used_before or j in used_after:
+            continue
+        pairs.append((i, j))
+        used_before.add(i)
+        used_after.add(j)
+    rows = [before[i] * (1 - t) + after[j] * t for i, j in pairs]
+    for row in rows:
+        row[5] = np.round(row[5])
+    if t < 0.5:
+        rows += [before[i] for i in range(len(before)) if i not in used_before]
+    else:
+        rows += [after[j] for j in range(len(after)) if j not in used_after]
+    if not rows:
+        return EMPTY_BOXES
+    return np.asarray(rows, dtype=np.float32)
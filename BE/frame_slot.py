@@ -0,0 +1,111 @@
+# Frame Slot - Latest-frame-wins admission of live frames, one slot per detection session
+# When inference is slower than the client loop, frames of a session queue up and the alarm ends up
+# judging the past. The slot lets one frame of the session run at a time and keeps at most one
+# waiting: a newer frame supersedes the waiting one, which is answered 'dropped' straight away
+# without decoding or inference, and frames older than one already admitted are dropped too.
+# Frames are ordered by the client's sequence number (X-Frame-Seq, the live socket header) or
+# timestamp; frames without one are ordered by arrival.
+#
+#   slot = FrameSlot()
+#   if slot.acquire(seq):
+#       try: ...analyze...
+#       finally: slot.release()
+
+import threading
+import time
+
+from config import Config
+
+
+class SlotTotals:
+    """Processed/dropped frames over every session of this process, for /api/model/metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.dropped = 0
+
+    def add(self, processed=0, dropped=0):
+        with self._lock:
+            self.processed += processed
+            self.dropped += dropped
+
+    def stats(self):
+        with self._lock:
+            total = self.processed + self.dropped
+            return {'processed': self.processed, 'dropped': self.dropped,
+                    'drop_rate': round(self.dropped / total, 3) if total else 0.0}
+
+
+slot_totals = SlotTotals()
+
+
+class FrameSlot:
+    """Admits the newest frame of one session; at most one frame runs and one waits"""
+
+    def __init__(self, stale_seconds=None, wait_timeout=None, totals=slot_totals):
+        # A seq at or below the last admitted one is stale only this long after it: a client that
+        # restarts its numbering (page reload) is accepted again once it has been quiet
+        self.stale_seconds = Config.FRAME_SLOT_STALE_SECONDS if stale_seconds is None else stale_seconds
+        self.wait_timeout = Config.FRAME_SLOT_WAIT_TIMEOUT if wait_timeout is None else wait_timeout
+        self.totals = totals
+        self._cond = threading.Condition()
+        self._busy = False
+        self._waiting = None  # (seq, token) of the frame waiting for the slot
+        self._last_seq = None
+        self._last_time = 0.0
+        self.processed = 0
+        self.dropped = 0
+
+    def _drop(self):
+        self.dropped += 1
+        self.totals.add(dropped=1)
+        return False
+
+    def _admit(self, seq):
+        self._busy = True
+        if seq is not None:
+            self._last_seq, self._last_time = seq, time.monotonic()
+        return True
+
+    def acquire(self, seq=None):
+        """
+        Wait for the slot; True when this frame may run (call release() afterwards), False when
+        it is stale or was superseded by a newer frame while waiting
+        """
+        with self._cond:
+            if (seq is not None and self._last_seq is not None and seq <= self._last_seq
+                    and time.monotonic() - self._last_time < self.stale_seconds):
+                return self._drop()
+            if not self._busy and self._waiting is None:
+                return self._admit(seq)
+            if self._waiting is not None and seq is not None and self._waiting[0] is not None \
+                    and seq <= self._waiting[0]:
+                # Arrived out of order behind a newer waiting frame
+                return self._drop()
+            token = object()
+            self._waiting = (seq, token)
+            self._cond.notify_all()
+            deadline = time.monotonic() + self.wait_timeout
+            while True:
+                if self._waiting is None or self._waiting[1] is not token:
+                    return self._drop()
+                if not self._busy:
+                    self._waiting = None
+                    return self._admit(seq)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waiting = None
+                    return self._drop()
+                self._cond.wait(remaining)
+
+    def release(self):
+        with self._cond:
+            self._busy = False
+            self.processed += 1
+            self._cond.notify_all()
+        self.totals.add(processed=1)
+
+    def stats(self):
+        with self._cond:
+            return {'processed': self.processed, 'dropped': self.dropped, 'last_seq': self._last_seq}
@@ -0,0 +1,244 @@
+# Inference Client - Sends frames to the shared inference server (api_model.py --inference-server)
+# Lets every gunicorn worker use one model process instead of loading its own copy of YOLO
+
+import json
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+
+# Wire protocol over a Unix domain socket (all header fields big-endian)
+# Request:  op, height, width, channels, conf, imgsz (0 = model default)  followed by the raw uint8 frame bytes
+#   OP_DETECT_BATCH: the header is followed by a frame count N, then N frames of that same shape
+# Response: status, payload length             followed by the payload
+#   OP_DETECT payload: float32 rows of [x1, y1, x2, y2, conf, cls]
+#   OP_DETECT_BATCH payload: N box counts, then every frame's float32 rows in frame order
+#   OP_NAMES payload:  JSON encoded class map
+#   OP_STATS payload:  JSON encoded server metrics
+#   STATUS_ERROR payload: UTF-8 error message
+OP_DETECT = 1
+OP_NAMES = 2
+OP_STATS = 3
+OP_DETECT_BATCH = 4
+STATUS_OK = 0
+STATUS_ERROR = 1
+REQUEST_HEADER = struct.Struct('!BIIIfH')
+RESPONSE_HEADER = struct.Struct('!BI')
+BATCH_HEADER = struct.Struct('!I')
+BOX_COLUMNS = 6
+
+
+def recv_exact(conn, size):
+    """Read exactly size bytes from conn, returns None if the peer closed the connection"""
+    buffer = bytearray(size)
+    if not recv_into_exact(conn, memoryview(buffer)):
+        return None
+    return bytes(buffer)
+
+
+def recv_into_exact(conn, view):
+    """Fill a memoryview from conn without intermediate copies, returns False on EOF"""
+    received = 0
+    while received < len(view):
+        count = conn.recv_into(view[received:])
+        if count == 0:
+            return False
+        received += count
+    return True
+
+
+def result_to_array(result):
+    """Convert one ultralytics Results object to an (N, 6) float32 box array"""
+    if result is None or result.boxes is None or len(result.boxes) == 0:
+        return np.zeros((0, BOX_COLUMNS), dtype=np.float32)
+    if isinstance(result.boxes, FrameBoxes):
+        return result.boxes.data
+    return result.boxes.data[:, :BOX_COLUMNS].cpu().numpy().astype(np.float32)
+
+
+def pack_batch(arrays):
+    """OP_DETECT_BATCH response payload from one (N, 6) box array per frame"""
+    counts = np.array([len(boxes) for boxes in arrays], dtype='>u4')
+    return counts.tobytes() + b''.join(np.asarray(boxes, dtype=np.float32).tobytes() for boxes in arrays)
+
+
+def unpack_batch(payload, count):
+    """Split an OP_DETECT_BATCH response payload back into one (N, 6) box array per frame"""
+    counts = np.frombuffer(payload, dtype='>u4', count=count)
+    rows = np.frombuffer(payload, dtype=np.float32, offset=counts.nbytes).reshape(-1, BOX_COLUMNS)
+    offsets = np.cumsum(counts)[:-1]
+    return np.split(rows, offsets) if count else []
+
+
+def send_response(conn, status, payload=b''):
+    """Send a response header followed by its payload"""
+    conn.sendall(RESPONSE_HEADER.pack(status, len(payload)))
+    if payload:
+        conn.sendall(payload)
+
+
+class FrameBoxes:
+    """NumPy stand-in for ultralytics Boxes built on an (N, 6) [x1, y1, x2, y2, conf, cls] array"""
+
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=np.float32).reshape(-1, BOX_COLUMNS)
+
+    @property
+    def xyxy(self):
+        return self.data[:, :4]
+
+    @property
+    def conf(self):
+        return self.data[:, 4]
+
+    @property
+    def cls(self):
+        return self.data[:, 5]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, idx):
+        return FrameBoxes(self.data[idx])
+
+    def __iter__(self):
+        for i in range(len(self.data)):
+            yield self[i]
+
+
+class FrameResult:
+    """Minimal ultralytics Results replacement exposing boxes and names"""
+
+    def __init__(self, boxes, names):
+        self.boxes = boxes
+        self.names = names
+
+
+class InferenceClient:
+    """
+    Drop-in replacement for the YOLO model object used by app.py
+    model(frame, conf=...) returns [FrameResult] and model.names is the class map
+    One persistent connection is kept per thread and re-opened after a failure
+    """
+
+    def __init__(self, socket_path, timeout=30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._names = None
+        self._model_version = None
+        self._model_version_checked = 0.0
+
+    @property
+    def names(self):
+        if self._names is None:
+            payload = self._request(REQUEST_HEADER.pack(OP_NAMES, 0, 0, 0, 0.0, 0))
+            self._names = {int(k): v for k, v in json.loads(payload.decode('utf-8')).items()}
+        return self._names
+
+    @property
+    def model_version(self):
+        """Registry version the server is serving, re-checked at most every 5 s (it can hot-swap)"""
+        if time.monotonic() - self._model_version_checked > 5.0:
+            self._model_version_checked = time.monotonic()
+            try:
+                self._model_version = self.stats().get('model_version')
+            except Exception as e:
+                print(f"Could not read model version from inference server: {e}")
+        return self._model_version
+
+    def __call__(self, source, conf=0.25, imgsz=None, **kwargs):
+        frames = source if isinstance(source, (list, tuple)) else [source]
+        names = self.names
+        if len(frames) > 1:
+            arrays = self.detect_batch(frames, conf, imgsz)
+        else:
+            arrays = [self.detect(frame, conf, imgsz) for frame in frames]
+        return [FrameResult(FrameBoxes(boxes), names) for boxes in arrays]
+
+    def detect(self, frame, conf=0.25, imgsz=None):
+        """Run detection on one BGR frame, returns an (N, 6) float32 array"""
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        if frame.ndim == 2:
+            frame = frame[:, :, None]
+        height, width, channels = frame.shape
+        header = REQUEST_HEADER.pack(OP_DETECT, height, width, channels, float(conf), int(imgsz or 0))
+        payload = self._request(header, memoryview(frame).cast('B'))
+        return np.frombuffer(payload, dtype=np.float32).reshape(-1, BOX_COLUMNS)
+
+    def detect_batch(self, frames, conf=0.25, imgsz=None):
+        """
+        Run detection on a list of BGR frames in one round trip (the server batches them into one
+        forward pass); frames of different shapes fall back to one request per frame
+        """
+        frames = [np.ascontiguousarray(frame, dtype=np.uint8) for frame in frames]
+        frames = [frame[:, :, None] if frame.ndim == 2 else frame for frame in frames]
+        shape = frames[0].shape
+        if any(frame.shape != shape for frame in frames):
+            return [self.detect(frame, conf, imgsz) for frame in frames]
+        height, width, channels = shape
+        header = REQUEST_HEADER.pack(OP_DETECT_BATCH, height, width, channels, float(conf), int(imgsz or 0))
+        payload = self._request(header + BATCH_HEADER.pack(len(frames)),
+                                [memoryview(frame).cast('B') for frame in frames])
+        return unpack_batch(payload, len(frames))
+
+    def stats(self):
+        """Metrics reported by the inference server (micro-batching etc.)"""
+        payload = self._request(REQUEST_HEADER.pack(OP_STATS, 0, 0, 0, 0.0, 0))
+        return json.loads(payload.decode('utf-8'))
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.settimeout(self.timeout)
+            conn.connect(self.socket_path)
+            self._local.conn = conn
+        return conn
+
+    def _request(self, header, body=None):
+        # body is one buffer or a list of buffers sent back to back (frames are not joined)
+        parts = body if isinstance(body, list) else [body] if body is not None else []
+        response = bytearray(RESPONSE_HEADER.size)
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.sendall(header)
+                for part in parts:
+                    conn.sendall(part)
+                received = conn.recv_into(response)
+                if received == 0:
+                    raise ConnectionError('Inference server closed the connection')
+                break
+            except socket.timeout:
+                # The server is still working on the request: sending it again would only add load
+                self.close()
+                raise
+            except (ConnectionError, OSError):
+                # Send failed or the connection closed before any answer (e.g. the inference server
+                # was restarted), so the request was not served: retry once on a new connection
+                self.close()
+                if attempt == 1:
+                    raise
+        try:
+            if not recv_into_exact(conn, memoryview(response)[received:]):
+                raise ConnectionError('Inference server closed the connection')
+            status, length = RESPONSE_HEADER.unpack(response)
+            payload = recv_exact(conn, length) if length else b''
+            if payload is None:
+                raise ConnectionError('Inference server closed the connection')
+        except (ConnectionError, OSError):
+            # Part of an answer was read: the connection is out of sync and is not retried
+            self.close()
+            raise
+        if status != STATUS_OK:
+            raise RuntimeError(f"Inference server error: {payload.decode('utf-8', 'replace')}")
+        return payload
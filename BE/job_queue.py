@@ -0,0 +1,340 @@
+# Job Queue - Durable queue of uploaded-video analyses in the analysis_jobs table
+# /api/detection/analyze-file stores the upload, enqueues a job and returns its id straight away;
+# JobWorker threads (`python job_queue.py` on any node sharing the database, or one per gunicorn
+# worker with JOB_WORKER_ENABLED) claim jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any
+# number of workers drain the table without two of them taking the same job.
+# A failed job is retried with exponential backoff up to max_attempts. A running job holds a lease
+# (locked_at, renewed every JOB_LEASE_SECONDS / 4); when its worker dies the lease expires and
+# another worker claims the job again. Completion updates uploaded_files and the linked
+# detection_sessions row in the same transaction as the job.
+#
+#   job = enqueue(db, uploaded_file); db.commit()
+#   JobWorker(handler, session_factory=SessionLocal).start()   # handler(job, uploaded_file, progress) -> result dict
+
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_
+
+from config import Config
+from database import AnalysisJob, DetectionSession, SessionLocal, UploadedFile
+
+PROCESSED_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'processed')
+
+
+def enqueue(db, uploaded_file, max_attempts=None):
+    """Add a queued job for uploaded_file (caller commits)"""
+    job = AnalysisJob(uploaded_file_id=uploaded_file.id,
+                      user_id=uploaded_file.user_id,
+                      session_id=uploaded_file.session_id,
+                      status='queued',
+                      attempts=0,
+                      max_attempts=max_attempts or Config.JOB_MAX_ATTEMPTS,
+                      run_after=datetime.utcnow())
+    db.add(job)
+    db.flush()
+    return job
+
+
+def claim(db, worker_id, lease_seconds=None):
+    """
+    Next runnable job, marked running for worker_id and committed, or None
+    Runnable: queued and past its retry backoff, or running under an expired lease
+    """
+    now = datetime.utcnow()
+    expired = now - timedelta(seconds=lease_seconds or Config.JOB_LEASE_SECONDS)
+    while True:
+        job = (db.query(AnalysisJob)
+               .filter(or_(and_(AnalysisJob.status == 'queued', AnalysisJob.run_after <= now),
+                           and_(AnalysisJob.status == 'running', AnalysisJob.locked_at < expired)))
+               .order_by(AnalysisJob.id)
+               .with_for_update(skip_locked=True)
+               .first())
+        if job is None:
+            db.rollback()
+            return None
+        if job.status == 'running' and job.attempts >= job.max_attempts:
+            # Its worker died on the last attempt
+            _finish_failed(db, job, f"Worker {job.locked_by} stopped responding")
+            db.commit()
+            continue
+        job.status = 'running'
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_at = now
+        uploaded_file = db.get(UploadedFile, job.uploaded_file_id)
+        if uploaded_file is not None:
+            uploaded_file.processing_status = 'processing'
+        db.commit()
+        return job
+
+
+def _locked(db, job_id, worker_id):
+    """The job row locked for update, None when worker_id no longer holds it (lease expired and reclaimed)"""
+    return (db.query(AnalysisJob)
+            .filter(AnalysisJob.id == job_id, AnalysisJob.status == 'running', AnalysisJob.locked_by == worker_id)
+            .with_for_update()
+            .first())
+
+
+def renew_lease(db, job_id, worker_id):
+    """Push the lease of a running job forward; False once another worker owns it"""
+    job = _locked(db, job_id, worker_id)
+    if job is None:
+        db.rollback()
+        return False
+    job.locked_at = datetime.utcnow()
+    db.commit()
+    return True
+
+
+def complete(db, job_id, worker_id, result):
+    """
+    Record a finished job with its uploaded file and detection session; result holds
+    processed_path and the class counts. Returns False when the lease was lost meanwhile
+    """
+    job = _locked(db, job_id, worker_id)
+    if job is None:
+        db.rollback()
+        return False
+    now = datetime.utcnow()
+    job.status = 'completed'
+    job.result = json.dumps(result)
+    job.last_error = None
+    job.finished_at = now
+    job.locked_by = None
+    uploaded_file = db.get(UploadedFile, job.uploaded_file_id)
+    if uploaded_file is not None:
+        _remove_previous_files(db, uploaded_file)
+        uploaded_file.processing_status = 'completed'
+        uploaded_file.processed_path = result.get('processed_path')
+        uploaded_file.processed_time = now
+        uploaded_file.error_message = None
+    if job.session_id:
+        session = db.query(DetectionSession).filter(DetectionSession.id == job.session_id).first()
+        if session:
+            session.total_detections += result.get('total_detections', 0)
+            session.drowsiness_count += result.get('drowsiness_count', 0)
+            session.status = 'completed'
+            session.end_time = datetime.now()
+    db.commit()
+    return True
+
+
+def fail(db, job_id, worker_id, error):
+    """Schedule a retry with exponential backoff, or fail the job for good after max_attempts"""
+    job = _locked(db, job_id, worker_id)
+    if job is None:
+        db.rollback()
+        return None
+    if job.attempts < job.max_attempts:
+        delay = Config.JOB_RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)
+        job.status = 'queued'
+        job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+        job.last_error = error
+        job.locked_by = None
+        uploaded_file = db.get(UploadedFile, job.uploaded_file_id)
+        if uploaded_file is not None:
+            uploaded_file.processing_status = 'pending'
+    else:
+        _finish_failed(db, job, error)
+    db.commit()
+    return job.status
+
+
+def _finish_failed(db, job, error):
+    now = datetime.utcnow()
+    job.status = 'failed'
+    job.last_error = error
+    job.finished_at = now
+    job.locked_by = None
+    uploaded_file = db.get(UploadedFile, job.uploaded_file_id)
+    if uploaded_file is not None:
+        uploaded_file.processing_status = 'failed'
+        uploaded_file.error_message = error
+        uploaded_file.processed_time = now
+    if job.session_id:
+        session = db.query(DetectionSession).filter(DetectionSession.id == job.session_id).first()
+        if session and session.status == 'active':
+            session.status = 'interrupted'
+            session.end_time = datetime.now()
+
+
+def _remove_previous_files(db, uploaded_file):
+    """Delete the user's earlier finished video uploads and their processed videos, keeping only the latest"""
+    previous = (db.query(UploadedFile)
+                .filter(UploadedFile.user_id == uploaded_file.user_id,
+                        UploadedFile.file_type == 'video',
+                        UploadedFile.id < uploaded_file.id,
+                        UploadedFile.processing_status.in_(('completed', 'failed')))
+                .all())
+    for record in previous:
+        if record.processed_path:
+            path = os.path.join(os.path.dirname(PROCESSED_FOLDER), record.processed_path)
+            if os.path.exists(path):
+                os.remove(path)
+            record.processed_path = None
+        if record.file_path != uploaded_file.file_path and os.path.exists(record.file_path):
+            os.remove(record.file_path)
+
+
+def analyze_video(engine, weights_path, uploaded_file, progress=None):
+    """Default job handler: annotated video in BE/processed plus the class counts"""
+    from video_segments import process_video
+
+    file_ext = uploaded_file.file_path.rsplit('.', 1)[-1].lower()
+    processed_filename = f"processed_{uploaded_file.user_id}_{uploaded_file.id}.{file_ext}"
+    os.makedirs(PROCESSED_FOLDER, exist_ok=True)
+    summary = process_video(uploaded_file.file_path, os.path.join(PROCESSED_FOLDER, processed_filename),
+                            engine, weights_path, progress=progress)
+    return {
+        # Relative to BE/, like the paths analyze-file stores
+        'processed_path': os.path.join('processed', processed_filename),
+        'total_detections': summary['total_detections'],
+        'drowsiness_count': summary['counts'].get('Drowsiness', 0),
+        'yawn_count': summary['counts'].get('yawn', 0),
+        'awake_count': summary['counts'].get('awake', 0),
+        'file_type': 'video',
+        'original_filename': uploaded_file.original_filename,
+        'file_id': uploaded_file.id,
+        'pipeline': summary,
+    }
+
+
+class JobWorker:
+    """
+    Background thread draining the queue: claims a job, runs handler(job, uploaded_file, progress) and
+    records the result or the error; ready() gates claiming (e.g. until the model is loaded).
+    With a progress board (progress.py) progress is a ProgressTracker for the job, else None
+    """
+
+    def __init__(self, handler, session_factory=SessionLocal, worker_id=None, poll_interval=None,
+                 lease_seconds=None, ready=None, progress_board=None):
+        self.handler = handler
+        self.progress_board = progress_board
+        self.session_factory = session_factory
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = Config.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.lease_seconds = lease_seconds or Config.JOB_LEASE_SECONDS
+        self.ready = ready
+        self.processed = 0
+        self.failed = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='job-worker', daemon=True)
+        self._thread.start()
+        print(f"Job worker {self.worker_id} started (poll {self.poll_interval}s, lease {self.lease_seconds}s)")
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                worked = self.run_once()
+            except Exception as e:
+                # Database unreachable and the like: keep polling
+                print(f"Job worker error: {e}")
+                worked = False
+            if not worked:
+                self._stop.wait(self.poll_interval)
+
+    def _keep_lease(self, job_id, done):
+        """Renew the lease until done is set (runs on its own thread during a job)"""
+        while not done.wait(self.lease_seconds / 4):
+            db = self.session_factory()
+            try:
+                if not renew_lease(db, job_id, self.worker_id):
+                    return
+            except Exception as e:
+                print(f"Could not renew lease of job {job_id}: {e}")
+            finally:
+                db.close()
+
+    def run_once(self):
+        """Claim and run one job; False when none was runnable"""
+        if self.ready is not None and not self.ready():
+            return False
+        db = self.session_factory()
+        try:
+            job = claim(db, self.worker_id, self.lease_seconds)
+            if job is None:
+                return False
+            job_id, attempt = job.id, job.attempts
+            uploaded_file = db.get(UploadedFile, job.uploaded_file_id)
+            done = threading.Event()
+            threading.Thread(target=self._keep_lease, args=(job_id, done), name='job-lease', daemon=True).start()
+            board = self.progress_board
+            tracker = board.tracker(job_id, job.user_id) if board is not None else None
+            start = time.perf_counter()
+            try:
+                result = self.handler(job, uploaded_file, tracker)
+            except Exception as e:
+                db.rollback()
+                status = fail(db, job_id, self.worker_id, str(e))
+                self.failed += 1
+                if board is not None and status:
+                    board.finish(job_id, status)
+                print(f"Job {job_id} attempt {attempt} failed ({e}), now {status}")
+                return True
+            finally:
+                done.set()
+            if complete(db, job_id, self.worker_id, result):
+                if board is not None:
+                    board.finish(job_id, 'completed')
+                self.processed += 1
+                print(f"Job {job_id} completed in {time.perf_counter() - start:.1f}s (attempt {attempt})")
+            else:
+                print(f"Job {job_id} finished after its lease was taken over, result discarded")
+            return True
+        finally:
+            db.close()
+
+    def stats(self):
+        return {'worker_id': self.worker_id, 'processed': self.processed, 'failed': self.failed}
+
+
+def queue_stats(db):
+    """Job counts per status"""
+    rows = db.query(AnalysisJob.status, func.count(AnalysisJob.id)).group_by(AnalysisJob.status).all()
+    return {status: count for status, count in rows}
+
+
+if __name__ == '__main__':
+    # Standalone worker for nodes that only process uploads: python job_queue.py
+    from detection_engine import DetectionEngine
+    from model_backends import load_model
+    from model_registry import ModelRegistry
+    from progress import progress_board
+
+    registry = ModelRegistry()
+    version = registry.active_version()
+    weights = registry.weights_path(version) if version else Config.MODEL_PATH
+    if Config.INFERENCE_SOCKET:
+        # Share the inference server's model instead of loading another copy
+        from inference_client import InferenceClient
+        deadline = time.time() + Config.INFERENCE_SERVER_WAIT
+        while not os.path.exists(Config.INFERENCE_SOCKET) and time.time() < deadline:
+            time.sleep(0.5)
+        loaded_model, backend = InferenceClient(Config.INFERENCE_SOCKET), 'inference-server'
+    else:
+        loaded_model, backend = load_model(weights, Config.INFERENCE_BACKEND)
+    print(f"Job worker model {version or 'default'} ({backend} backend)")
+    detection_engine = DetectionEngine(loaded_model)
+    worker = JobWorker(lambda job, uploaded_file, progress: analyze_video(detection_engine, weights, uploaded_file, progress),
+                       progress_board=progress_board())
+    worker.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        worker.stop()
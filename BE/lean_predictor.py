@@ -0,0 +1,69 @@
+# Lean Predictor - Network + NMS straight to NumPy, without ultralytics' predictor and Results objects
+# model(frame) on a YOLO object runs the predictor pipeline and builds a Results per frame (original
+# image reference, names and speed dicts, Boxes wrapper); detection only ever reads xyxy/conf/cls.
+# LeanPredictor letterboxes into preallocated buffers (preprocess.py), runs the AutoBackend forward
+# pass and non_max_suppression under torch.inference_mode, and returns (N, 6) float32 arrays.
+# PyTorch weights run channels-last, which matches the NHWC layout of the letterbox buffers.
+#
+#   model = LeanPredictor('model/best.pt')
+#   model.predict_arrays([frame], conf=0.5)   # -> [(N, 6) [x1, y1, x2, y2, conf, cls]]
+#   model(frame, conf=0.5)                    # -> [FrameResult], drop-in for YOLO(frame)
+
+import threading
+
+import numpy as np
+
+from inference_client import BOX_COLUMNS, FrameBoxes, FrameResult
+from preprocess import LetterboxBuffers, input_size, unletterbox_boxes
+
+
+class LeanPredictor:
+    """
+    Callable like a YOLO model for every backend ultralytics' AutoBackend loads
+    (.pt, .onnx, OpenVINO dir, .torchscript); iou and max_det match ultralytics' defaults
+    """
+
+    def __init__(self, weights_path, imgsz=640, device='cpu', iou=0.7, max_det=300, channels_last=True):
+        import torch
+        from ultralytics.nn.autobackend import AutoBackend
+        from ultralytics.utils.ops import non_max_suppression
+
+        self._torch = torch
+        self._nms = non_max_suppression
+        self.weights_path = weights_path
+        self.imgsz = imgsz
+        self.iou = iou
+        self.max_det = max_det
+        self.backend = AutoBackend(weights=weights_path, device=torch.device(device), fp16=False, fuse=True, verbose=False)
+        self.backend.eval()
+        # channels_last only helps (and is only supported) for the PyTorch module itself
+        self.channels_last = bool(channels_last and self.backend.pt)
+        if self.channels_last:
+            self.backend.model.to(memory_format=torch.channels_last)
+        self.names = dict(self.backend.names)
+        self.buffers = LetterboxBuffers(channels_last=self.channels_last)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.frames = 0
+
+    def predict_arrays(self, frames, conf=0.25, imgsz=None):
+        """(N, 6) float32 boxes in frame coordinates for each frame, one forward pass"""
+        size = input_size(imgsz or self.imgsz)
+        tensor, geometry = self.buffers.letterbox(frames, size)
+        with self._torch.inference_mode():
+            predictions = self.backend(self._torch.from_numpy(tensor))
+            detections = self._nms(predictions, conf, self.iou, max_det=self.max_det)
+        with self._lock:
+            self.calls += 1
+            self.frames += len(frames)
+        return [unletterbox_boxes(boxes[:, :BOX_COLUMNS].cpu().numpy().astype(np.float32), *frame_geometry)
+                for boxes, frame_geometry in zip(detections, geometry)]
+
+    def __call__(self, source, conf=0.25, imgsz=None, **kwargs):
+        frames = source if isinstance(source, (list, tuple)) else [source]
+        return [FrameResult(FrameBoxes(boxes), self.names) for boxes in self.predict_arrays(frames, conf, imgsz)]
+
+    def preprocess_stats(self):
+        with self._lock:
+            calls, frames = self.calls, self.frames
+        return {'predictor': 'lean', 'imgsz': self.imgsz, 'calls': calls, 'frames': frames, **self.buffers.stats()}
@@ -0,0 +1,170 @@
+# Live Socket - One WebSocket per live detection session instead of an HTTP POST per frame
+# The client authenticates once when connecting (/api/detection/live?token=<jwt>&session_id=<id>),
+# then sends every camera frame as a binary message: a 4-byte big-endian sequence number followed
+# by the JPEG/WebP bytes. The server answers each frame with one compact JSON message, plus an
+# 'alarm' message when the drowsiness alarm fires. Frames are received on a reader thread into a
+# one-frame mailbox: a frame arriving while another still waits replaces it (latest frame wins) and
+# the replaced one is answered with 'dropped', so at most one frame is analysed and one waits.
+#
+#   channel = LiveChannel(ws, handle_frame)   # handle_frame(seq, view) -> (payload, status)
+#   channel.run()                             # until the client or the session goes away
+
+import json
+import struct
+import threading
+import time
+
+from config import Config
+
+# Sequence number in front of every binary frame
+FRAME_HEADER = struct.Struct('>I')
+
+
+def parse_frame(message):
+    """(seq, image bytes as a memoryview) from a binary message, None when it is too short"""
+    if not isinstance(message, (bytes, bytearray)) or len(message) <= FRAME_HEADER.size:
+        return None
+    view = memoryview(message)
+    return FRAME_HEADER.unpack_from(view)[0], view[FRAME_HEADER.size:]
+
+
+def dumps(message):
+    return json.dumps(message, separators=(',', ':'))
+
+
+def compact_result(seq, payload):
+    """Per-frame message: boxes as [class, confidence, x1, y1, x2, y2] with integer coordinates"""
+    return {
+        'type': 'result',
+        'seq': seq,
+        'detections': [[d['class'], round(d['confidence'], 3), *(int(v) for v in d['bbox'])]
+                       for d in payload.get('detections', [])],
+        'drowsy': payload.get('drowsiness_detected', False),
+        'ms': float(payload.get('processing_time', '0').rstrip('ms') or 0),
+        'reused': payload.get('reused_detection', False),
+        'tier': payload.get('tier'),
+    }
+
+
+class ChannelStats:
+    """Counters over every live channel of this process, for /api/model/metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.connections = 0
+        self.frames = 0
+        self.dropped = 0
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def stats(self):
+        with self._lock:
+            return {'open': self.open, 'connections': self.connections,
+                    'frames': self.frames, 'dropped': self.dropped}
+
+
+channel_stats = ChannelStats()
+
+
+class LiveChannel:
+    """
+    Serves one connected client: a reader thread puts frames in the mailbox, the calling thread
+    runs handle_frame(seq, view) -> (payload, status) on the newest one and sends the answers
+    """
+
+    def __init__(self, ws, handle_frame, stats=channel_stats):
+        self.ws = ws
+        self.handle_frame = handle_frame
+        self.stats = stats
+        self._mailbox = None
+        self._cond = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def send(self, message):
+        with self._send_lock:
+            self.ws.send(dumps(message))
+
+    def _post(self, frame):
+        """Put a frame in the mailbox; returns the seq of the waiting frame it replaced, or None"""
+        with self._cond:
+            replaced = self._mailbox[0] if self._mailbox is not None else None
+            self._mailbox = frame
+            self._cond.notify()
+        return replaced
+
+    def _take(self):
+        """Newest waiting frame, None once the reader has stopped"""
+        with self._cond:
+            while self._mailbox is None and not self._closed.is_set():
+                self._cond.wait()
+            frame, self._mailbox = self._mailbox, None
+            return frame
+
+    def _read(self):
+        """Reader thread: post binary frames, answer the ones they replace with 'dropped'"""
+        try:
+            while not self._closed.is_set():
+                message = self.ws.receive(timeout=Config.LIVE_IDLE_TIMEOUT)
+                if message is None:
+                    # No frame for LIVE_IDLE_TIMEOUT seconds (or the socket closed)
+                    break
+                if isinstance(message, str):
+                    if message == 'ping':
+                        self.send({'type': 'pong', 'time': time.time()})
+                    continue
+                frame = parse_frame(message)
+                if frame is None:
+                    self.send({'type': 'error', 'error': 'Binary frames need a 4-byte sequence number'})
+                    continue
+                replaced = self._post(frame)
+                if replaced is not None:
+                    self.stats.add(dropped=1)
+                    self.send({'type': 'dropped', 'seq': replaced})
+        except Exception as e:
+            # ConnectionClosed and friends
+            if not self._closed.is_set():
+                print(f"Live socket closed while reading: {e}")
+        finally:
+            with self._cond:
+                self._closed.set()
+                self._mailbox = None
+                self._cond.notify_all()
+
+    def run(self):
+        self.stats.add(open=1, connections=1)
+        threading.Thread(target=self._read, name='live-socket-reader', daemon=True).start()
+        try:
+            while True:
+                frame = self._take()
+                if frame is None:
+                    break
+                seq, view = frame
+                payload, status = self.handle_frame(seq, view)
+                if payload.get('dropped'):
+                    # Stale for the session's frame slot (e.g. an HTTP frame of the same session was newer)
+                    self.stats.add(dropped=1)
+                    self.send({'type': 'dropped', 'seq': seq})
+                    continue
+                self.stats.add(frames=1)
+                if payload.get('stopped'):
+                    self.send({'type': 'stopped', 'seq': seq, 'message': payload.get('message')})
+                    break
+                if status != 200:
+                    self.send({'type': 'error', 'seq': seq, 'status': status, 'error': payload.get('error')})
+                    continue
+                self.send(compact_result(seq, payload))
+                if payload.get('alarm_triggered'):
+                    self.send({'type': 'alarm', 'seq': seq, 'time': time.time()})
+        except Exception as e:
+            # Client went away while an answer was being sent
+            print(f"Live socket closed: {e}")
+        finally:
+            with self._cond:
+                self._closed.set()
+                self._cond.notify_all()
+            self.stats.add(open=-1)
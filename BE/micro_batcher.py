@@ -0,0 +1,191 @@
+# Micro Batcher - Groups live frames from concurrent sessions into one batched YOLO call
+# Used by the shared inference server (api_model.py) and by app.py when BATCHING_ENABLED is set
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+from inference_client import BOX_COLUMNS, FrameBoxes, FrameResult, result_to_array
+
+
+def percentile(values, pct):
+    """Percentile of a list of numbers, 0.0 for an empty list"""
+    if not values:
+        return 0.0
+    return float(np.percentile(values, pct))
+
+
+class MicroBatcher:
+    """
+    Collects frames for up to max_wait_ms (or until max_batch_size frames are queued),
+    runs infer_batch(frames, conf) once and hands each caller its own box array
+
+    infer_batch(frames, conf, imgsz) must return one (N, 6) [x1, y1, x2, y2, conf, cls] array per frame.
+    Callers may ask for different confidence thresholds: the batch runs at the lowest
+    one and each result is filtered to its caller's threshold afterwards.
+    Frames asking for different input sizes (imgsz, None = model default) run as separate passes.
+    """
+
+    def __init__(self, infer_batch, max_batch_size=8, max_wait_ms=10, metrics_window=500):
+        self.infer_batch = infer_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._recent = deque(maxlen=metrics_window)
+        self._total_batches = 0
+        self._total_frames = 0
+        self._total_errors = 0
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, frame, conf=0.25, imgsz=None):
+        """Queue a frame, returns a Future resolving to its (N, 6) box array"""
+        future = Future()
+        self._queue.put((frame, float(conf), time.perf_counter(), future, imgsz))
+        return future
+
+    def infer(self, frame, conf=0.25, imgsz=None, timeout=None):
+        """Blocking helper around submit()"""
+        return self.submit(frame, conf, imgsz).result(timeout=timeout)
+
+    def queue_depth(self):
+        """Frames waiting for a batch"""
+        return self._queue.qsize()
+
+    def close(self):
+        self._running = False
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._running = False
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while self._running:
+            batch = self._collect()
+            if not batch:
+                continue
+            # One forward pass per requested input size
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[4], []).append(item)
+            for group in groups.values():
+                self._process(group)
+
+    def _process(self, batch):
+        frames = [item[0] for item in batch]
+        batch_conf = min(item[1] for item in batch)
+        imgsz = batch[0][4]
+        started = time.perf_counter()
+        try:
+            outputs = list(self.infer_batch(frames, batch_conf, imgsz))
+            if len(outputs) != len(batch):
+                # zip() would leave the extra callers waiting forever (or pair boxes with the wrong frame)
+                raise RuntimeError(f"infer_batch returned {len(outputs)} results for {len(batch)} frames")
+        except Exception as e:
+            print(f"Batched inference error: {e}")
+            with self._stats_lock:
+                self._total_errors += 1
+            for item in batch:
+                item[3].set_exception(e)
+            return
+        finished = time.perf_counter()
+
+        for (frame, conf, _, future, _), boxes in zip(batch, outputs):
+            boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, BOX_COLUMNS)
+            if conf > batch_conf:
+                boxes = boxes[boxes[:, 4] >= conf]
+            future.set_result(boxes)
+
+        with self._stats_lock:
+            self._total_batches += 1
+            self._total_frames += len(batch)
+            self._recent.append({
+                'size': len(batch),
+                'queue_wait_ms': [(started - item[2]) * 1000 for item in batch],
+                'inference_ms': (finished - started) * 1000,
+            })
+
+    def stats(self):
+        """Per-batch metrics for tuning batch size and window against added latency"""
+        with self._stats_lock:
+            recent = list(self._recent)
+            totals = {
+                'total_batches': self._total_batches,
+                'total_frames': self._total_frames,
+                'total_errors': self._total_errors,
+            }
+        sizes = [b['size'] for b in recent]
+        waits = [w for b in recent for w in b['queue_wait_ms']]
+        inference = [b['inference_ms'] for b in recent]
+        per_frame = [b['inference_ms'] / b['size'] for b in recent]
+        size_histogram = {}
+        for size in sizes:
+            size_histogram[size] = size_histogram.get(size, 0) + 1
+        return {
+            **totals,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'queue_depth': self.queue_depth(),
+            'window_batches': len(recent),
+            'avg_batch_size': float(np.mean(sizes)) if sizes else 0.0,
+            'batch_size_histogram': size_histogram,
+            'queue_wait_ms_p50': percentile(waits, 50),
+            'queue_wait_ms_p95': percentile(waits, 95),
+            'inference_ms_p50': percentile(inference, 50),
+            'inference_ms_p95': percentile(inference, 95),
+            'inference_ms_per_frame_p50': percentile(per_frame, 50),
+        }
+
+
+def yolo_batch_inference(model, lock=None):
+    """Build an infer_batch callable for an ultralytics model (or anything with the same call)"""
+    def infer_batch(frames, conf, imgsz=None):
+        kwargs = {'imgsz': imgsz} if imgsz else {}
+        if lock is not None:
+            with lock:
+                results = model(frames, conf=conf, verbose=False, **kwargs)
+        else:
+            results = model(frames, conf=conf, verbose=False, **kwargs)
+        return [result_to_array(result) for result in results]
+    return infer_batch
+
+
+class BatchedModel:
+    """Callable model wrapper that routes model(frame, conf=...) through a MicroBatcher"""
+
+    def __init__(self, model, batcher):
+        self.model = model
+        self.batcher = batcher
+
+    @property
+    def names(self):
+        return self.model.names
+
+    def __call__(self, source, conf=0.25, imgsz=None, **kwargs):
+        frames = source if isinstance(source, (list, tuple)) else [source]
+        futures = [self.batcher.submit(frame, conf, imgsz) for frame in frames]
+        return [FrameResult(FrameBoxes(future.result()), self.names) for future in futures]
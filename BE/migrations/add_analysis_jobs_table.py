@@ -0,0 +1,27 @@
+import os
+import sys
+from sqlalchemy import create_engine, inspect
+
+# Add project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from BE.database import DATABASE_URL, AnalysisJob
+
+def add_analysis_jobs_table():
+    """Creates the analysis_jobs table (queued upload analyses, see job_queue.py)."""
+    engine = create_engine(DATABASE_URL)
+    
+    try:
+        if inspect(engine).has_table('analysis_jobs'):
+            print("Table 'analysis_jobs' already exists. Skipping.")
+        else:
+            # Table and its claim index (status, run_after) as declared on the model
+            AnalysisJob.__table__.create(engine)
+            print("Successfully created table 'analysis_jobs'.")
+    except Exception as e:
+        print(f"Error creating table 'analysis_jobs': {e}")
+
+if __name__ == "__main__":
+    print("Starting database migration...")
+    add_analysis_jobs_table()
+    print("Migration complete.")
@@ -0,0 +1,38 @@
+import os
+import sys
+from sqlalchemy import create_engine, text
+
+# Add project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from BE.database import DATABASE_URL
+
+def add_model_version_column():
+    """Adds the model_version column to the detection_results table."""
+    engine = create_engine(DATABASE_URL)
+    
+    with engine.connect() as connection:
+        try:
+            # Check if the column already exists
+            check_column_query = text(
+                """SELECT column_name 
+                   FROM information_schema.columns 
+                   WHERE table_name='detection_results' AND column_name='model_version'"""
+            )
+            result = connection.execute(check_column_query).fetchone()
+            
+            if result:
+                print("Column 'model_version' already exists in 'detection_results'. Skipping.")
+            else:
+                connection.execute(text('ALTER TABLE detection_results ADD COLUMN model_version VARCHAR(50)'))
+                print("Successfully added column 'model_version' to 'detection_results'.")
+        except Exception as e:
+            print(f"Error adding column 'model_version': {e}")
+
+        # Commit the transaction to make the changes persistent
+        connection.commit()
+
+if __name__ == "__main__":
+    print("Starting database migration...")
+    add_model_version_column()
+    print("Migration complete.")
@@ -0,0 +1,289 @@
+# Model Backends - Export model/best.pt to faster CPU runtimes and load the configured one
+# Supported backends: pytorch (default), onnx (ONNX Runtime), openvino (OpenVINO IR), torchscript,
+# onnx-int8 (INT8 quantized ONNX produced by quantize_model.py), synthetic (no model, for load tests)
+# Loaded models run through lean_predictor.LeanPredictor (LEAN_INFERENCE), otherwise as ultralytics
+# YOLO objects wrapped in preprocess.PreprocessedModel unless PREALLOCATED_PREPROCESS=false
+#
+# Export and verify:  python model_backends.py --backend onnx
+# Then run with:      INFERENCE_BACKEND=onnx gunicorn ... app:app
+#
+# An exported artifact is only used once it has been checked against the PyTorch reference:
+# the export command writes <artifact>.verify.json and load_model() falls back to best.pt
+# when that report is missing or failed (unless INFERENCE_BACKEND_REQUIRE_VERIFIED=false).
+
+import glob
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from config import Config
+from inference_client import result_to_array
+
+BACKENDS = ('pytorch', 'onnx', 'openvino', 'torchscript', 'onnx-int8', 'synthetic')
+
+# ultralytics export format names
+EXPORT_FORMATS = {
+    'onnx': 'onnx',
+    'openvino': 'openvino',
+    'torchscript': 'torchscript',
+}
+
+# Exported with a fixed input shape: these always run at the export imgsz and with a batch of 1
+FIXED_SHAPE_BACKENDS = ('torchscript', 'onnx-int8')
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def artifact_path(weights_path, backend):
+    """Path ultralytics writes the exported model to for a given backend"""
+    stem = os.path.splitext(weights_path)[0]
+    if backend == 'pytorch':
+        return weights_path
+    if backend == 'onnx':
+        return f"{stem}.onnx"
+    if backend == 'openvino':
+        return f"{stem}_openvino_model"
+    if backend == 'torchscript':
+        return f"{stem}.torchscript"
+    if backend == 'onnx-int8':
+        return f"{stem}_int8.onnx"
+    raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+
+
+def report_path(artifact):
+    return f"{artifact.rstrip(os.sep)}.verify.json"
+
+
+def load_sample_frames(folders, limit=32):
+    """Read up to limit images from the given folders (calibration / verification frames)"""
+    frames = []
+    for folder in folders:
+        for path in sorted(glob.glob(os.path.join(folder, '*'))):
+            if not path.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            image = cv2.imread(path)
+            if image is not None:
+                frames.append(image)
+            if len(frames) >= limit:
+                return frames
+    return frames
+
+
+def box_iou(a, b):
+    """Pairwise IoU between (N, 4) and (M, 4) xyxy arrays"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    intersection = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return intersection / np.maximum(area_a[:, None] + area_b[None, :] - intersection, 1e-9)
+
+
+def compare_detections(reference, candidate, conf_threshold, iou_tolerance=0.9, conf_tolerance=0.05):
+    """
+    Match candidate boxes to reference boxes of the same class
+    Boxes whose confidence is within conf_tolerance of the threshold may legitimately
+    appear on only one side, so they are not counted as mismatches
+    """
+    ious = box_iou(reference[:, :4], candidate[:, :4])
+    same_class = reference[:, None, 5] == candidate[None, :, 5]
+    ious = np.where(same_class, ious, 0.0)
+
+    used = set()
+    matched_ious = []
+    conf_diffs = []
+    unmatched_reference = 0
+    for i in np.argsort(-reference[:, 4]):
+        order = [j for j in np.argsort(-ious[i]) if j not in used and ious[i, j] > 0]
+        if order:
+            j = order[0]
+            used.add(j)
+            matched_ious.append(float(ious[i, j]))
+            conf_diffs.append(abs(float(reference[i, 4] - candidate[j, 4])))
+        elif reference[i, 4] >= conf_threshold + conf_tolerance:
+            unmatched_reference += 1
+    unmatched_candidate = sum(
+        1 for j in range(len(candidate))
+        if j not in used and candidate[j, 4] >= conf_threshold + conf_tolerance
+    )
+
+    min_iou = min(matched_ious) if matched_ious else 1.0
+    max_conf_diff = max(conf_diffs) if conf_diffs else 0.0
+    return {
+        'matched': len(matched_ious),
+        'unmatched_reference': unmatched_reference,
+        'unmatched_candidate': unmatched_candidate,
+        'min_iou': min_iou,
+        'max_conf_diff': max_conf_diff,
+        'passed': (unmatched_reference == 0 and unmatched_candidate == 0
+                   and min_iou >= iou_tolerance and max_conf_diff <= conf_tolerance),
+    }
+
+
+def run_boxes(model, frame, conf, imgsz):
+    results = model(frame, conf=conf, imgsz=imgsz, verbose=False)
+    return result_to_array(results[0] if results else None)
+
+
+def verify_backend(reference_model, candidate_model, frames, conf=0.25, imgsz=640,
+                   iou_tolerance=0.9, conf_tolerance=0.05):
+    """Run both models on the same frames and check the candidate stays within tolerance"""
+    per_frame = []
+    reference_ms = []
+    candidate_ms = []
+    for frame in frames:
+        start = time.perf_counter()
+        reference = run_boxes(reference_model, frame, conf, imgsz)
+        reference_ms.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        candidate = run_boxes(candidate_model, frame, conf, imgsz)
+        candidate_ms.append((time.perf_counter() - start) * 1000)
+        per_frame.append(compare_detections(reference, candidate, conf, iou_tolerance, conf_tolerance))
+
+    return {
+        'frames': len(frames),
+        'conf': conf,
+        'imgsz': imgsz,
+        'iou_tolerance': iou_tolerance,
+        'conf_tolerance': conf_tolerance,
+        'failed_frames': sum(1 for r in per_frame if not r['passed']),
+        'min_iou': min((r['min_iou'] for r in per_frame), default=1.0),
+        'max_conf_diff': max((r['max_conf_diff'] for r in per_frame), default=0.0),
+        'reference_ms_median': float(np.median(reference_ms)) if reference_ms else 0.0,
+        'candidate_ms_median': float(np.median(candidate_ms)) if candidate_ms else 0.0,
+        'passed': bool(frames) and all(r['passed'] for r in per_frame),
+        'verified_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def export_model(weights_path, backend, imgsz=640, **export_kwargs):
+    """Export the PyTorch weights to the given backend, returns the artifact path"""
+    from ultralytics import YOLO
+
+    if backend == 'pytorch':
+        return weights_path
+    model = YOLO(weights_path, task='detect')
+    exported = model.export(format=EXPORT_FORMATS[backend], imgsz=imgsz, **export_kwargs)
+    return exported or artifact_path(weights_path, backend)
+
+
+def supports_imgsz(backend):
+    """Whether the backend can run at an imgsz other than the one it was exported with"""
+    return backend not in FIXED_SHAPE_BACKENDS
+
+
+def supports_batching(backend):
+    """Whether the backend accepts more than one frame per forward pass"""
+    return backend not in FIXED_SHAPE_BACKENDS
+
+
+def serving_backend():
+    """Backend frames of this process go to: the shared inference server batches on its own side"""
+    return 'inference-server' if Config.INFERENCE_SOCKET else Config.INFERENCE_BACKEND
+
+
+def is_verified(artifact):
+    try:
+        with open(report_path(artifact)) as f:
+            return bool(json.load(f).get('passed'))
+    except (OSError, ValueError):
+        return False
+
+
+def load_model(weights_path=None, backend=None, require_verified=None):
+    """
+    Load the configured inference backend, falling back to the PyTorch weights
+    Returns (model, backend_name) so callers can report what is actually running
+    """
+    weights_path = weights_path or Config.MODEL_PATH
+    backend = (backend or Config.INFERENCE_BACKEND).lower()
+    if backend == 'synthetic':
+        # Deterministic fake detections with simulated latency, no weights needed
+        from synthetic_backend import synthetic_detector
+        print(f"Using synthetic backend (seed {Config.SYNTHETIC_SEED}, latency {Config.SYNTHETIC_LATENCY_MS} ms)")
+        return synthetic_detector(), backend
+
+    if require_verified is None:
+        require_verified = Config.INFERENCE_BACKEND_REQUIRE_VERIFIED
+
+    if backend != 'pytorch':
+        try:
+            artifact = artifact_path(weights_path, backend)
+            if not os.path.exists(artifact):
+                tool = 'quantize_model.py' if backend == 'onnx-int8' else f'model_backends.py --backend {backend}'
+                raise FileNotFoundError(f"{artifact} not found, run: python {tool}")
+            if require_verified and not is_verified(artifact):
+                raise RuntimeError(f"{artifact} has no passing verification report ({report_path(artifact)})")
+            model = detection_model(artifact)
+            print(f"Loaded {backend} backend from {artifact}")
+            return model, backend
+        except Exception as e:
+            print(f"Could not load {backend} backend: {e}")
+            print(f"Falling back to PyTorch weights at {weights_path}")
+
+    return detection_model(weights_path), 'pytorch'
+
+
+def detection_model(path):
+    """LeanPredictor for path when LEAN_INFERENCE is on and it loads, else an ultralytics YOLO"""
+    from ultralytics import YOLO
+    if Config.LEAN_INFERENCE:
+        try:
+            from lean_predictor import LeanPredictor
+            return LeanPredictor(path, imgsz=Config.MODEL_IMGSZ, channels_last=Config.LEAN_CHANNELS_LAST)
+        except Exception as e:
+            print(f"Lean predictor unavailable for {path} ({e}), using ultralytics YOLO")
+    return preprocessed(YOLO(path, task='detect'))
+
+
+def preprocessed(model):
+    """Wrap an ultralytics model so frames are letterboxed into preallocated buffers (PREALLOCATED_PREPROCESS)"""
+    if not Config.PREALLOCATED_PREPROCESS:
+        return model
+    from preprocess import PreprocessedModel
+    return PreprocessedModel(model, imgsz=Config.MODEL_IMGSZ)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Export model/best.pt to a CPU inference backend and verify it')
+    parser.add_argument('--backend', choices=list(EXPORT_FORMATS), required=True)
+    parser.add_argument('--weights', default=Config.MODEL_PATH)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--frames', nargs='*', default=Config.SAMPLE_FRAME_FOLDERS,
+                        help='Folders with sample images used for verification')
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--iou-tolerance', type=float, default=0.9)
+    parser.add_argument('--conf-tolerance', type=float, default=0.05)
+    parser.add_argument('--skip-export', action='store_true', help='Only verify an existing artifact')
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    artifact = artifact_path(args.weights, args.backend)
+    if not args.skip_export:
+        # Dynamic input shape so ROI crops and latency tiers can use smaller imgsz
+        artifact = export_model(args.weights, args.backend, imgsz=args.imgsz,
+                                dynamic=args.backend not in FIXED_SHAPE_BACKENDS)
+        print(f"Exported {args.backend} model to {artifact}")
+
+    frames = load_sample_frames(args.frames)
+    if not frames:
+        raise SystemExit(f"No sample images found in {args.frames}")
+
+    report = verify_backend(YOLO(args.weights, task='detect'), YOLO(artifact, task='detect'), frames,
+                            conf=args.conf, imgsz=args.imgsz,
+                            iou_tolerance=args.iou_tolerance, conf_tolerance=args.conf_tolerance)
+    report['backend'] = args.backend
+    report['artifact'] = artifact
+    with open(report_path(artifact), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report, indent=2))
+    print("✅ Verification passed" if report['passed'] else "❌ Verification failed - backend will not be loaded")
@@ -0,0 +1,191 @@
+# Model Manager - Loads and warms the detection model on a background thread
+# Lets Flask bind immediately; detection endpoints check `ready` and answer 503 until then.
+# Also hot-swaps registry versions (model_registry.py) without dropping in-flight requests.
+
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Lifecycle states reported by /api/model/health
+LOADING = 'loading'
+WARMING = 'warming'
+READY = 'ready'
+FAILED = 'failed'
+
+
+def parse_shapes(spec):
+    """Parse '480x640,720x1280' (height x width) into [(480, 640), (720, 1280)]"""
+    shapes = []
+    for item in spec.split(','):
+        item = item.strip().lower()
+        if item:
+            height, width = item.split('x')
+            shapes.append((int(height), int(width)))
+    return shapes
+
+
+def warm_up(model, shapes, conf=0.5, runs=2):
+    """
+    Run dummy frames through the model at each resolution so lazy initialisation
+    (predictor setup, backend kernels, memory pools) happens before the first real frame
+    Returns {'HxW': latency of the last run in ms}
+    """
+    latencies = {}
+    for height, width in shapes:
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        for _ in range(max(1, runs)):
+            start = time.perf_counter()
+            model(frame, conf=conf, verbose=False)
+            elapsed = (time.perf_counter() - start) * 1000
+        latencies[f"{height}x{width}"] = round(elapsed, 1)
+    return latencies
+
+
+class ModelManager:
+    """
+    Runs loader(version) -> (model, backend) and warm_up() on a daemon thread
+    on_ready(model, backend, version) is called once the model is warm, before `ready` turns True
+
+    swap(version) loads and warms another version in the background while the current
+    model keeps serving, then publishes it through on_ready in one step
+    """
+
+    def __init__(self, loader, on_ready=None, warmup_shapes=None, max_attempts=3, retry_delay=5.0):
+        self.loader = loader
+        self.on_ready = on_ready
+        self.warmup_shapes = warmup_shapes or []
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self.state = LOADING
+        self.model = None
+        self.backend = None
+        self.version = None
+        self.error = None
+        self.attempts = 0
+        self.load_time_ms = None
+        self.warmup_ms = None
+        self.warmup_latency_ms = {}
+        self.ready_at = None
+        self.swap_state = None
+        self.swap_version = None
+        self.swap_error = None
+        self._swap_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self.state == READY
+
+    @property
+    def swapping(self):
+        return self.swap_state in (LOADING, WARMING)
+
+    def start(self, version=None):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(version,), name='model-loader', daemon=True)
+            self._thread.start()
+        return self
+
+    def adopt(self, model, backend, version=None):
+        """Mark an already loaded and warmed model as ready (no background load)"""
+        self._publish(model, backend, version, call_on_ready=False)
+        return self
+
+    def wait(self, timeout=None):
+        """Block until loading finished (ready or failed)"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    def _load_and_warm(self, version, set_state):
+        set_state(LOADING)
+        start = time.perf_counter()
+        model, backend = self.loader(version)
+        if model is None:
+            raise RuntimeError('Model loader returned no model')
+        load_time_ms = round((time.perf_counter() - start) * 1000, 1)
+        print(f"Model {version or 'default'} loaded in {load_time_ms:.0f} ms ({backend} backend), warming up...")
+
+        set_state(WARMING)
+        start = time.perf_counter()
+        latencies = warm_up(model, self.warmup_shapes)
+        warmup_ms = round((time.perf_counter() - start) * 1000, 1)
+        print(f"Model warm-up done in {warmup_ms:.0f} ms: {latencies}")
+        return model, backend, load_time_ms, warmup_ms, latencies
+
+    def _publish(self, model, backend, version, call_on_ready=True, timings=None):
+        if call_on_ready and self.on_ready:
+            self.on_ready(model, backend, version)
+        if timings:
+            self.load_time_ms, self.warmup_ms, self.warmup_latency_ms = timings
+        self.model = model
+        self.backend = backend
+        self.version = version
+        self.error = None
+        self.ready_at = datetime.utcnow()
+        self.state = READY
+
+    def _run(self, version):
+        def set_state(state):
+            self.state = state
+
+        while self.attempts < self.max_attempts:
+            self.attempts += 1
+            try:
+                model, backend, *timings = self._load_and_warm(version, set_state)
+                self._publish(model, backend, version, timings=timings)
+                return
+            except Exception as e:
+                self.error = str(e)
+                print(f"Model load attempt {self.attempts}/{self.max_attempts} failed: {e}")
+                if self.attempts < self.max_attempts:
+                    time.sleep(self.retry_delay)
+        self.state = FAILED
+        print("Server will continue without model - detection features disabled")
+
+    def swap(self, version):
+        """Start a background hot-swap to version, returns False if one is already running"""
+        with self._swap_lock:
+            if self.swapping:
+                return False
+            self.swap_state = LOADING
+            self.swap_version = version
+            self.swap_error = None
+        threading.Thread(target=self._run_swap, args=(version,), name='model-swap', daemon=True).start()
+        return True
+
+    def _run_swap(self, version):
+        def set_state(state):
+            self.swap_state = state
+
+        try:
+            model, backend, *timings = self._load_and_warm(version, set_state)
+            previous = self.version
+            self._publish(model, backend, version, timings=timings)
+            self.swap_state = None
+            print(f"Swapped model {previous or 'default'} -> {version or 'default'}")
+        except Exception as e:
+            self.swap_error = str(e)
+            self.swap_state = FAILED
+            print(f"Model swap to {version} failed, keeping {self.version or 'default'}: {e}")
+
+    def status(self):
+        return {
+            'status': self.state,
+            'model_loaded': self.ready,
+            'model_version': self.version,
+            'backend': self.backend,
+            'load_time_ms': self.load_time_ms,
+            'warmup_ms': self.warmup_ms,
+            'warmup_latency_ms': self.warmup_latency_ms,
+            'attempts': self.attempts,
+            'error': self.error,
+            'ready_at': self.ready_at.isoformat() if self.ready_at else None,
+            'swap': {
+                'status': self.swap_state,
+                'version': self.swap_version,
+                'error': self.swap_error,
+            },
+        }
@@ -0,0 +1,165 @@
+# Model Registry - Versioned model weights with metadata and an ACTIVE pointer
+#
+# Layout (Config.MODEL_REGISTRY_DIR, default model/registry):
+#   ACTIVE               name of the version every worker should serve
+#   v2/best.pt           weights (exported backends are written next to them)
+#   v2/metadata.json     version, description, sha256, created_at, ...
+#
+# Usage:  python model_registry.py register path/to/best.pt --version v2 --description "..."
+#         python model_registry.py list
+#         python model_registry.py activate v2
+# Running servers watch ACTIVE and hot-swap to the new version without a restart.
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from config import Config
+
+WEIGHTS_FILENAME = 'best.pt'
+METADATA_FILENAME = 'metadata.json'
+ACTIVE_FILENAME = 'ACTIVE'
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """Directory of versioned weights; see the module comment for the layout"""
+
+    def __init__(self, root=None):
+        self.root = root or Config.MODEL_REGISTRY_DIR
+
+    def _version_dir(self, version):
+        if not version or os.sep in version or version.startswith('.'):
+            raise ValueError(f"Invalid model version '{version}'")
+        return os.path.join(self.root, version)
+
+    def weights_path(self, version):
+        return os.path.join(self._version_dir(version), WEIGHTS_FILENAME)
+
+    def exists(self, version):
+        try:
+            return os.path.exists(self.weights_path(version))
+        except ValueError:
+            return False
+
+    def metadata(self, version):
+        path = os.path.join(self._version_dir(version), METADATA_FILENAME)
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'version': version}
+
+    def list_versions(self):
+        if not os.path.isdir(self.root):
+            return []
+        active = self.active_version()
+        versions = []
+        for name in sorted(os.listdir(self.root)):
+            if self.exists(name):
+                versions.append({**self.metadata(name), 'version': name, 'active': name == active})
+        return versions
+
+    def active_version(self):
+        """Version named in ACTIVE, or None when the registry is empty (serve model/best.pt)"""
+        try:
+            with open(os.path.join(self.root, ACTIVE_FILENAME)) as f:
+                version = f.read().strip()
+        except OSError:
+            return None
+        return version if self.exists(version) else None
+
+    def set_active(self, version):
+        if not self.exists(version):
+            raise ValueError(f"Model version '{version}' is not registered")
+        # Write then rename so watchers never read a half-written pointer
+        pointer = os.path.join(self.root, ACTIVE_FILENAME)
+        tmp_pointer = f"{pointer}.{os.getpid()}.tmp"
+        with open(tmp_pointer, 'w') as f:
+            f.write(version)
+        os.replace(tmp_pointer, pointer)
+
+    def register(self, weights_src, version, description='', **extra):
+        if self.exists(version):
+            raise ValueError(f"Model version '{version}' already exists")
+        version_dir = self._version_dir(version)
+        os.makedirs(version_dir, exist_ok=True)
+        weights_dst = self.weights_path(version)
+        shutil.copy2(weights_src, weights_dst)
+        metadata = {
+            'version': version,
+            'description': description,
+            'source': os.path.abspath(weights_src),
+            'sha256': file_sha256(weights_dst),
+            'size_bytes': os.path.getsize(weights_dst),
+            'created_at': datetime.utcnow().isoformat(),
+            **extra,
+        }
+        with open(os.path.join(version_dir, METADATA_FILENAME), 'w') as f:
+            json.dump(metadata, f, indent=2)
+        return metadata
+
+
+def watch_registry(registry, manager, interval=None):
+    """
+    Poll ACTIVE and ask the ModelManager to hot-swap when it changes
+    Every gunicorn worker (and the inference server) runs one of these, so activating a
+    version on one worker rolls it out to all of them
+    """
+    interval = interval or Config.MODEL_REGISTRY_POLL_SECONDS
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                version = registry.active_version()
+                if version and version != manager.version and manager.ready and not manager.swapping:
+                    print(f"Registry ACTIVE changed to {version}, swapping model...")
+                    manager.swap(version)
+            except Exception as e:
+                print(f"Model registry watch error: {e}")
+
+    thread = threading.Thread(target=run, name='model-registry-watch', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Manage versioned model weights')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    register_parser = subparsers.add_parser('register', help='Copy weights into the registry')
+    register_parser.add_argument('weights')
+    register_parser.add_argument('--version', required=True)
+    register_parser.add_argument('--description', default='')
+    register_parser.add_argument('--activate', action='store_true')
+    subparsers.add_parser('list', help='List registered versions')
+    activate_parser = subparsers.add_parser('activate', help='Roll out a version to running servers')
+    activate_parser.add_argument('version')
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    if args.command == 'register':
+        print(json.dumps(registry.register(args.weights, args.version, args.description), indent=2))
+        if args.activate:
+            registry.set_active(args.version)
+            print(f"Activated {args.version}")
+    elif args.command == 'list':
+        for entry in registry.list_versions():
+            marker = '*' if entry['active'] else ' '
+            print(f"{marker} {entry['version']:<16} {entry.get('created_at', ''):<28} {entry.get('description', '')}")
+    elif args.command == 'activate':
+        registry.set_active(args.version)
+        print(f"Activated {args.version}")
@@ -0,0 +1,98 @@
+# Motion Gate - Skips YOLO on live frames that barely changed since the last inferred frame
+# A steady driver produces long runs of near-identical webcam frames; for those analyze_frame
+# reuses session_data['current_detection'] instead of running a full forward pass.
+
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Per-session gate comparing each frame with the last frame that went through the model
+
+    The score is the mean absolute difference (0-255) between downscaled grayscale copies.
+    Below `threshold` the frame is skipped, except that inference is forced every
+    `max_skip_frames` frames or `max_skip_seconds` seconds so slow drifts (eyes closing
+    gradually) are still caught.
+    """
+
+    def __init__(self, threshold=3.0, width=64, max_skip_frames=10, max_skip_seconds=1.0):
+        self.threshold = threshold
+        self.width = width
+        self.max_skip_frames = max_skip_frames
+        self.max_skip_seconds = max_skip_seconds
+        self._reference = None
+        self._pending = None
+        self._last_inference = 0.0
+        self._skipped_in_row = 0
+        self.last_score = None
+        # Counters reported per session
+        self.frames = 0
+        self.skipped = 0
+        self.forced = 0
+        self.gate_ms = 0.0
+        self.inference_ms = 0.0
+        self.saved_ms = 0.0
+
+    def _thumbnail(self, frame):
+        height, width = frame.shape[:2]
+        size = (self.width, max(1, int(round(height * self.width / width))))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def should_infer(self, frame, cached=True):
+        """
+        Returns True when the frame has to go through the model; always True without a cached
+        detection to reuse (cached=False), so every False answer is a frame that really skipped YOLO
+        """
+        start = time.perf_counter()
+        self.frames += 1
+        thumbnail = self._thumbnail(frame)
+        reference = self._reference
+        infer = True
+        if cached and reference is not None and reference.shape == thumbnail.shape:
+            self.last_score = float(np.mean(cv2.absdiff(thumbnail, reference)))
+            if self.last_score < self.threshold:
+                overdue = (self._skipped_in_row >= self.max_skip_frames or
+                           time.monotonic() - self._last_inference >= self.max_skip_seconds)
+                infer = overdue
+                self.forced += int(overdue)
+        else:
+            self.last_score = None
+        if infer:
+            self._pending = thumbnail
+        else:
+            self._skipped_in_row += 1
+            self.skipped += 1
+            self.saved_ms += self.avg_inference_ms
+        self.gate_ms += (time.perf_counter() - start) * 1000
+        return infer
+
+    def record_inference(self, elapsed_ms):
+        """Make the frame just inferred the new reference"""
+        self._reference = self._pending
+        self._last_inference = time.monotonic()
+        self._skipped_in_row = 0
+        self.inference_ms += elapsed_ms
+
+    @property
+    def inferred(self):
+        return self.frames - self.skipped
+
+    @property
+    def avg_inference_ms(self):
+        return self.inference_ms / self.inferred if self.inferred else 0.0
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'inferred': self.inferred,
+            'skipped': self.skipped,
+            'forced': self.forced,
+            'skip_ratio': round(self.skipped / self.frames, 3) if self.frames else 0.0,
+            'last_score': round(self.last_score, 2) if self.last_score is not None else None,
+            'cpu_saved_ms': round(max(0.0, self.saved_ms - self.gate_ms), 1),
+            'gate_ms': round(self.gate_ms, 1),
+        }
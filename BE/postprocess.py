@@ -0,0 +1,80 @@
+# Post-processing - Array-based filtering of YOLO detections shared by every detection endpoint
+# Boxes are pulled out of a result once as an (N, 6) float32 [x1, y1, x2, y2, conf, cls] array;
+# size / confidence filters and top-k run as NumPy operations, and only the boxes that are kept
+# become Python dicts.
+
+import numpy as np
+
+from inference_client import BOX_COLUMNS, FrameBoxes, result_to_array
+
+EMPTY_BOXES = np.zeros((0, BOX_COLUMNS), dtype=np.float32)
+
+
+def boxes_array(results):
+    """(N, 6) array for the first result of a model call (ultralytics Results or FrameResult)"""
+    if not results:
+        return EMPTY_BOXES
+    result = results[0]
+    if isinstance(result.boxes, FrameBoxes):
+        return result.boxes.data
+    return result_to_array(result)
+
+
+def offset_boxes(boxes, dx, dy):
+    """Shift boxes found in a crop back to frame coordinates"""
+    if len(boxes) == 0 or (dx == 0 and dy == 0):
+        return boxes
+    shifted = boxes.copy()
+    shifted[:, [0, 2]] += dx
+    shifted[:, [1, 3]] += dy
+    return shifted
+
+
+def filter_boxes(boxes, conf_above=None, min_size=None, max_size=None):
+    """Keep boxes with conf > conf_above whose width and height are within [min_size, max_size]"""
+    if len(boxes) == 0:
+        return boxes
+    keep = np.ones(len(boxes), dtype=bool)
+    if conf_above is not None:
+        keep &= boxes[:, 4] > conf_above
+    if min_size is not None or max_size is not None:
+        # Sizes of the integer pixel box, as the per-box code measured them
+        corners = boxes[:, :4].astype(np.int32)
+        widths = corners[:, 2] - corners[:, 0]
+        heights = corners[:, 3] - corners[:, 1]
+        if min_size is not None:
+            keep &= (widths >= min_size) & (heights >= min_size)
+        if max_size is not None:
+            keep &= (widths <= max_size) & (heights <= max_size)
+    return boxes[keep]
+
+
+def top_k(boxes, k=1):
+    """The k most confident boxes, highest first"""
+    if len(boxes) <= 1:
+        return boxes[:k]
+    order = np.argsort(-boxes[:, 4], kind='stable')[:k]
+    return boxes[order]
+
+
+def class_names(boxes, names, fallback=None):
+    """Class name for each box; ids missing from names use fallback, then 'Unknown_<id>'"""
+    fallback = fallback or {}
+    return [names[i] if i in names else fallback.get(i, f'Unknown_{i}')
+            for i in boxes[:, 5].astype(np.int64).tolist()]
+
+
+def class_counts(boxes, names):
+    """{class name: number of boxes}, one bincount instead of a branch per box"""
+    if len(boxes) == 0:
+        return {}
+    ids = boxes[:, 5].astype(np.int64)
+    counts = np.bincount(ids)
+    return {names.get(i, f'Unknown_{i}'): int(counts[i]) for i in np.flatnonzero(counts).tolist()}
+
+
+def to_detections(boxes, names, fallback=None):
+    """[{'class', 'confidence', 'bbox'}] for the (few) boxes that survived filtering"""
+    labels = class_names(boxes, names, fallback)
+    return [{'class': label, 'confidence': float(row[4]), 'bbox': row[:4].tolist()}
+            for label, row in zip(labels, boxes)]
@@ -0,0 +1,157 @@
+# Pre-processing - Letterbox frames into preallocated buffers at a fixed, square input shape
+# Every frame of a batch is resized straight into a reused uint8 canvas (114-grey padding), then
+# converted BGR HWC uint8 -> RGB CHW float32 / 255 into a reused tensor buffer, so no arrays are
+# allocated per frame. The model always sees (B, 3, imgsz, imgsz), which keeps backend kernels,
+# ONNX Runtime / OpenVINO shape caches and CPU caches warm.
+#
+#   model = PreprocessedModel(YOLO('model/best.pt'), imgsz=640)
+#   model(frame, conf=0.5)   # -> [FrameResult] with boxes in frame coordinates
+
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from inference_client import FrameBoxes, FrameResult, result_to_array
+
+PAD_VALUE = 114
+STRIDE = 32
+
+
+def input_size(imgsz):
+    """imgsz rounded up to a multiple of the model stride"""
+    return -(-int(imgsz) // STRIDE) * STRIDE
+
+
+def letterbox_geometry(height, width, imgsz):
+    """(ratio, (new_w, new_h), (left, top)) that fits a height x width frame centred in imgsz x imgsz"""
+    ratio = min(imgsz / height, imgsz / width)
+    new_w = max(1, min(imgsz, int(round(width * ratio))))
+    new_h = max(1, min(imgsz, int(round(height * ratio))))
+    return ratio, (new_w, new_h), ((imgsz - new_w) // 2, (imgsz - new_h) // 2)
+
+
+def unletterbox_boxes(boxes, ratio, left, top, height, width):
+    """Map (N, 6) boxes from letterboxed input coordinates back to the original frame, in place"""
+    if len(boxes) == 0:
+        return boxes
+    boxes[:, [0, 2]] -= left
+    boxes[:, [1, 3]] -= top
+    boxes[:, :4] /= ratio
+    boxes[:, [0, 2]] = np.clip(boxes[:, [0, 2]], 0, width)
+    boxes[:, [1, 3]] = np.clip(boxes[:, [1, 3]], 0, height)
+    return boxes
+
+
+class LetterboxBuffers:
+    """
+    Per-thread canvas (B, S, S, 3) uint8 and tensor (B, 3, S, S) float32 buffers, one set per input size S
+    A set holds the largest batch seen so far (rounded up to a power of two) and smaller batches use
+    its first B frames, so a thread allocates a few sets at most however the batch size varies.
+    At most max_sizes input sizes are kept per thread, the least recently used one is dropped.
+    With channels_last the tensor is a (B, 3, S, S) view of a (B, S, S, 3) buffer (NHWC memory,
+    what torch.channels_last expects), so the conversion needs no transpose
+    """
+
+    def __init__(self, channels_last=False, max_sizes=4):
+        self.channels_last = channels_last
+        self.max_sizes = max(1, max_sizes)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.allocated_bytes = 0
+        self.evictions = 0
+        self.shapes = set()
+
+    def get(self, batch, imgsz):
+        """(canvas, tensor) views for batch frames at input size imgsz"""
+        pool = getattr(self._local, 'pool', None)
+        if pool is None:
+            pool = self._local.pool = OrderedDict()
+        buffers = pool.get(imgsz)
+        if buffers is None or len(buffers[0]) < batch:
+            capacity = 1 << (batch - 1).bit_length()
+            canvas = np.full((capacity, imgsz, imgsz, 3), PAD_VALUE, dtype=np.uint8)
+            if self.channels_last:
+                tensor = np.empty((capacity, imgsz, imgsz, 3), dtype=np.float32).transpose(0, 3, 1, 2)
+            else:
+                tensor = np.empty((capacity, 3, imgsz, imgsz), dtype=np.float32)
+            buffers = pool[imgsz] = (canvas, tensor)
+            evicted = 0
+            while len(pool) > self.max_sizes:
+                pool.popitem(last=False)
+                evicted += 1
+            with self._lock:
+                self.allocations += 1
+                self.allocated_bytes += canvas.nbytes + tensor.nbytes
+                self.evictions += evicted
+                self.shapes.add((capacity, imgsz))
+        pool.move_to_end(imgsz)
+        canvas, tensor = buffers
+        return canvas[:batch], tensor[:batch]
+
+    def letterbox(self, frames, imgsz):
+        """Fill the buffers for frames, returns (tensor, [(ratio, left, top, height, width)])"""
+        canvas, tensor = self.get(len(frames), imgsz)
+        geometry = []
+        for i, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            ratio, (new_w, new_h), (left, top) = letterbox_geometry(height, width, imgsz)
+            canvas[i].fill(PAD_VALUE)
+            region = canvas[i, top:top + new_h, left:left + new_w]
+            if (new_w, new_h) == (width, height):
+                region[...] = frame
+            else:
+                # Same interpolation as ultralytics' LetterBox, so verified backends see the same input
+                cv2.resize(frame, (new_w, new_h), dst=region, interpolation=cv2.INTER_LINEAR)
+            geometry.append((ratio, left, top, height, width))
+        # BGR HWC -> RGB CHW, scaled to 0-1, written straight into the tensor buffer
+        if self.channels_last:
+            np.divide(canvas[..., ::-1], np.float32(255), out=tensor.transpose(0, 2, 3, 1), casting='unsafe')
+        else:
+            np.divide(canvas[..., ::-1].transpose(0, 3, 1, 2), np.float32(255), out=tensor, casting='unsafe')
+        return tensor, geometry
+
+    def stats(self):
+        with self._lock:
+            return {
+                'channels_last': self.channels_last,
+                'allocations': self.allocations,
+                'allocated_mb': round(self.allocated_bytes / 1e6, 1),
+                'evictions': self.evictions,
+                'shapes': [f"{batch}x{imgsz}" for batch, imgsz in sorted(self.shapes)],
+            }
+
+
+class PreprocessedModel:
+    """
+    Callable like a YOLO model: model(frames, conf=..., imgsz=...) -> [FrameResult]
+    Letterboxes into LetterboxBuffers and hands ultralytics a ready (B, 3, S, S) tensor,
+    which it passes to the backend as is; boxes are mapped back to frame coordinates
+    imgsz is rounded up to a multiple of 32 and defaults to the export / model input size
+    """
+
+    def __init__(self, model, imgsz=640):
+        import torch
+        self._torch = torch
+        self.model = model
+        self.imgsz = imgsz
+        self.buffers = LetterboxBuffers()
+
+    @property
+    def names(self):
+        return self.model.names
+
+    def __call__(self, source, conf=0.25, imgsz=None, **kwargs):
+        frames = source if isinstance(source, (list, tuple)) else [source]
+        size = input_size(imgsz or self.imgsz)
+        tensor, geometry = self.buffers.letterbox(frames, size)
+        kwargs['verbose'] = False
+        results = self.model(self._torch.from_numpy(tensor), conf=conf, imgsz=size, **kwargs)
+        names = self.names
+        return [FrameResult(FrameBoxes(unletterbox_boxes(result_to_array(result), *frame_geometry)), names)
+                for result, frame_geometry in zip(results, geometry)]
+
+    def preprocess_stats(self):
+        return {'predictor': 'ultralytics', 'imgsz': self.imgsz, **self.buffers.stats()}
@@ -0,0 +1,150 @@
+# Progress - Live progress of video analysis jobs in a small memory-mapped file shared by every process
+# The job worker running a video writes frames processed, total frames, fps and state into the
+# job's fixed-size slot; any gunicorn worker on the node maps the same file (PROGRESS_FILE, in
+# /dev/shm by default) and answers polls and Server-Sent Events streams without a database query.
+# Each slot carries a sequence number (odd while being written) so readers never see a torn record.
+#
+#   board = ProgressBoard()
+#   tracker = board.tracker(job_id, user_id)    # tracker(frames_done, frames_total), throttled
+#   board.finish(job_id, 'completed')
+#   board.read(job_id)                          # -> {'state', 'frames_done', 'frames_total', 'fps', 'eta_seconds', ...}
+
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from config import Config
+
+# seq, job_id, user_id, state, (pad), frames_done, frames_total, fps, started_at, updated_at
+SLOT = struct.Struct('<Qqqiiqqddd')
+STATES = ('empty', 'running', 'completed', 'failed', 'queued')
+
+
+def default_progress_file():
+    folder = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(folder, 'drowsyguard-progress')
+
+
+class ProgressBoard:
+    """Fixed number of job slots (slot = job_id % slots) in a file every process maps"""
+
+    def __init__(self, path=None, slots=None):
+        self.path = path or Config.PROGRESS_FILE or default_progress_file()
+        self.slots = slots or Config.PROGRESS_SLOTS
+        size = SLOT.size * self.slots
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._lock = threading.Lock()
+
+    def _offset(self, job_id):
+        return (job_id % self.slots) * SLOT.size
+
+    def _write(self, job_id, user_id, state, frames_done, frames_total, fps, started_at):
+        offset = self._offset(job_id)
+        with self._lock:
+            seq = SLOT.unpack_from(self._map, offset)[0]
+            # Odd sequence while the record is being written
+            struct.pack_into('<Q', self._map, offset, seq + 1)
+            SLOT.pack_into(self._map, offset, seq + 1, job_id, user_id, STATES.index(state), 0,
+                           frames_done, frames_total, fps, started_at, time.time())
+            struct.pack_into('<Q', self._map, offset, seq + 2)
+
+    def _read_slot(self, job_id):
+        offset = self._offset(job_id)
+        for _ in range(100):
+            record = SLOT.unpack_from(self._map, offset)
+            if record[0] % 2 == 0 and struct.unpack_from('<Q', self._map, offset)[0] == record[0]:
+                return record
+            time.sleep(0)
+        return None
+
+    def start(self, job_id, user_id):
+        self._write(job_id, user_id, 'running', 0, 0, 0.0, time.time())
+
+    def update(self, job_id, user_id, frames_done, frames_total, fps, started_at):
+        self._write(job_id, user_id, 'running', frames_done, frames_total, fps, started_at)
+
+    def finish(self, job_id, state):
+        """Record the job's final (or retry) state, keeping its last frame counts"""
+        record = self._read_slot(job_id)
+        if record is None or record[1] != job_id:
+            return
+        _, _, user_id, _, _, frames_done, frames_total, fps, started_at, _ = record
+        self._write(job_id, user_id, state, frames_done, frames_total, fps, started_at)
+
+    def read(self, job_id, user_id=None):
+        """Progress of job_id, None when this node has no record of it (or it belongs to another user)"""
+        record = self._read_slot(job_id)
+        if record is None or record[1] != job_id or STATES[record[3]] == 'empty':
+            return None
+        _, _, owner, state, _, frames_done, frames_total, fps, started_at, updated_at = record
+        if user_id is not None and owner != user_id:
+            return None
+        eta_seconds = None
+        if frames_total > 0 and fps > 0:
+            eta_seconds = round(max(0, frames_total - frames_done) / fps, 1)
+        return {
+            'job_id': job_id,
+            'state': STATES[state],
+            'frames_done': frames_done,
+            'frames_total': frames_total,
+            'percent': round(100.0 * frames_done / frames_total, 1) if frames_total > 0 else None,
+            'fps': round(fps, 1),
+            'eta_seconds': eta_seconds,
+            'elapsed_seconds': round(updated_at - started_at, 1),
+            'updated_at': updated_at,
+        }
+
+    def tracker(self, job_id, user_id, interval=None):
+        """ProgressTracker publishing into this board"""
+        self.start(job_id, user_id)
+        return ProgressTracker(self, job_id, user_id, interval)
+
+
+class ProgressTracker:
+    """
+    progress(frames_done, frames_total) callback for the video pipeline: smooths fps and
+    writes to the board at most every interval seconds (and on the last frame)
+    """
+
+    def __init__(self, board, job_id, user_id, interval=None):
+        self.board = board
+        self.job_id = job_id
+        self.user_id = user_id
+        self.interval = Config.PROGRESS_INTERVAL if interval is None else interval
+        self.started_at = time.time()
+        self.fps = 0.0
+        self._last_time = time.perf_counter()
+        self._last_done = 0
+
+    def __call__(self, frames_done, frames_total):
+        now = time.perf_counter()
+        elapsed = now - self._last_time
+        if elapsed < self.interval and frames_done != frames_total:
+            return
+        if elapsed > 0 and frames_done > self._last_done:
+            rate = (frames_done - self._last_done) / elapsed
+            # Exponential smoothing, so batch boundaries and stage stalls do not make the ETA jump
+            self.fps = rate if self.fps == 0.0 else 0.7 * self.fps + 0.3 * rate
+        self._last_time, self._last_done = now, frames_done
+        self.board.update(self.job_id, self.user_id, frames_done, max(frames_total, frames_done),
+                          self.fps, self.started_at)
+
+
+_board = None
+
+
+def progress_board():
+    """Process-wide ProgressBoard on PROGRESS_FILE"""
+    global _board
+    if _board is None:
+        _board = ProgressBoard()
+    return _board
@@ -0,0 +1,209 @@
+# INT8 Quantization - Post-training quantization of model/best.pt for CPU inference
+# Exports best.pt to ONNX, quantizes it with ONNX Runtime and compares INT8 against fp32
+#
+# Usage:  python quantize_model.py                      (static, calibrated on sample frames)
+#         python quantize_model.py --mode dynamic       (weights only, no calibration)
+# Serve:  INFERENCE_BACKEND=onnx-int8 python app.py
+#
+# The INT8 model is quantized from a static (1, 3, imgsz, imgsz) export, so it takes one frame per
+# forward pass: video uploads and micro-batching run with a batch size of 1 on this backend.
+#
+# The sample frames are split into a calibration set and a held-out evaluation set (--eval-fraction),
+# so the agreement is measured on frames the quantizer never saw. The report (per-class agreement,
+# box agreement, p50/p99 latency) is written to model/best_int8.onnx.verify.json, which is also what
+# load_model() checks before using it.
+
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from config import Config
+from model_backends import (artifact_path, compare_detections, export_model, load_sample_frames,
+                            report_path, run_boxes)
+
+CLASS_NAMES = ["Drowsiness", "awake", "yawn"]
+NO_DETECTION = 'none'
+
+
+def letterbox_input(image, imgsz):
+    """Preprocess a BGR frame the way the exported ONNX graph expects (1, 3, imgsz, imgsz) float32"""
+    height, width = image.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = resized
+    blob = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return np.ascontiguousarray(blob[None])
+
+
+class FrameCalibrationReader:
+    """ONNX Runtime CalibrationDataReader over the sample frames"""
+
+    def __init__(self, frames, input_name, imgsz):
+        self._inputs = iter([{input_name: letterbox_input(frame, imgsz)} for frame in frames])
+
+    def get_next(self):
+        return next(self._inputs, None)
+
+
+def split_frames(frames, eval_fraction=0.25, seed=0):
+    """Shuffle with a fixed seed and split into (calibration frames, held-out evaluation frames)"""
+    order = np.random.default_rng(seed).permutation(len(frames))
+    eval_count = min(len(frames) - 1, max(1, int(round(len(frames) * eval_fraction))))
+    return [frames[i] for i in order[eval_count:]], [frames[i] for i in order[:eval_count]]
+
+
+def quantize(fp32_path, int8_path, frames, mode='static', imgsz=640):
+    """Write an INT8 copy of the fp32 ONNX model"""
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_dynamic, quantize_static
+    import onnxruntime as ort
+
+    if mode == 'dynamic':
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        return int8_path
+
+    input_name = ort.InferenceSession(fp32_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+    quantize_static(fp32_path, int8_path, FrameCalibrationReader(frames, input_name, imgsz),
+                    quant_format=QuantFormat.QDQ,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8,
+                    per_channel=True)
+    return int8_path
+
+
+def top_class(boxes, names):
+    if len(boxes) == 0:
+        return NO_DETECTION
+    best = boxes[np.argmax(boxes[:, 4])]
+    return names.get(int(best[5]), f'Unknown_{int(best[5])}')
+
+
+def measure(model, frames, conf, imgsz, repeats):
+    """Run every frame `repeats` times, returns (boxes of the last run, latencies in ms)"""
+    latencies = []
+    outputs = []
+    for frame in frames:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            boxes = run_boxes(model, frame, conf, imgsz)
+            latencies.append((time.perf_counter() - start) * 1000)
+        outputs.append(boxes)
+    return outputs, latencies
+
+
+def build_report(fp32_outputs, int8_outputs, fp32_ms, int8_ms, names, conf, min_agreement):
+    """Per-class top-detection agreement, box agreement and latency percentiles"""
+    per_class = {}
+    for name in list(CLASS_NAMES) + [NO_DETECTION]:
+        per_class[name] = {'frames': 0, 'agree': 0, 'int8_predicted': {}}
+    for reference, candidate in zip(fp32_outputs, int8_outputs):
+        expected = top_class(reference, names)
+        actual = top_class(candidate, names)
+        bucket = per_class.setdefault(expected, {'frames': 0, 'agree': 0, 'int8_predicted': {}})
+        bucket['frames'] += 1
+        bucket['agree'] += int(expected == actual)
+        bucket['int8_predicted'][actual] = bucket['int8_predicted'].get(actual, 0) + 1
+    for bucket in per_class.values():
+        bucket['agreement'] = bucket['agree'] / bucket['frames'] if bucket['frames'] else None
+
+    box_checks = [compare_detections(r, c, conf, iou_tolerance=0.5, conf_tolerance=0.15)
+                  for r, c in zip(fp32_outputs, int8_outputs)]
+    frames = len(fp32_outputs)
+    overall = sum(b['agree'] for b in per_class.values()) / frames if frames else 0.0
+
+    def latency(values):
+        return {
+            'p50_ms': float(np.percentile(values, 50)) if values else 0.0,
+            'p99_ms': float(np.percentile(values, 99)) if values else 0.0,
+            'mean_ms': float(np.mean(values)) if values else 0.0,
+        }
+
+    fp32_latency = latency(fp32_ms)
+    int8_latency = latency(int8_ms)
+    return {
+        'frames': frames,
+        'conf': conf,
+        'per_class_agreement': per_class,
+        'overall_agreement': overall,
+        'box_agreement': sum(1 for b in box_checks if b['passed']) / frames if frames else 0.0,
+        'latency': {'fp32': fp32_latency, 'int8': int8_latency},
+        'speedup_p50': fp32_latency['p50_ms'] / int8_latency['p50_ms'] if int8_latency['p50_ms'] else None,
+        'min_agreement': min_agreement,
+        'passed': frames > 0 and overall >= min_agreement,
+        'verified_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def print_report(report):
+    print("\n=== INT8 vs fp32 ===")
+    print(f"Calibration frames: {report.get('calibration_frames')}  held-out evaluation frames: {report['frames']}")
+    print(f"Frames: {report['frames']}  overall agreement: {report['overall_agreement']:.1%}  "
+          f"box agreement: {report['box_agreement']:.1%}")
+    for name, bucket in report['per_class_agreement'].items():
+        if bucket['frames']:
+            print(f"  {name:<12} {bucket['agree']:>4}/{bucket['frames']:<4} ({bucket['agreement']:.1%})  "
+                  f"int8 predicted: {bucket['int8_predicted']}")
+    for precision in ('fp32', 'int8'):
+        stats = report['latency'][precision]
+        print(f"  {precision}: p50 {stats['p50_ms']:.1f} ms  p99 {stats['p99_ms']:.1f} ms")
+    if report['speedup_p50']:
+        print(f"  p50 speedup: {report['speedup_p50']:.2f}x")
+
+
+if __name__ == '__main__':
+    import argparse
+    from ultralytics import YOLO
+
+    parser = argparse.ArgumentParser(description='Quantize model/best.pt to INT8 and report accuracy/latency')
+    parser.add_argument('--weights', default=Config.MODEL_PATH)
+    parser.add_argument('--mode', choices=['static', 'dynamic'], default='static')
+    parser.add_argument('--frames', nargs='*', default=Config.SAMPLE_FRAME_FOLDERS,
+                        help='Folders with sample images for calibration and evaluation')
+    parser.add_argument('--max-frames', type=int, default=64)
+    parser.add_argument('--eval-fraction', type=float, default=0.25,
+                        help='Share of the sample frames held out of calibration for the agreement report')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the calibration/evaluation split')
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per frame')
+    parser.add_argument('--min-agreement', type=float, default=0.9,
+                        help='Minimum top-class agreement for the artifact to be loadable')
+    args = parser.parse_args()
+
+    frames = load_sample_frames(args.frames, limit=args.max_frames)
+    if len(frames) < 2:
+        raise SystemExit(f"Need at least 2 sample images in {args.frames} (calibration + evaluation)")
+    calibration_frames, eval_frames = split_frames(frames, args.eval_fraction, args.seed)
+    print(f"Loaded {len(frames)} sample frames: {len(calibration_frames)} for calibration, "
+          f"{len(eval_frames)} held out for evaluation")
+
+    fp32_path = artifact_path(args.weights, 'onnx')
+    if not os.path.exists(fp32_path):
+        # Static shape (batch 1) so the calibrated graph matches what the server feeds it
+        fp32_path = export_model(args.weights, 'onnx', imgsz=args.imgsz, dynamic=False, simplify=True)
+    int8_path = quantize(fp32_path, artifact_path(args.weights, 'onnx-int8'), calibration_frames,
+                         mode=args.mode, imgsz=args.imgsz)
+    print(f"Wrote {args.mode} INT8 model to {int8_path}")
+
+    fp32_model = YOLO(fp32_path, task='detect')
+    int8_model = YOLO(int8_path, task='detect')
+    names = dict(fp32_model.names) if fp32_model.names else dict(enumerate(CLASS_NAMES))
+    fp32_outputs, fp32_ms = measure(fp32_model, eval_frames, args.conf, args.imgsz, args.repeats)
+    int8_outputs, int8_ms = measure(int8_model, eval_frames, args.conf, args.imgsz, args.repeats)
+
+    report = build_report(fp32_outputs, int8_outputs, fp32_ms, int8_ms, names, args.conf, args.min_agreement)
+    report.update({'mode': args.mode, 'backend': 'onnx-int8', 'artifact': int8_path, 'reference': fp32_path,
+                   'calibration_frames': len(calibration_frames) if args.mode == 'static' else 0,
+                   'eval_fraction': args.eval_fraction, 'split_seed': args.seed})
+    with open(report_path(int8_path), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print_report(report)
+    print(f"\nReport written to {report_path(int8_path)}")
+    print("✅ INT8 model can be served with INFERENCE_BACKEND=onnx-int8" if report['passed']
+          else "❌ Agreement below threshold - INT8 model will not be loaded")
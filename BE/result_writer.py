@@ -0,0 +1,163 @@
+# Result Writer - Write-behind buffer for detection_results rows of live sessions
+# analyze-frame used to open a session, add one DetectionResult and commit for nearly every frame:
+# one fsync-bound transaction per frame per driver. Rows are now appended to an in-memory buffer
+# and a background thread writes them with one multi-row INSERT (SQLAlchemy insertmanyvalues)
+# per transaction, every RESULT_FLUSH_ROWS rows or RESULT_FLUSH_INTERVAL_MS milliseconds,
+# whichever comes first. Session stop/end flush before the session is finalised and the process
+# flushes at exit, so a finished session's results are always in the database.
+# A batch the database rejects as a whole for an integrity error (e.g. a row of a session deleted by
+# clear-history) is retried row by row and only the failing rows are dropped; other errors (database
+# unreachable) keep the batch buffered for the next flush.
+#
+#   writer = ResultWriter(SessionLocal).start()
+#   writer.add({'session_id': 1, 'detection_class': 'awake', 'confidence': 0.9, ...})
+#   writer.flush()                  # synchronous, e.g. before reading a session's results
+#   writer.stop()                   # final flush
+
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from config import Config
+from database import DetectionResult, SessionLocal
+
+
+class ResultWriter:
+    """Buffers DetectionResult rows (dicts of column values) and inserts them in batches"""
+
+    def __init__(self, session_factory=SessionLocal, flush_rows=None, flush_interval_ms=None, max_buffer=None):
+        self.session_factory = session_factory
+        self.flush_rows = flush_rows or Config.RESULT_FLUSH_ROWS
+        self.flush_interval = (flush_interval_ms or Config.RESULT_FLUSH_INTERVAL_MS) / 1000.0
+        # Rows kept while the database is unreachable; the oldest are dropped beyond this
+        self.max_buffer = max_buffer or Config.RESULT_BUFFER_MAX_ROWS
+        self._rows = []
+        self._cond = threading.Condition()
+        # Serialises flushes, so a synchronous flush() waits for one the thread has in progress
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.rows_rejected = 0
+        self.flushes = 0
+        self.failures = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def add(self, row):
+        """Queue one row; the frame's time is taken now, not at flush time"""
+        row.setdefault('timestamp', datetime.utcnow())
+        with self._cond:
+            self._rows.append(row)
+            if len(self._rows) > self.max_buffer:
+                del self._rows[:len(self._rows) - self.max_buffer]
+                self.rows_dropped += 1
+            if len(self._rows) >= self.flush_rows:
+                self._cond.notify()
+
+    def flush(self):
+        """Write every buffered row now; returns the number written (0 on failure, rows kept)"""
+        with self._flush_lock:
+            with self._cond:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            start = time.perf_counter()
+            db = self.session_factory()
+            try:
+                db.execute(insert(DetectionResult), rows)
+                db.commit()
+            except IntegrityError as e:
+                db.rollback()
+                print(f"Detection results rejected ({e.orig}), writing {len(rows)} rows one by one")
+                rows = self._insert_each(db, rows)
+            except Exception as e:
+                db.rollback()
+                self._requeue(rows, e)
+                return 0
+            finally:
+                db.close()
+            if not rows:
+                return 0
+            elapsed = (time.perf_counter() - start) * 1000
+            with self._cond:
+                self.rows_written += len(rows)
+                self.flushes += 1
+                self.last_flush_ms = elapsed
+                self.max_flush_ms = max(self.max_flush_ms, elapsed)
+                self._total_flush_ms += elapsed
+            return len(rows)
+
+    def _requeue(self, rows, error):
+        """Put rows back in front of rows added meanwhile, for the next flush"""
+        with self._cond:
+            self._rows[:0] = rows
+            overflow = len(self._rows) - self.max_buffer
+            if overflow > 0:
+                del self._rows[:overflow]
+                self.rows_dropped += overflow
+            self.failures += 1
+        print(f"Could not write {len(rows)} detection results: {error}")
+
+    def _insert_each(self, db, rows):
+        """
+        Insert rows one transaction each; drops (and counts) rows that violate a constraint,
+        requeues the rest when the database fails otherwise. Returns the rows written
+        """
+        written = []
+        for i, row in enumerate(rows):
+            try:
+                db.execute(insert(DetectionResult), [row])
+                db.commit()
+                written.append(row)
+            except IntegrityError as e:
+                db.rollback()
+                with self._cond:
+                    self.rows_rejected += 1
+                print(f"Dropped detection result of session {row.get('session_id')}: {e.orig}")
+            except Exception as e:
+                db.rollback()
+                self._requeue(rows[i:], e)
+                break
+        return written
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._rows) >= self.flush_rows or self._stop.is_set(),
+                                    timeout=self.flush_interval)
+            self.flush()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='result-writer', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Stop the thread and write what is left"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'buffer_depth': len(self._rows),
+                'rows_written': self.rows_written,
+                'rows_dropped': self.rows_dropped,
+                'rows_rejected': self.rows_rejected,
+                'flushes': self.flushes,
+                'failures': self.failures,
+                'rows_per_flush': round(self.rows_written / self.flushes, 1) if self.flushes else 0.0,
+                'last_flush_ms': round(self.last_flush_ms, 2),
+                'avg_flush_ms': round(self._total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+                'max_flush_ms': round(self.max_flush_ms, 2),
+            }
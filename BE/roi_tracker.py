@@ -0,0 +1,66 @@
+# ROI Tracker - Runs live inference on a padded crop around the last face instead of the whole frame
+# Once analyze_frame has found the driver's face, nearly all of the signal is inside that box,
+# so the crop is inferred at a smaller imgsz and the boxes are mapped back to frame coordinates.
+# A full-frame pass still runs every `full_frame_interval` inferences and whenever the crop loses the face.
+# The face box is kept in the coordinates of the frame the client sent, so a change of decode scale
+# (frame_decoder.py) between frames does not move the crop.
+
+
+class RoiTracker:
+    """Per-session tracking state; see the module comment"""
+
+    def __init__(self, padding=0.5, imgsz=320, full_frame_interval=15, min_crop=96):
+        self.padding = padding
+        self.imgsz = imgsz
+        self.full_frame_interval = max(1, full_frame_interval)
+        self.min_crop = min_crop
+        self.bbox = None
+        self._since_full = 0
+        # Counters reported per session
+        self.roi_frames = 0
+        self.full_frames = 0
+        self.lost = 0
+
+    def region(self, frame, scale=1.0):
+        """
+        (x1, y1, x2, y2) crop of frame for the next inference, or None for a full-frame pass;
+        scale maps frame pixels to client coordinates (the decode scale)
+        """
+        if self.bbox is None or self._since_full >= self.full_frame_interval:
+            self._since_full = 0
+            self.full_frames += 1
+            return None
+
+        height, width = frame.shape[:2]
+        x1, y1, x2, y2 = (v / scale for v in self.bbox)
+        pad_x = max((x2 - x1) * self.padding, (self.min_crop - (x2 - x1)) / 2)
+        pad_y = max((y2 - y1) * self.padding, (self.min_crop - (y2 - y1)) / 2)
+        region = (max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y)),
+                  min(width, int(x2 + pad_x)), min(height, int(y2 + pad_y)))
+        if region[2] - region[0] < 2 or region[3] - region[1] < 2:
+            self.bbox = None
+            self.full_frames += 1
+            return None
+        self._since_full += 1
+        self.roi_frames += 1
+        return region
+
+    def update(self, bbox):
+        """Record the final (smoothed) face box of this frame in client coordinates"""
+        self.bbox = tuple(float(v) for v in bbox)
+
+    def miss(self, region):
+        """No valid face this frame; a crop miss forces the next pass onto the full frame"""
+        if region is not None:
+            self.lost += 1
+        self.bbox = None
+
+    def stats(self):
+        total = self.roi_frames + self.full_frames
+        return {
+            'roi_frames': self.roi_frames,
+            'full_frames': self.full_frames,
+            'lost': self.lost,
+            'roi_ratio': round(self.roi_frames / total, 3) if total else 0.0,
+            'imgsz': self.imgsz,
+        }
@@ -0,0 +1,119 @@
+# Synthetic Backend - Stand-in detector for load testing without the model (INFERENCE_BACKEND=synthetic)
+# Detections are derived from the frame content and SYNTHETIC_SEED, so the same frame always gives the
+# same result regardless of request order; inference latency is simulated with time.sleep. This lets
+# the HTTP, session and DB path be load-tested on any box and keeps model cost out of the numbers.
+
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from config import Config
+from inference_client import FrameBoxes, FrameResult
+
+
+def parse_latency(spec):
+    """
+    Latency spec in ms: '40' (fixed), 'uniform:20,60', 'normal:40,8' (mean, std)
+    or 'lognormal:40,0.3' (median, sigma); returns (kind, params)
+    """
+    spec = str(spec).strip().lower()
+    kind, _, params = spec.partition(':')
+    if not params:
+        return 'fixed', (float(kind),)
+    values = tuple(float(v) for v in params.split(','))
+    if kind not in ('uniform', 'normal', 'lognormal') or len(values) != 2:
+        raise ValueError(f"Invalid synthetic latency '{spec}'")
+    return kind, values
+
+
+class SyntheticDetector:
+    """
+    Callable like a YOLO model: model(frames, conf=...) -> [FrameResult]
+    Each frame gets one face-sized box (or none with probability empty_rate) whose class
+    follows class_weights; a batch of n frames sleeps for one latency sample plus
+    batch_scaling of a sample for every extra frame
+    """
+
+    def __init__(self, seed=0, latency='40', class_weights=None, empty_rate=0.05, batch_scaling=0.35, names=None):
+        self.seed = int(seed)
+        self.latency = parse_latency(latency)
+        self.names = dict(names or Config.DETECTION_CLASSES)
+        weights = np.asarray(class_weights or [1.0] * len(self.names), dtype=np.float64)
+        self.class_weights = weights / weights.sum()
+        self.empty_rate = empty_rate
+        self.batch_scaling = batch_scaling
+        self._latency_rng = np.random.default_rng(self.seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.frames = 0
+        self.simulated_ms = 0.0
+
+    def _sample_latency_ms(self):
+        kind, params = self.latency
+        with self._lock:
+            if kind == 'fixed':
+                value = params[0]
+            elif kind == 'uniform':
+                value = self._latency_rng.uniform(*params)
+            elif kind == 'normal':
+                value = self._latency_rng.normal(*params)
+            else:
+                value = params[0] * float(np.exp(self._latency_rng.normal(0.0, params[1])))
+        return max(0.0, float(value))
+
+    def _frame_rng(self, frame):
+        # Sparse sample of the pixels is enough to tell frames apart and stays cheap
+        digest = zlib.crc32(np.ascontiguousarray(frame[::16, ::16]).tobytes())
+        return np.random.default_rng([self.seed, digest, *frame.shape])
+
+    def detect_array(self, frame, conf=0.25):
+        """(N, 6) [x1, y1, x2, y2, conf, cls] boxes for one frame"""
+        rng = self._frame_rng(frame)
+        if rng.random() < self.empty_rate:
+            return np.zeros((0, 6), dtype=np.float32)
+        height, width = frame.shape[:2]
+        size = rng.uniform(0.3, 0.5) * min(height, width)
+        cx = width / 2 + rng.uniform(-0.15, 0.15) * width
+        cy = height / 2 + rng.uniform(-0.15, 0.15) * height
+        box = [max(0.0, cx - size / 2), max(0.0, cy - size / 2),
+               min(width - 1.0, cx + size / 2), min(height - 1.0, cy + size / 2),
+               rng.uniform(0.55, 0.95),
+               rng.choice(len(self.class_weights), p=self.class_weights)]
+        boxes = np.asarray([box], dtype=np.float32)
+        return boxes[boxes[:, 4] >= conf]
+
+    def __call__(self, source, conf=0.25, **kwargs):
+        frames = source if isinstance(source, (list, tuple)) else [source]
+        delay_ms = self._sample_latency_ms()
+        if len(frames) > 1:
+            delay_ms += sum(self._sample_latency_ms() for _ in frames[1:]) * self.batch_scaling
+        time.sleep(delay_ms / 1000.0)
+        with self._lock:
+            self.calls += 1
+            self.frames += len(frames)
+            self.simulated_ms += delay_ms
+        return [FrameResult(FrameBoxes(self.detect_array(frame, conf)), self.names) for frame in frames]
+
+    def synthetic_stats(self):
+        """Simulated model cost, to subtract from end-to-end load test latency"""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'frames': self.frames,
+                'simulated_ms_total': round(self.simulated_ms, 1),
+                'simulated_ms_per_call': round(self.simulated_ms / self.calls, 2) if self.calls else 0.0,
+                'latency': {'kind': self.latency[0], 'params': list(self.latency[1])},
+                'seed': self.seed,
+            }
+
+
+def synthetic_detector():
+    """SyntheticDetector configured from Config.SYNTHETIC_*"""
+    weights = [float(w) for w in Config.SYNTHETIC_CLASS_WEIGHTS.split(',')] if Config.SYNTHETIC_CLASS_WEIGHTS else None
+    return SyntheticDetector(seed=Config.SYNTHETIC_SEED,
+                             latency=Config.SYNTHETIC_LATENCY_MS,
+                             class_weights=weights,
+                             empty_rate=Config.SYNTHETIC_EMPTY_RATE,
+                             batch_scaling=Config.SYNTHETIC_BATCH_SCALING)
@@ -0,0 +1,44 @@
+# Test setup - BE modules are imported flat (as app.py does), against a throwaway sqlite database
+
+import os
+import sys
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """sessionmaker on a fresh sqlite file with every table created and foreign keys enforced"""
+    from database import Base
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.sqlite'}")
+
+    @event.listens_for(engine, 'connect')
+    def enable_foreign_keys(connection, _):
+        connection.execute('PRAGMA foreign_keys=ON')
+
+    Base.metadata.create_all(engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def detection_session(session_factory):
+    """Id of a live detection session owned by a new user"""
+    from database import DetectionSession, User
+
+    db = session_factory()
+    user = User(username='driver', email='driver@example.com', password_hash='x')
+    db.add(user)
+    db.commit()
+    session = DetectionSession(user_id=user.id, session_type='live')
+    db.add(session)
+    db.commit()
+    session_id = session.id
+    db.close()
+    return session_id
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from frame_sampler import FrameSampler, interpolate_boxes, parse_sampling
+
+
+@pytest.mark.parametrize('spec, expected', [
+    ('all', ('all', None)),
+    ('stride:4', ('stride', 4.0)),
+    (' Time:2.5 ', ('time', 2.5)),
+    ('scene:6', ('scene', 6.0)),
+])
+def test_parse_sampling(spec, expected):
+    assert parse_sampling(spec) == expected
+
+
+def test_parse_sampling_scene_defaults_to_motion_threshold():
+    policy, value = parse_sampling('scene')
+    assert policy == 'scene' and value > 0
+
+
+@pytest.mark.parametrize('spec', ['every:2', 'stride', 'time:0', 'stride:-1'])
+def test_parse_sampling_rejects_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        parse_sampling(spec)
+
+
+def inferred_indices(sampler, count, frame=None):
+    frame = np.zeros((48, 64, 3), dtype=np.uint8) if frame is None else frame
+    return [i for i in range(count) if sampler.should_infer(i, frame, last=i == count - 1)]
+
+
+def test_stride_sampler():
+    sampler = FrameSampler.from_spec('stride:4', fps=30)
+    assert sampler.max_gap == 4
+    assert inferred_indices(sampler, 10) == [0, 4, 8, 9]
+
+
+def test_time_sampler_follows_video_time():
+    sampler = FrameSampler.from_spec('time:2', fps=10)
+    assert sampler.max_gap == 5
+    assert inferred_indices(sampler, 21) == [0, 5, 10, 15, 20]
+    assert sampler.stats()['inferred'] == 5
+
+
+def test_scene_sampler_bounds_gap_on_static_video():
+    sampler = FrameSampler.from_spec('scene:3', fps=10, max_gap_seconds=1.0)
+    assert sampler.max_gap == 10
+    assert inferred_indices(sampler, 25) == [0, 10, 20, 24]
+
+
+def test_all_sampler_infers_every_frame():
+    sampler = FrameSampler.from_spec('all', fps=25)
+    assert inferred_indices(sampler, 5) == [0, 1, 2, 3, 4]
+    assert sampler.stats()['inferred_ratio'] == 1.0
+
+
+def boxes(*rows):
+    return np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+
+def test_interpolate_pairs_boxes_of_same_class():
+    before = boxes([0, 0, 100, 100, 0.6, 1])
+    after = boxes([20, 10, 120, 110, 0.8, 1])
+    result = interpolate_boxes(before, after, 0.5)
+    np.testing.assert_allclose(result, boxes([10, 5, 110, 105, 0.7, 1]), rtol=1e-6)
+
+
+def test_interpolate_keeps_unpaired_boxes_from_nearer_frame():
+    before = boxes([0, 0, 100, 100, 0.6, 0])
+    after = boxes([0, 0, 100, 100, 0.8, 2])
+    np.testing.assert_array_equal(interpolate_boxes(before, after, 0.25), before)
+    np.testing.assert_array_equal(interpolate_boxes(before, after, 0.75), after)
+
+
+def test_interpolate_does_not_pair_distant_boxes():
+    before = boxes([0, 0, 10, 10, 0.5, 1])
+    after = boxes([500, 500, 510, 510, 0.5, 1])
+    np.testing.assert_array_equal(interpolate_boxes(before, after, 0.4), before)
+
+
+def test_interpolate_empty_frames():
+    assert interpolate_boxes(boxes(), boxes(), 0.5).shape == (0, 6)
+    only_after = boxes([0, 0, 10, 10, 0.5, 1])
+    assert interpolate_boxes(boxes(), only_after, 0.2).shape == (0, 6)
+    np.testing.assert_array_equal(interpolate_boxes(boxes(), only_after, 0.8), only_after)
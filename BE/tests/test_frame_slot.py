@@ -0,0 +1,88 @@
+import threading
+import time
+
+from frame_slot import FrameSlot, SlotTotals
+
+
+def make_slot(**kwargs):
+    kwargs.setdefault('stale_seconds', 60)
+    kwargs.setdefault('wait_timeout', 5)
+    return FrameSlot(totals=SlotTotals(), **kwargs)
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'condition not reached'
+        time.sleep(0.005)
+
+
+def test_free_slot_admits_frame():
+    slot = make_slot()
+    assert slot.acquire(1)
+    slot.release()
+    assert slot.stats()['processed'] == 1
+
+
+def test_stale_sequence_is_dropped():
+    slot = make_slot()
+    assert slot.acquire(5)
+    slot.release()
+    assert not slot.acquire(5)
+    assert not slot.acquire(3)
+    assert slot.acquire(6)
+    slot.release()
+    assert slot.stats() == {'processed': 2, 'dropped': 2, 'last_seq': 6}
+
+
+def test_stale_window_expires():
+    slot = make_slot(stale_seconds=0)
+    assert slot.acquire(5)
+    slot.release()
+    # A client that restarted its numbering is accepted again
+    assert slot.acquire(1)
+    slot.release()
+
+
+def test_newer_frame_supersedes_waiting_frame():
+    slot = make_slot()
+    assert slot.acquire(1)
+    results = {}
+
+    def run(seq):
+        results[seq] = slot.acquire(seq)
+        if results[seq]:
+            slot.release()
+
+    waiting = threading.Thread(target=run, args=(2,))
+    waiting.start()
+    wait_until(lambda: slot._waiting is not None)
+    newer = threading.Thread(target=run, args=(3,))
+    newer.start()
+    waiting.join(2)
+    assert results == {2: False}
+
+    slot.release()
+    newer.join(2)
+    assert results == {2: False, 3: True}
+    assert slot.stats()['last_seq'] == 3
+
+
+def test_out_of_order_frame_behind_waiting_frame_is_dropped():
+    slot = make_slot()
+    assert slot.acquire(1)
+    waiting = threading.Thread(target=lambda: slot.acquire(3) and slot.release())
+    waiting.start()
+    wait_until(lambda: slot._waiting is not None)
+    assert not slot.acquire(2)
+    slot.release()
+    waiting.join(2)
+    assert slot.stats()['last_seq'] == 3
+
+
+def test_waiting_frame_times_out():
+    slot = make_slot(wait_timeout=0.05)
+    assert slot.acquire(1)
+    assert not slot.acquire(2)
+    slot.release()
+    assert slot.totals.stats() == {'processed': 1, 'dropped': 1, 'drop_rate': 0.5}
@@ -0,0 +1,33 @@
+import numpy as np
+
+from inference_client import pack_batch, unpack_batch
+
+
+def random_boxes(count, seed):
+    return np.random.default_rng(seed).random((count, 6), dtype=np.float32)
+
+
+def test_pack_unpack_round_trip():
+    arrays = [random_boxes(3, 0), random_boxes(0, 1), random_boxes(1, 2), random_boxes(0, 3)]
+    unpacked = unpack_batch(pack_batch(arrays), len(arrays))
+    assert len(unpacked) == len(arrays)
+    for original, result in zip(arrays, unpacked):
+        assert result.shape == original.shape
+        np.testing.assert_array_equal(result, original)
+
+
+def test_pack_unpack_all_frames_empty():
+    arrays = [np.zeros((0, 6), dtype=np.float32)] * 2
+    unpacked = unpack_batch(pack_batch(arrays), 2)
+    assert [result.shape for result in unpacked] == [(0, 6), (0, 6)]
+
+
+def test_pack_unpack_no_frames():
+    assert unpack_batch(pack_batch([]), 0) == []
+
+
+def test_pack_batch_layout():
+    payload = pack_batch([random_boxes(2, 0), random_boxes(1, 1)])
+    # Big-endian per-frame counts, then the float32 rows
+    assert payload[:8] == b'\x00\x00\x00\x02\x00\x00\x00\x01'
+    assert len(payload) == 8 + 3 * 6 * 4
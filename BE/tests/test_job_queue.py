@@ -0,0 +1,106 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import job_queue
+from database import AnalysisJob, DetectionSession, UploadedFile
+
+
+@pytest.fixture
+def queued_job(session_factory, detection_session, tmp_path):
+    """Id of a queued job for a video upload linked to detection_session"""
+    db = session_factory()
+    session = db.get(DetectionSession, detection_session)
+    video = tmp_path / 'drive.mp4'
+    video.write_bytes(b'')
+    uploaded_file = UploadedFile(user_id=session.user_id, session_id=session.id, original_filename='drive.mp4',
+                                 file_path=str(video), file_type='video', file_size=0)
+    db.add(uploaded_file)
+    db.flush()
+    job = job_queue.enqueue(db, uploaded_file, max_attempts=2)
+    db.commit()
+    job_id = job.id
+    db.close()
+    return job_id
+
+
+def load(session_factory, model, id):
+    db = session_factory()
+    try:
+        return db.get(model, id)
+    finally:
+        db.close()
+
+
+def test_claim_and_complete(session_factory, queued_job, detection_session):
+    db = session_factory()
+    job = job_queue.claim(db, 'worker-a', lease_seconds=60)
+    assert job.id == queued_job and job.status == 'running' and job.attempts == 1
+    assert db.get(UploadedFile, job.uploaded_file_id).processing_status == 'processing'
+    # Nothing else runnable while the lease holds
+    assert job_queue.claim(session_factory(), 'worker-b', lease_seconds=60) is None
+
+    assert job_queue.renew_lease(db, queued_job, 'worker-a')
+    result = {'processed_path': 'processed/drive.mp4', 'total_detections': 4, 'drowsiness_count': 1}
+    assert job_queue.complete(db, queued_job, 'worker-a', result)
+    db.close()
+
+    job = load(session_factory, AnalysisJob, queued_job)
+    assert job.status == 'completed' and job.locked_by is None and json.loads(job.result) == result
+    uploaded_file = load(session_factory, UploadedFile, job.uploaded_file_id)
+    assert uploaded_file.processing_status == 'completed'
+    assert uploaded_file.processed_path == 'processed/drive.mp4'
+    session = load(session_factory, DetectionSession, detection_session)
+    assert session.status == 'completed' and session.total_detections == 4 and session.drowsiness_count == 1
+
+
+def test_expired_lease_is_reclaimed(session_factory, queued_job):
+    db = session_factory()
+    job_queue.claim(db, 'worker-a', lease_seconds=60)
+    job = db.get(AnalysisJob, queued_job)
+    job.locked_at = datetime.utcnow() - timedelta(seconds=120)
+    db.commit()
+    db.close()
+
+    db = session_factory()
+    job = job_queue.claim(db, 'worker-b', lease_seconds=60)
+    assert job.id == queued_job and job.locked_by == 'worker-b' and job.attempts == 2
+    db.close()
+
+    # The first worker lost the job: its result is discarded
+    db = session_factory()
+    assert not job_queue.renew_lease(db, queued_job, 'worker-a')
+    assert not job_queue.complete(db, queued_job, 'worker-a', {'processed_path': 'stale.mp4'})
+    assert job_queue.complete(db, queued_job, 'worker-b', {'processed_path': 'fresh.mp4'})
+    db.close()
+    assert load(session_factory, AnalysisJob, queued_job).status == 'completed'
+
+
+def test_failed_job_retries_with_backoff_then_fails(session_factory, queued_job, detection_session):
+    db = session_factory()
+    job_queue.claim(db, 'worker-a', lease_seconds=60)
+    assert job_queue.fail(db, queued_job, 'worker-a', 'decode error') == 'queued'
+    job = db.get(AnalysisJob, queued_job)
+    assert job.run_after > datetime.utcnow() and job.last_error == 'decode error'
+    # Still backing off
+    assert job_queue.claim(db, 'worker-a', lease_seconds=60) is None
+
+    job.run_after = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    assert job_queue.claim(db, 'worker-a', lease_seconds=60).attempts == 2
+    assert job_queue.fail(db, queued_job, 'worker-a', 'decode error') == 'failed'
+    db.close()
+
+    uploaded_file = load(session_factory, UploadedFile, load(session_factory, AnalysisJob, queued_job).uploaded_file_id)
+    assert uploaded_file.processing_status == 'failed' and uploaded_file.error_message == 'decode error'
+    assert load(session_factory, DetectionSession, detection_session).status == 'interrupted'
+
+
+def test_worker_runs_handler(session_factory, queued_job):
+    worker = job_queue.JobWorker(lambda job, uploaded_file, progress: {'processed_path': 'processed/out.mp4'},
+                                 session_factory=session_factory, worker_id='worker-a', lease_seconds=60)
+    assert worker.run_once()
+    assert not worker.run_once()
+    assert worker.stats() == {'worker_id': 'worker-a', 'processed': 1, 'failed': 0}
+    assert load(session_factory, AnalysisJob, queued_job).status == 'completed'
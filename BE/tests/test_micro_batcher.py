@@ -0,0 +1,61 @@
+import threading
+
+import numpy as np
+import pytest
+
+from micro_batcher import MicroBatcher
+
+
+def frame_boxes(frame, conf):
+    return np.array([[0, 0, 10, 10, 0.3, frame], [0, 0, 10, 10, 0.9, frame]], dtype=np.float32)
+
+
+def test_each_caller_gets_its_own_boxes_at_its_threshold():
+    calls = []
+
+    def infer_batch(frames, conf, imgsz=None):
+        calls.append((list(frames), conf))
+        return [frame_boxes(frame, conf) for frame in frames]
+
+    batcher = MicroBatcher(infer_batch, max_batch_size=4, max_wait_ms=200)
+    try:
+        low = batcher.submit(1, conf=0.25)
+        high = batcher.submit(2, conf=0.5)
+        assert low.result(2)[:, 5].tolist() == [1, 1]
+        assert high.result(2).tolist() == [[0, 0, 10, 10, pytest.approx(0.9), 2]]
+        assert calls == [([1, 2], 0.25)]
+    finally:
+        batcher.close()
+
+
+def test_result_count_mismatch_fails_every_caller():
+    release = threading.Event()
+
+    def infer_batch(frames, conf, imgsz=None):
+        release.wait(2)
+        return [frame_boxes(frames[0], conf)]
+
+    batcher = MicroBatcher(infer_batch, max_batch_size=3, max_wait_ms=500)
+    try:
+        futures = [batcher.submit(i) for i in range(3)]
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError, match='1 results for 3 frames'):
+                future.result(2)
+        assert batcher.stats()['total_errors'] == 1
+    finally:
+        batcher.close()
+
+
+def test_inference_error_fails_every_caller():
+    def infer_batch(frames, conf, imgsz=None):
+        raise ValueError('model crashed')
+
+    batcher = MicroBatcher(infer_batch, max_batch_size=2, max_wait_ms=100)
+    try:
+        futures = [batcher.submit(i) for i in range(2)]
+        for future in futures:
+            with pytest.raises(ValueError):
+                future.result(2)
+    finally:
+        batcher.close()
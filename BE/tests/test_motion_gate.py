@@ -0,0 +1,62 @@
+import numpy as np
+
+from motion_gate import MotionGate
+
+
+def frame(value):
+    return np.full((120, 160, 3), value, dtype=np.uint8)
+
+
+def make_gate(**kwargs):
+    kwargs.setdefault('threshold', 3.0)
+    kwargs.setdefault('max_skip_frames', 10)
+    kwargs.setdefault('max_skip_seconds', 60.0)
+    return MotionGate(**kwargs)
+
+
+def test_first_frame_is_inferred():
+    gate = make_gate()
+    assert gate.should_infer(frame(100))
+    assert gate.last_score is None
+
+
+def test_unchanged_frame_is_skipped():
+    gate = make_gate()
+    assert gate.should_infer(frame(100))
+    gate.record_inference(20.0)
+    assert not gate.should_infer(frame(101))
+    stats = gate.stats()
+    assert stats['frames'] == 2 and stats['skipped'] == 1 and stats['inferred'] == 1
+
+
+def test_changed_frame_is_inferred():
+    gate = make_gate()
+    gate.should_infer(frame(100))
+    gate.record_inference(20.0)
+    assert gate.should_infer(frame(140))
+    assert gate.last_score == 40.0
+
+
+def test_without_cached_detection_frame_is_inferred():
+    gate = make_gate()
+    gate.should_infer(frame(100))
+    gate.record_inference(20.0)
+    assert gate.should_infer(frame(100), cached=False)
+    assert gate.skipped == 0
+
+
+def test_inference_forced_after_max_skip_frames():
+    gate = make_gate(max_skip_frames=3)
+    gate.should_infer(frame(100))
+    gate.record_inference(20.0)
+    decisions = [gate.should_infer(frame(100)) for _ in range(4)]
+    assert decisions == [False, False, False, True]
+    assert gate.forced == 1
+
+
+def test_inference_forced_after_max_skip_seconds():
+    gate = make_gate(max_skip_seconds=0.0)
+    gate.should_infer(frame(100))
+    gate.record_inference(20.0)
+    assert gate.should_infer(frame(100))
+    assert gate.forced == 1
@@ -0,0 +1,58 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import DetectionResult
+from result_writer import ResultWriter
+
+
+def make_writer(session_factory):
+    return ResultWriter(session_factory, flush_rows=100, flush_interval_ms=60000, max_buffer=10)
+
+
+def row(session_id, detection_class='awake'):
+    return {'session_id': session_id, 'detection_class': detection_class, 'confidence': 0.8}
+
+
+def count_rows(session_factory):
+    db = session_factory()
+    try:
+        return db.query(DetectionResult).count()
+    finally:
+        db.close()
+
+
+def test_flush_writes_buffered_rows(session_factory, detection_session):
+    writer = make_writer(session_factory)
+    for _ in range(3):
+        writer.add(row(detection_session))
+    assert writer.flush() == 3
+    assert writer.flush() == 0
+    assert count_rows(session_factory) == 3
+    stats = writer.stats()
+    assert stats['rows_written'] == 3 and stats['flushes'] == 1 and stats['buffer_depth'] == 0
+
+
+def test_rejected_row_is_dropped_and_rest_written(session_factory, detection_session):
+    writer = make_writer(session_factory)
+    writer.add(row(detection_session))
+    writer.add(row(999))  # session deleted meanwhile
+    writer.add(row(detection_session, 'yawn'))
+    assert writer.flush() == 2
+    assert count_rows(session_factory) == 2
+    stats = writer.stats()
+    assert stats['rows_rejected'] == 1 and stats['buffer_depth'] == 0 and stats['failures'] == 0
+
+
+def test_unreachable_database_keeps_rows(session_factory, detection_session, tmp_path):
+    unreachable = sessionmaker(bind=create_engine(f"sqlite:///{tmp_path / 'missing' / 'db.sqlite'}"))
+    writer = make_writer(unreachable)
+    writer.add(row(detection_session))
+    writer.add(row(detection_session))
+    assert writer.flush() == 0
+    stats = writer.stats()
+    assert stats['buffer_depth'] == 2 and stats['failures'] == 1 and stats['rows_written'] == 0
+
+    writer.session_factory = session_factory
+    writer.add(row(detection_session, 'yawn'))
+    assert writer.flush() == 3
+    assert count_rows(session_factory) == 3
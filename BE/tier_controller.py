@@ -0,0 +1,120 @@
+# Tier Controller - Keeps live inference under a p95 latency target by stepping down a quality ladder
+# Each tier is an input size, optionally with a lighter model: '640,480,320,320:light' means
+# 640 -> 480 -> 320 on the main model, then 320 on the 'light' model. Under load every
+# session shares the same tier, so a spike degrades resolution instead of latency.
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+def parse_ladder(spec):
+    """'640,480,320:light' -> [{'name': '640', 'imgsz': 640, 'model': None}, ...]"""
+    tiers = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        imgsz, _, model_name = item.partition(':')
+        tiers.append({'name': item, 'imgsz': int(imgsz), 'model': model_name or None})
+    return tiers
+
+
+class TierController:
+    """
+    Collects recent inference latencies and moves one tier down when the p95 misses
+    target_p95_ms (or the queue is deeper than max_queue_depth), and one tier up when
+    the p95 is below headroom * target with a short queue
+
+    Decisions need at least min_samples latencies since the last change and are spaced
+    cooldown seconds apart, so one slow frame does not flip tiers.
+    """
+
+    def __init__(self, tiers, target_p95_ms=150.0, max_queue_depth=8, headroom=0.6,
+                 window=50, min_samples=20, cooldown=5.0, queue_depth=None):
+        if not tiers:
+            raise ValueError('Tier ladder is empty')
+        self.tiers = tiers
+        self.target_p95_ms = target_p95_ms
+        self.max_queue_depth = max_queue_depth
+        self.headroom = headroom
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.queue_depth = queue_depth or (lambda: 0)
+        self.index = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._changed_at = time.monotonic()
+        self._in_flight = 0
+        self.changes = deque(maxlen=20)
+        self.time_in_tier = {tier['name']: 0.0 for tier in tiers}
+
+    @property
+    def tier(self):
+        return self.tiers[self.index]
+
+    def begin(self):
+        """Mark an inference as started (counts towards queue depth), returns the tier to use"""
+        with self._lock:
+            self._in_flight += 1
+            return self.tier
+
+    def end(self, latency_ms=None):
+        with self._lock:
+            self._in_flight -= 1
+            if latency_ms is not None:
+                self._latencies.append(latency_ms)
+        self._evaluate()
+
+    def _current_queue_depth(self):
+        try:
+            return self._in_flight + int(self.queue_depth())
+        except Exception:
+            return self._in_flight
+
+    def _evaluate(self):
+        with self._lock:
+            now = time.monotonic()
+            if len(self._latencies) < self.min_samples or now - self._changed_at < self.cooldown:
+                return
+            p95 = float(np.percentile(self._latencies, 95))
+            depth = self._current_queue_depth()
+            if (p95 > self.target_p95_ms or depth > self.max_queue_depth) and self.index < len(self.tiers) - 1:
+                self._move(self.index + 1, now, p95, depth)
+            elif (p95 < self.target_p95_ms * self.headroom and depth <= self.max_queue_depth // 2
+                  and self.index > 0):
+                self._move(self.index - 1, now, p95, depth)
+
+    def _move(self, index, now, p95, depth):
+        previous = self.tier['name']
+        self.time_in_tier[previous] += now - self._changed_at
+        self.index = index
+        self._changed_at = now
+        self._latencies.clear()
+        self.changes.append({
+            'at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'from': previous,
+            'to': self.tier['name'],
+            'p95_ms': round(p95, 1),
+            'queue_depth': depth,
+        })
+        print(f"Latency tier {previous} -> {self.tier['name']} (p95 {p95:.0f} ms, queue {depth})")
+
+    def stats(self):
+        with self._lock:
+            latencies = list(self._latencies)
+            time_in_tier = dict(self.time_in_tier)
+            time_in_tier[self.tier['name']] += time.monotonic() - self._changed_at
+            return {
+                'tier': self.tier['name'],
+                'tier_index': self.index,
+                'ladder': [tier['name'] for tier in self.tiers],
+                'target_p95_ms': self.target_p95_ms,
+                'p95_ms': round(float(np.percentile(latencies, 95)), 1) if latencies else None,
+                'samples': len(latencies),
+                'queue_depth': self._current_queue_depth(),
+                'time_in_tier_s': {name: round(seconds, 1) for name, seconds in time_in_tier.items()},
+                'changes': list(self.changes),
+            }
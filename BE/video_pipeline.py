@@ -0,0 +1,347 @@
+# Video Pipeline - Decode / infer / annotate+encode stages for uploaded videos on separate threads
+# A decoder thread reads frames into a bounded queue, the calling thread runs batched inference
+# on whatever is queued (up to batch_size frames per model call), and an encoder thread draws the
+# boxes and writes the output video. cv2 and the model release the GIL, so decoding and encoding
+# overlap with inference. Each stage is a single thread reading a FIFO queue, so frames reach the
+# writer in input order (checked on every frame).
+# With a FrameSampler only the sampled frames are batched through the model; the frames in between
+# wait in the inference stage until the next sampled frame is done and get interpolated boxes.
+#
+#   batch_size, sizing = adaptive_batch_size(width, height, imgsz=640)
+#   pipeline = VideoPipeline(engine, annotate=draw_detections, batch_size=batch_size)
+#   summary = pipeline.run(cap, writer)   # counts, frames, per-stage throughput
+
+import queue
+import threading
+import time
+
+from config import Config
+from detection_engine import FrameDetections
+from frame_sampler import interpolate_boxes
+from model_backends import serving_backend, supports_batching
+
+_END = object()
+
+
+def _cgroup_headroom():
+    """Bytes left under the container memory limit (cgroup v2 / v1), None without a limit"""
+    for limit_path, usage_path in (('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory.current'),
+                                   ('/sys/fs/cgroup/memory/memory.limit_in_bytes',
+                                    '/sys/fs/cgroup/memory/memory.usage_in_bytes')):
+        try:
+            with open(limit_path) as f:
+                limit = f.read().strip()
+            with open(usage_path) as f:
+                usage = int(f.read().strip())
+        except (OSError, ValueError):
+            continue
+        # 'max' (v2) or a huge number (v1) means unlimited
+        if limit == 'max' or int(limit) >= 1 << 60:
+            return None
+        return max(0, int(limit) - usage)
+    return None
+
+
+def available_memory():
+    """Bytes of memory available to this process, None when it cannot be determined"""
+    available = None
+    try:
+        import psutil
+        available = psutil.virtual_memory().available
+    except ImportError:
+        try:
+            with open('/proc/meminfo') as f:
+                for line in f:
+                    if line.startswith('MemAvailable:'):
+                        available = int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            pass
+    headroom = _cgroup_headroom()
+    if headroom is not None:
+        available = headroom if available is None else min(available, headroom)
+    return available
+
+
+def adaptive_batch_size(width, height, imgsz=640, min_size=1, max_size=32, memory_fraction=0.25,
+                        model_mb_per_frame=60.0, frames_per_inference=1, available=None):
+    """
+    Largest power-of-two batch in [min_size, max_size] whose frames fit in memory_fraction
+    of the available memory; returns (batch_size, sizing info)
+
+    A frame costs its input tensor and letterbox canvas (imgsz x imgsz), model activations
+    (model_mb_per_frame at 640, scaling with the input area) and four decoded copies
+    (two pipeline queues' worth of width x height frames per batch slot), plus the skipped
+    frames waiting for interpolation when only every frames_per_inference-th frame is inferred
+    """
+    input_bytes = imgsz * imgsz * 3 * (4 + 1)
+    activation_bytes = model_mb_per_frame * 1e6 * (imgsz / 640) ** 2
+    frame_bytes = (3 + max(1, frames_per_inference)) * width * height * 3
+    per_frame = input_bytes + activation_bytes + frame_bytes
+    available = available_memory() if available is None else available
+    if available is None:
+        fit = max_size
+    else:
+        fit = int(available * memory_fraction // per_frame)
+    batch = max(min_size, min(max_size, fit))
+    # Powers of two keep the number of distinct input shapes (and warm kernels) small
+    batch = max(min_size, 1 << (batch.bit_length() - 1))
+    return batch, {
+        'batch_size': batch,
+        'per_frame_mb': round(per_frame / 1e6, 1),
+        'available_mb': round(available / 1e6) if available is not None else None,
+        'memory_fraction': memory_fraction,
+        'resolution': f"{width}x{height}",
+        'imgsz': imgsz,
+    }
+
+
+def video_batch_size(width, height, sampler=None, workers=1):
+    """
+    (batch_size, sizing info) from Config: fixed VIDEO_BATCH_SIZE or adaptive_batch_size
+    workers processes running a pipeline at once share the memory budget
+    Fixed-shape backends (torchscript, onnx-int8) take one frame per pass, so they get batch_size 1
+    """
+    if not supports_batching(serving_backend()):
+        return 1, {'batch_size': 1, 'reason': f'{serving_backend()} backend has a fixed batch of 1'}
+    if Config.VIDEO_BATCH_SIZE > 0:
+        return Config.VIDEO_BATCH_SIZE, {'batch_size': Config.VIDEO_BATCH_SIZE}
+    return adaptive_batch_size(width, height, imgsz=Config.MODEL_IMGSZ,
+                               min_size=Config.VIDEO_BATCH_MIN,
+                               max_size=Config.VIDEO_BATCH_MAX,
+                               memory_fraction=Config.VIDEO_BATCH_MEMORY_FRACTION / max(1, workers),
+                               model_mb_per_frame=Config.VIDEO_MODEL_MB_PER_FRAME,
+                               frames_per_inference=sampler.max_gap if sampler is not None else 1)
+
+
+class StageStats:
+    """Frames and busy time (excluding queue waits) of one pipeline stage"""
+
+    def __init__(self):
+        self.frames = 0
+        self.calls = 0
+        self.busy = 0.0
+
+    def add(self, frames, seconds):
+        self.frames += frames
+        self.calls += 1
+        self.busy += seconds
+
+    def summary(self):
+        return {
+            'frames': self.frames,
+            'busy_s': round(self.busy, 3),
+            'fps': round(self.frames / self.busy, 1) if self.busy else None,
+        }
+
+
+class VideoPipeline:
+    """
+    Runs an engine over the frames of a cv2.VideoCapture and writes annotated frames to a
+    cv2.VideoWriter; annotate(frame, FrameDetections) draws on the frame in place.
+    sampler (frame_sampler.FrameSampler) picks the frames to infer, None infers every frame;
+    on_frame(index, FrameDetections, inferred) is called for every frame in order.
+    queue_size bounds the frames held between stages (memory stays flat on long videos);
+    with a sampler up to max_gap skipped frames also wait for interpolation
+    """
+
+    def __init__(self, engine, annotate=None, batch_size=8, queue_size=32, sampler=None, on_frame=None,
+                 **detect_kwargs):
+        self.engine = engine
+        self.annotate = annotate
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(self.batch_size, queue_size)
+        self.sampler = sampler
+        # Frames held for one batch: batch_size sampled frames and the skipped frames between them
+        self.window_size = max(self.queue_size, self.batch_size * (sampler.max_gap if sampler is not None else 1))
+        self.on_frame = on_frame
+        self.detect_kwargs = detect_kwargs
+        self.stats = {'decode': StageStats(), 'infer': StageStats(), 'encode': StageStats()}
+        self.counts = {}
+        self.total_detections = 0
+        self.interpolated = 0
+        # Boxes drawn on skipped frames, kept out of counts/total_detections
+        self.interpolated_counts = {}
+        self.interpolated_detections = 0
+        self._stop = threading.Event()
+        self._errors = []
+
+    def _put(self, q, item):
+        """Blocking put that gives up once another stage has failed"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _fail(self, error):
+        self._errors.append(error)
+        self._stop.set()
+
+    def _sampled(self, index, frame, last):
+        infer = self.sampler is None or self.sampler.should_infer(index, frame, last=last)
+        return index, frame, infer
+
+    def _decode(self, cap, decoded):
+        try:
+            index = 0
+            # One frame of look-ahead so the sampler knows which frame is the last one
+            previous = None
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                self.stats['decode'].add(1, time.perf_counter() - start)
+                if previous is not None and not self._put(decoded, self._sampled(*previous, last=False)):
+                    return
+                previous = (index, frame)
+                index += 1
+            if previous is not None and not self._stop.is_set():
+                self._put(decoded, self._sampled(*previous, last=True))
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._put(decoded, _END)
+
+    def _encode(self, writer, inferred):
+        try:
+            expected = 0
+            while True:
+                item = self._get(inferred)
+                if item is _END:
+                    return
+                index, frame, frame_detections = item
+                if index != expected:
+                    raise RuntimeError(f"Video pipeline reordered frames: got {index}, expected {expected}")
+                expected += 1
+                start = time.perf_counter()
+                if self.annotate is not None and len(frame_detections) > 0:
+                    self.annotate(frame, frame_detections)
+                writer.write(frame)
+                self.stats['encode'].add(1, time.perf_counter() - start)
+        except Exception as e:
+            self._fail(e)
+
+    def _fill(self, decoded, window):
+        """
+        Add decoded frames to window: the first blocks, then whatever is already decoded until
+        batch_size frames to infer (or window_size frames) are waiting; returns True at the end
+        """
+        item = self._get(decoded)
+        if item is _END:
+            return True
+        window.append(item)
+        while sum(1 for _, _, infer in window if infer) < self.batch_size and len(window) < self.window_size:
+            try:
+                item = decoded.get_nowait()
+            except queue.Empty:
+                break
+            if item is _END:
+                return True
+            window.append(item)
+        return False
+
+    def _emit(self, inferred, index, frame, frame_detections, infer):
+        # Only inferred frames count as detections; interpolated boxes are reported on their own
+        if infer:
+            self.total_detections += len(frame_detections)
+            counts = self.counts
+        else:
+            self.interpolated_detections += len(frame_detections)
+            counts = self.interpolated_counts
+        for name, count in frame_detections.counts().items():
+            counts[name] = counts.get(name, 0) + count
+        if self.on_frame is not None:
+            self.on_frame(index, frame_detections, infer)
+        return self._put(inferred, (index, frame, frame_detections))
+
+    def _infer(self, decoded, inferred):
+        window = []        # (index, frame, infer) in order, not yet sent to the encoder
+        previous = None    # (index, boxes) of the last inferred frame
+        finished = False
+        while not finished and not self._stop.is_set():
+            finished = self._fill(decoded, window)
+            keyframes = [(index, frame) for index, frame, infer in window if infer]
+            if not keyframes:
+                continue
+            start = time.perf_counter()
+            results = self.engine.detect_batch([frame for _, frame in keyframes], **self.detect_kwargs)
+            self.stats['infer'].add(len(keyframes), time.perf_counter() - start)
+            detections = {index: frame_detections for (index, _), frame_detections in zip(keyframes, results)}
+            # Everything up to the last inferred frame can go; later skipped frames wait for the next one
+            last_key = keyframes[-1][0]
+            ready = [item for item in window if item[0] <= last_key]
+            window = [item for item in window if item[0] > last_key]
+            next_keys = iter(keyframes)
+            next_key = next(next_keys)[0]
+            for index, frame, infer in ready:
+                if infer:
+                    frame_detections = detections[index]
+                    previous = (index, frame_detections.boxes)
+                    next_key = next(next_keys, (None,))[0]
+                else:
+                    # Linear interpolation between the inferred frames on either side
+                    t = (index - previous[0]) / (next_key - previous[0])
+                    frame_detections = FrameDetections(interpolate_boxes(previous[1], detections[next_key].boxes, t),
+                                                       self.engine.names)
+                    self.interpolated += 1
+                if not self._emit(inferred, index, frame, frame_detections, infer):
+                    return
+        # The last frame is always inferred, so this only matters when a stage stopped early
+        for index, frame, _ in window:
+            if previous is None or self._stop.is_set():
+                break
+            if not self._emit(inferred, index, frame, FrameDetections(previous[1], self.engine.names), False):
+                return
+
+    def run(self, cap, writer):
+        """Process the whole video; re-raises the first stage error after every thread stopped"""
+        decoded = queue.Queue(maxsize=self.window_size)
+        inferred = queue.Queue(maxsize=self.queue_size)
+        decoder = threading.Thread(target=self._decode, args=(cap, decoded), name='video-decode', daemon=True)
+        encoder = threading.Thread(target=self._encode, args=(writer, inferred), name='video-encode', daemon=True)
+        start = time.perf_counter()
+        decoder.start()
+        encoder.start()
+        try:
+            self._infer(decoded, inferred)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._put(inferred, _END)
+            decoder.join()
+            encoder.join()
+        wall = time.perf_counter() - start
+        if self._errors:
+            raise self._errors[0]
+        return self.summary(wall)
+
+    def summary(self, wall):
+        frames = self.stats['encode'].frames
+        infer = self.stats['infer']
+        return {
+            'frames': frames,
+            'total_detections': self.total_detections,
+            'counts': dict(self.counts),
+            'wall_s': round(wall, 3),
+            'fps': round(frames / wall, 1) if wall else None,
+            'inferred_frames': infer.frames,
+            'interpolated_frames': self.interpolated,
+            'interpolated_detections': self.interpolated_detections,
+            'interpolated_counts': dict(self.interpolated_counts),
+            'sampling': self.sampler.stats() if self.sampler is not None else None,
+            'batch_size': self.batch_size,
+            'avg_batch': round(infer.frames / infer.calls, 2) if infer.calls else 0.0,
+            'stages': {name: stage.summary() for name, stage in self.stats.items()},
+        }
@@ -0,0 +1,347 @@
+# Video Segments - Long uploaded videos split into time segments across a pool of worker processes
+# One VideoPipeline keeps one process busy, so a long upload is cut into VIDEO_SEGMENT_WORKERS
+# segments by seeking; each worker process (own DetectionEngine, loaded once) runs the pipeline
+# over its segment into a part file. The parts are stitched back in order (ffmpeg stream copy
+# when ffmpeg is installed, else re-encoded with cv2) and the per-class counts and per-frame boxes
+# are merged, so callers see the same summary and on_frame calls as the single-process path.
+# Videos shorter than two segments of VIDEO_SEGMENT_MIN_SECONDS stay in-process.
+#
+# Workers are started with 'spawn' (no inherited model, threads or DB connections), which
+# re-imports the main module: serve with gunicorn (railway.toml) rather than `python app.py`.
+#
+#   summary = process_video('uploads/clip.mp4', 'processed/clip.mp4', engine, weights_path)
+
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+import numpy as np
+
+from annotate import draw_detections
+from config import Config
+from detection_engine import DetectionEngine, FrameDetections
+from frame_sampler import video_sampler
+from video_pipeline import VideoPipeline, video_batch_size
+
+
+def segment_workers():
+    """Worker processes for one long video: VIDEO_SEGMENT_WORKERS, or half the cores"""
+    if Config.VIDEO_SEGMENT_WORKERS > 0:
+        return Config.VIDEO_SEGMENT_WORKERS
+    return max(1, (os.cpu_count() or 1) // 2)
+
+
+def plan_segments(frame_count, fps, workers, min_seconds=30.0):
+    """
+    [(start, end)] frame ranges covering the video; end is None for the last segment,
+    which reads to the end of the file (CAP_PROP_FRAME_COUNT is only an estimate)
+    """
+    if workers <= 1 or frame_count <= 0 or fps <= 0:
+        return [(0, None)]
+    count = min(workers, int(frame_count // max(1.0, min_seconds * fps)))
+    if count <= 1:
+        return [(0, None)]
+    bounds = [round(i * frame_count / count) for i in range(count)]
+    return list(zip(bounds, bounds[1:] + [None]))
+
+
+class SegmentReader:
+    """cap.read() over frames [start, end) of a cv2.VideoCapture, seeking to start first"""
+
+    def __init__(self, cap, start, end=None):
+        self.cap = cap
+        if start > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+            position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+            # Containers without an index seek to the wrong frame: skip forward from the start instead
+            if position != start:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                for _ in range(start):
+                    if not cap.grab():
+                        break
+        self.remaining = None if end is None else end - start
+
+    def read(self):
+        if self.remaining is not None:
+            if self.remaining <= 0:
+                return False, None
+            self.remaining -= 1
+        return self.cap.read()
+
+
+def run_pipeline(cap, writer, engine, width, height, fps, on_frame=None, workers=1):
+    """VideoPipeline over cap with the configured sampling, batch and queue sizes; returns its summary"""
+    sampler = video_sampler(fps)
+    batch_size, batch_sizing = video_batch_size(width, height, sampler, workers=workers)
+    pipeline = VideoPipeline(engine, annotate=draw_detections, batch_size=batch_size,
+                             queue_size=max(Config.VIDEO_QUEUE_SIZE, 2 * batch_size),
+                             sampler=sampler, on_frame=on_frame)
+    summary = pipeline.run(cap, writer)
+    summary['batch_sizing'] = batch_sizing
+    return summary
+
+
+# Worker process state: one engine per process, loaded by the pool initializer
+_worker_engine = None
+
+
+def _init_worker(weights_path, threads):
+    """Pool initializer: limit math threads to this worker's share of the cores and load the model"""
+    global _worker_engine
+    for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[name] = str(threads)
+    cv2.setNumThreads(threads)
+    if Config.INFERENCE_SOCKET:
+        # The shared inference server owns the model, workers only decode, sample and encode
+        from inference_client import InferenceClient
+        model = InferenceClient(Config.INFERENCE_SOCKET)
+    else:
+        from model_backends import load_model
+        model, _ = load_model(weights_path, Config.INFERENCE_BACKEND)
+    _worker_engine = DetectionEngine(model)
+
+
+def _process_segment(video_path, part_path, start, end, fourcc, workers, counters_path=None, slot=0):
+    """
+    Worker task: annotate frames [start, end) into part_path; returns the summary and every frame's boxes
+    Frames done so far are written to slot of the int64 counters file, which the parent sums for progress
+    """
+    counters = np.memmap(counters_path, dtype=np.int64, mode='r+') if counters_path else None
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    writer = cv2.VideoWriter(part_path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+    frames = []
+
+    def record(index, frame_detections, inferred):
+        frames.append((frame_detections.boxes, inferred))
+        if counters is not None:
+            counters[slot] = len(frames)
+
+    try:
+        summary = run_pipeline(SegmentReader(cap, start, end), writer, _worker_engine, width, height, fps,
+                               on_frame=record, workers=workers)
+    finally:
+        cap.release()
+        writer.release()
+    summary['start'] = start
+    summary['frame_boxes'] = frames
+    return summary
+
+
+def concat_segments(part_paths, output_path):
+    """Stream-copy the part files into output_path with ffmpeg; False when ffmpeg is missing or fails"""
+    if not shutil.which('ffmpeg'):
+        return False
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as listing:
+        for path in part_paths:
+            listing.write(f"file '{os.path.abspath(path)}'\n")
+    try:
+        subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                        '-i', listing.name, '-c', 'copy', output_path],
+                       check=True, capture_output=True)
+        return True
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"ffmpeg concat failed ({e}), re-encoding segments")
+        return False
+    finally:
+        os.remove(listing.name)
+
+
+def append_video(writer, path):
+    """Re-encode every frame of the video at path into writer"""
+    cap = cv2.VideoCapture(path)
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            writer.write(frame)
+    finally:
+        cap.release()
+
+
+def merge_summaries(summaries, wall):
+    """One pipeline summary from the per-segment ones (ordered by start frame)"""
+    frames = sum(s['frames'] for s in summaries)
+    inferred = sum(s['inferred_frames'] for s in summaries)
+    calls = sum(s['inferred_frames'] / s['avg_batch'] for s in summaries if s['avg_batch'])
+    counts = {}
+    interpolated_counts = {}
+    for s in summaries:
+        for name, count in s['counts'].items():
+            counts[name] = counts.get(name, 0) + count
+        for name, count in s['interpolated_counts'].items():
+            interpolated_counts[name] = interpolated_counts.get(name, 0) + count
+    stages = {}
+    for name in summaries[0]['stages']:
+        stage_frames = sum(s['stages'][name]['frames'] for s in summaries)
+        busy = sum(s['stages'][name]['busy_s'] for s in summaries)
+        # Summed over workers: throughput of one worker's stage
+        stages[name] = {'frames': stage_frames, 'busy_s': round(busy, 3),
+                        'fps': round(stage_frames / busy, 1) if busy else None}
+    sampling = summaries[0]['sampling']
+    if sampling is not None:
+        sampled = sum(s['sampling']['frames'] for s in summaries)
+        sampling = {**sampling, 'frames': sampled, 'inferred': inferred,
+                    'inferred_ratio': round(inferred / sampled, 3) if sampled else 0.0}
+    return {
+        'frames': frames,
+        'total_detections': sum(s['total_detections'] for s in summaries),
+        'counts': counts,
+        'wall_s': round(wall, 3),
+        'fps': round(frames / wall, 1) if wall else None,
+        'inferred_frames': inferred,
+        'interpolated_frames': sum(s['interpolated_frames'] for s in summaries),
+        'interpolated_detections': sum(s['interpolated_detections'] for s in summaries),
+        'interpolated_counts': interpolated_counts,
+        'sampling': sampling,
+        'batch_size': summaries[0]['batch_size'],
+        'avg_batch': round(inferred / calls, 2) if calls else 0.0,
+        'stages': stages,
+        'batch_sizing': summaries[0]['batch_sizing'],
+        'segments': [{'start': s['start'], 'frames': s['frames'], 'wall_s': s['wall_s'], 'fps': s['fps']}
+                     for s in summaries],
+    }
+
+
+class SegmentPool:
+    """
+    Worker processes for segment processing, started on first use and kept for later videos;
+    replaced when the weights path (model hot-swap) or the worker count changes
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._key = None
+        self._lock = threading.Lock()
+
+    def executor(self, weights_path, workers):
+        with self._lock:
+            if self._key != (weights_path, workers):
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                threads = max(1, (os.cpu_count() or 1) // workers)
+                self._executor = ProcessPoolExecutor(max_workers=workers,
+                                                     mp_context=multiprocessing.get_context('spawn'),
+                                                     initializer=_init_worker, initargs=(weights_path, threads))
+                self._key = (weights_path, workers)
+            return self._executor
+
+    def reset(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor, self._key = None, None
+
+    def run(self, video_path, output_path, segments, names, fps, size, weights_path, fourcc='mp4v', on_frame=None,
+            progress=None, frame_count=0):
+        """
+        Process segments in the pool, stitch them into output_path and return the merged summary
+        progress(frames_done, frame_count) is called while the workers run
+        """
+        start = time.perf_counter()
+        root, ext = os.path.splitext(output_path)
+        part_paths = [f"{root}.part{i}{ext}" for i in range(len(segments))]
+        counters_path = f"{root}.progress"
+        counters = np.memmap(counters_path, dtype=np.int64, mode='w+', shape=(len(segments),))
+        executor = self.executor(weights_path, len(segments))
+        # Without ffmpeg each part is re-encoded into the output as soon as it is done,
+        # overlapping with the segments still running
+        writer = None if shutil.which('ffmpeg') else cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+        stitch_s = 0.0
+        try:
+            futures = [executor.submit(_process_segment, video_path, part_path, segment_start, segment_end,
+                                       fourcc, len(segments), counters_path, slot)
+                       for slot, (part_path, (segment_start, segment_end)) in enumerate(zip(part_paths, segments))]
+            summaries = []
+            for future, part_path in zip(futures, part_paths):
+                while progress is not None and not future.done():
+                    wait([future], timeout=Config.PROGRESS_INTERVAL)
+                    progress(int(counters.sum()), frame_count)
+                summaries.append(future.result())
+                if writer is not None:
+                    stitch_start = time.perf_counter()
+                    append_video(writer, part_path)
+                    stitch_s += time.perf_counter() - stitch_start
+            stitch = 're-encode'
+            if writer is None:
+                stitch_start = time.perf_counter()
+                if concat_segments(part_paths, output_path):
+                    stitch = 'ffmpeg-copy'
+                else:
+                    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+                    for part_path in part_paths:
+                        append_video(writer, part_path)
+                stitch_s = time.perf_counter() - stitch_start
+        finally:
+            if writer is not None:
+                writer.release()
+            del counters
+            for path in part_paths + [counters_path]:
+                if os.path.exists(path):
+                    os.remove(path)
+        if progress is not None:
+            frames_done = sum(summary['frames'] for summary in summaries)
+            progress(frames_done, max(frame_count, frames_done))
+        if on_frame is not None:
+            for summary in summaries:
+                for offset, (boxes, inferred) in enumerate(summary['frame_boxes']):
+                    on_frame(summary['start'] + offset, FrameDetections(boxes, names), inferred)
+        merged = merge_summaries(summaries, time.perf_counter() - start)
+        merged['workers'] = len(segments)
+        merged['stitch'] = {'method': stitch, 'wall_s': round(stitch_s, 3)}
+        return merged
+
+
+segment_pool = SegmentPool()
+
+
+def process_video(video_path, output_path, engine, weights_path, fourcc='mp4v', on_frame=None, progress=None):
+    """
+    Annotated copy of video_path at output_path; returns the pipeline summary
+    Long videos go through segment_pool (weights_path is what the workers load), the rest
+    through one in-process pipeline on engine; on_frame(index, FrameDetections, inferred)
+    sees every frame in order either way, progress(frames_done, frames_total) is called as
+    frames are done (frames_total is CAP_PROP_FRAME_COUNT)
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open {video_path}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    segments = plan_segments(frame_count, fps, segment_workers(), Config.VIDEO_SEGMENT_MIN_SECONDS)
+    if len(segments) > 1:
+        cap.release()
+        try:
+            return segment_pool.run(video_path, output_path, segments, engine.names, fps, (width, height),
+                                    weights_path, fourcc=fourcc, on_frame=on_frame,
+                                    progress=progress, frame_count=frame_count)
+        except BrokenProcessPool as e:
+            # A worker died (out of memory, model failed to load): start a fresh pool next time
+            print(f"Video segment workers failed ({e}), processing in-process")
+            segment_pool.reset()
+            cap = cv2.VideoCapture(video_path)
+    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+    def report_progress(index, frame_detections, inferred):
+        if on_frame is not None:
+            on_frame(index, frame_detections, inferred)
+        progress(index + 1, max(frame_count, index + 1))
+    frame_callback = report_progress if progress is not None else on_frame
+    try:
+        return run_pipeline(cap, writer, engine, width, height, fps, on_frame=frame_callback)
+    finally:
+        cap.release()
+        writer.release()
@@ -408,6 +408,7 @@ async function stopLiveDetection() {
     // Stop the alarm and session timer
     stopAlarm();
     stopSessionTimer();
+    closeLiveSocket();
 
     const sessionIdToStop = AppState.currentSessionId;
 
@@ -470,6 +471,75 @@ async function stopLiveDetection() {
  * Start detection processing loop
  */
 let lastDetections = []; // State to hold the last known detections
+let frameSeq = 0; // Sequence number of the frames sent to analyze-frame-binary or the live socket
+let liveSocket = null; // WebSocket channel of the live session (BE/live_socket.py), null = HTTP per frame
+
+// Open the session's WebSocket channel; resolves with it, or null when it is unavailable
+function openLiveSocket(sessionId) {
+    return new Promise((resolve) => {
+        if (!window.WebSocket) {
+            resolve(null);
+            return;
+        }
+        const token = encodeURIComponent(localStorage.getItem('authToken'));
+        const socket = new WebSocket(`${API_BASE_URL.replace(/^http/, 'ws')}/detection/live?token=${token}&session_id=${sessionId}`);
+        const channel = { socket, pending: new Map() };
+        const timer = setTimeout(() => {
+            socket.close();
+            resolve(null);
+        }, 3000);
+        
+        socket.onmessage = (event) => {
+            const message = JSON.parse(event.data);
+            if (message.type === 'ready') {
+                clearTimeout(timer);
+                resolve(channel);
+            } else if (message.type === 'alarm') {
+                console.log('Server raised the drowsiness alarm at frame', message.seq);
+            } else if (message.seq === undefined) {
+                console.error('Live socket error:', message.error);
+            } else if (channel.pending.has(message.seq)) {
+                channel.pending.get(message.seq)(message);
+                channel.pending.delete(message.seq);
+            }
+        };
+        socket.onclose = () => {
+            clearTimeout(timer);
+            channel.pending.forEach(reply => reply({ type: 'closed' }));
+            channel.pending.clear();
+            if (liveSocket === channel) {
+                liveSocket = null; // Following frames go over HTTP
+            }
+            resolve(null);
+        };
+    });
+}
+
+function closeLiveSocket() {
+    if (liveSocket) {
+        liveSocket.socket.close();
+        liveSocket = null;
+    }
+}
+
+// Send one frame over the live socket (4-byte sequence number + JPEG); resolves with the result in
+// the analyze-frame shape, or null when the frame was dropped or the channel closed
+async function sendLiveFrame(channel, frameBlob, seq) {
+    const header = new DataView(new ArrayBuffer(4));
+    header.setUint32(0, seq);
+    const reply = new Promise(resolve => channel.pending.set(seq, resolve));
+    channel.socket.send(new Blob([header.buffer, frameBlob]));
+    const message = await reply;
+    if (message.type !== 'result') {
+        return null;
+    }
+    return {
+        detections: message.detections.map(([cls, confidence, x1, y1, x2, y2]) => ({
+            class: cls, confidence, bbox: [x1, y1, x2, y2]
+        })),
+        drowsiness_detected: message.drowsy
+    };
+}
 
 async function startDetectionLoop() {
     const videoElement = document.getElementById('camera-feed');
@@ -478,6 +548,9 @@ async function startDetectionLoop() {
     const snapshotImg = document.getElementById('frame-snapshot');
 
     lastDetections = []; // Reset on new loop start
+    frameSeq = 0;
+    closeLiveSocket();
+    liveSocket = await openLiveSocket(AppState.currentSessionId);
 
     // Load alarm settings and sounds
     try {
@@ -507,7 +580,16 @@ async function startDetectionLoop() {
         const tempCtx = tempCanvas.getContext('2d');
         tempCtx.drawImage(videoElement, 0, 0, tempCanvas.width, tempCanvas.height);
 
-        snapshotImg.src = tempCanvas.toDataURL('image/jpeg', 0.8);
+        // Encode the frame once: the same JPEG blob is shown and uploaded as raw bytes
+        const frameBlob = await new Promise(resolve => tempCanvas.toBlob(resolve, 'image/jpeg', 0.8));
+        if (!frameBlob) {
+            requestAnimationFrame(processFrame);
+            return;
+        }
+        if (snapshotImg.src.startsWith('blob:')) {
+            URL.revokeObjectURL(snapshotImg.src);
+        }
+        snapshotImg.src = URL.createObjectURL(frameBlob);
 
         snapshotImg.onload = async () => {
             try {
@@ -523,17 +605,21 @@ async function startDetectionLoop() {
                     });
                 }
 
-                const imageData = snapshotImg.src;
-
-                const result = await apiRequest('/detection/analyze-frame', {
-                    method: 'POST',
-                    body: JSON.stringify({
-                        session_id: AppState.currentSessionId,
-                        image_data: imageData
-                    })
-                });
+                frameSeq += 1;
+                const result = liveSocket
+                    ? await sendLiveFrame(liveSocket, frameBlob, frameSeq)
+                    : await apiRequest('/detection/analyze-frame-binary', {
+                        method: 'POST',
+                        headers: {
+                            'Content-Type': 'image/jpeg',
+                            'X-Session-Id': String(AppState.currentSessionId),
+                            'X-Frame-Seq': String(frameSeq)
+                        },
+                        body: frameBlob
+                    });
 
-                if (result && AppState.detectionActive) {
+                // A dropped frame (superseded by a newer one of this session) keeps the last boxes
+                if (result && !result.dropped && AppState.detectionActive) {
                     // 3. Update the state with the new detections for the next frame
                     lastDetections = result.detections || [];
 
@@ -923,6 +1009,7 @@ async function endSessionOnNavigate() {
         
         // Stop detection processing immediately
         AppState.detectionActive = false;
+        closeLiveSocket();
         
         // Stop camera stream
         if (detectionStream) {
@@ -1458,24 +1545,9 @@ async function processUploadedFile() {
     processBtn.disabled = true;
     processBtn.innerHTML = '<i class="fas fa-spinner fa-spin mr-2"></i>Processing...';
     
-    // Simulate progress animation
-    let progress = 0;
-    const progressInterval = setInterval(() => {
-        progress += Math.random() * 15;
-        if (progress > 90) progress = 90; // Cap at 90% until actual completion
-        
-        progressFill.style.width = `${progress}%`;
-        progressPercentage.textContent = `${Math.round(progress)}%`;
-        
-        // Update progress text based on progress
-        if (progress < 30) {
-            progressText.textContent = 'Initializing analysis...';
-        } else if (progress < 60) {
-            progressText.textContent = 'Processing frames...';
-        } else if (progress < 90) {
-            progressText.textContent = 'Applying detection model...';
-        }
-    }, 200);
+    // Real progress comes from the analysis job; until then only the upload is shown
+    progressText.textContent = 'Uploading...';
+    progressPercentage.textContent = '';
     
     try {
         const formData = new FormData();
@@ -1493,8 +1565,15 @@ async function processUploadedFile() {
             throw new Error('File processing failed');
         }
         
+        let result = await response.json();
+        
+        // Videos are queued (202 + job id) and processed by a background worker
+        if (response.status === 202 && result.job_id) {
+            progressText.textContent = 'Waiting in queue...';
+            result = await followAnalysisJob(result.job_id, showJobProgress);
+        }
+        
         // Complete the progress
-        clearInterval(progressInterval);
         progressFill.style.width = '100%';
         progressPercentage.textContent = '100%';
         progressText.textContent = 'Analysis complete!';
@@ -1502,7 +1581,6 @@ async function processUploadedFile() {
         // Small delay to show completion
         await new Promise(resolve => setTimeout(resolve, 500));
         
-        const result = await response.json();
         console.log('Upload result:', result); // Debug log
         console.log('Original filename from backend:', result.original_filename); // Debug log
         console.log('Uploaded file name:', window.uploadedFile ? window.uploadedFile.name : 'No file'); // Debug log
@@ -1515,7 +1593,6 @@ async function processUploadedFile() {
         showToast('File processed successfully', 'success');
         
     } catch (error) {
-        clearInterval(progressInterval);
         console.error('Error processing file:', error);
         
         // Show error state
@@ -1543,6 +1620,99 @@ async function processUploadedFile() {
     }
 }
 
+// Show a job progress update (frames, fps, ETA) in the upload progress bar
+function showJobProgress(progress) {
+    const progressFill = document.getElementById('progress-fill');
+    const progressText = document.getElementById('progress-text');
+    const progressPercentage = document.getElementById('progress-percentage');
+    
+    if (progress.state === 'queued') {
+        progressText.textContent = progress.frames_done ? 'Retrying analysis...' : 'Waiting in queue...';
+        return;
+    }
+    if (progress.percent !== null && progress.percent !== undefined) {
+        progressFill.style.width = `${progress.percent}%`;
+        progressPercentage.textContent = `${Math.round(progress.percent)}%`;
+    }
+    if (progress.frames_total) {
+        let text = `Processing frames ${progress.frames_done}/${progress.frames_total}`;
+        if (progress.fps) text += ` · ${progress.fps} fps`;
+        if (progress.eta_seconds !== null && progress.eta_seconds !== undefined) {
+            text += ` · ETA ${Math.ceil(progress.eta_seconds)}s`;
+        }
+        progressText.textContent = text;
+    } else {
+        progressText.textContent = 'Processing frames...';
+    }
+}
+
+// Follow a queued upload analysis through its Server-Sent Events stream, resolves with the
+// analysis result; falls back to polling when the stream is unavailable
+function followAnalysisJob(jobId, onProgress) {
+    if (!window.EventSource) {
+        return waitForAnalysisJob(jobId, 1000, onProgress);
+    }
+    return new Promise((resolve, reject) => {
+        const token = encodeURIComponent(localStorage.getItem('authToken'));
+        const source = new EventSource(`${API_BASE_URL}/detection/jobs/${jobId}/events?token=${token}`);
+        let received = false;
+        
+        source.addEventListener('progress', (event) => {
+            received = true;
+            onProgress(JSON.parse(event.data));
+        });
+        source.addEventListener('done', (event) => {
+            source.close();
+            const progress = JSON.parse(event.data);
+            if (progress.state === 'completed') {
+                resolve(progress.job.result);
+            } else {
+                reject(new Error(progress.job.error || 'File processing failed'));
+            }
+        });
+        source.onerror = () => {
+            // EventSource reconnects by itself once it has been streaming; a stream that never
+            // opened (proxy without SSE support, bad token) switches to polling
+            if (!received) {
+                source.close();
+                waitForAnalysisJob(jobId, 1000, onProgress).then(resolve, reject);
+            }
+        };
+    });
+}
+
+// Poll a queued upload analysis until it completes, resolves with the analysis result
+async function waitForAnalysisJob(jobId, intervalMs = 1000, onProgress = null) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, intervalMs));
+        const response = await fetch(`${API_BASE_URL}/detection/jobs/${jobId}`, {
+            headers: {
+                'Authorization': `Bearer ${localStorage.getItem('authToken')}`
+            }
+        });
+        if (!response.ok) {
+            throw new Error('Could not get job status');
+        }
+        const job = await response.json();
+        if (onProgress && job.status !== 'completed' && job.status !== 'failed') {
+            const progressResponse = await fetch(`${API_BASE_URL}/detection/jobs/${jobId}/progress`, {
+                headers: {
+                    'Authorization': `Bearer ${localStorage.getItem('authToken')}`
+                }
+            });
+            if (progressResponse.ok) {
+                onProgress(await progressResponse.json());
+            }
+        }
+        if (job.status === 'completed') {
+            return job.result;
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'File processing failed');
+        }
+    }
+}
+
 function displayUploadResults(result) {
     const resultsContainer = document.getElementById('upload-results');
     
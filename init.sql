@@ -72,7 +72,8 @@ CREATE TABLE IF NOT EXISTS detection_results (
     bbox_x2 FLOAT,
     bbox_y2 FLOAT,
     frame_number INTEGER,
-    processing_time FLOAT -- in milliseconds
+    processing_time FLOAT, -- in milliseconds
+    model_version VARCHAR(50) -- model registry version that produced the result
 );
 
 -- ========================================
@@ -93,6 +94,26 @@ CREATE TABLE IF NOT EXISTS uploaded_files (
     error_message TEXT
 );
 
+-- ========================================
+-- ANALYSIS_JOBS TABLE - Queued upload analyses (BE/job_queue.py)
+-- ========================================
+CREATE TABLE IF NOT EXISTS analysis_jobs (
+    id SERIAL PRIMARY KEY,
+    uploaded_file_id INTEGER NOT NULL REFERENCES uploaded_files(id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    session_id INTEGER REFERENCES detection_sessions(id) ON DELETE CASCADE,
+    status VARCHAR(20) DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'completed', 'failed')),
+    attempts INTEGER DEFAULT 0,
+    max_attempts INTEGER DEFAULT 3,
+    run_after TIMESTAMP DEFAULT CURRENT_TIMESTAMP, -- retry backoff
+    locked_by VARCHAR(100), -- worker holding the job
+    locked_at TIMESTAMP, -- lease, renewed while the job runs
+    last_error TEXT,
+    result TEXT, -- JSON counts and pipeline summary
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
 -- ========================================
 -- INDEXES for better performance
 -- ========================================
@@ -104,6 +125,7 @@ CREATE INDEX IF NOT EXISTS idx_detection_results_session_id ON detection_results
 CREATE INDEX IF NOT EXISTS idx_detection_results_timestamp ON detection_results(timestamp);
 CREATE INDEX IF NOT EXISTS idx_uploaded_files_user_id ON uploaded_files(user_id);
 CREATE INDEX IF NOT EXISTS idx_uploaded_files_session_id ON uploaded_files(session_id);
+CREATE INDEX IF NOT EXISTS idx_analysis_jobs_claim ON analysis_jobs(status, run_after);
 
 -- ========================================
 -- INSERT DEFAULT DATA
@@ -7,6 +7,7 @@ import pygame
 from PIL import Image
 import tempfile
 import os
+import sys
 from datetime import datetime
 import json
 import plotly.express as px
@@ -121,69 +122,58 @@ def get_color_for_class(class_name):
                 return (0, 255, 255)  # Kuning
             else:
                 return (255, 255, 255)  # Putih default
-from ultralytics import YOLO
+# Shared detection engine from BE/ (same model handle, class map and post-processing as the API)
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'BE'))
+from detection_engine import default_engine
+
 # YOLOv8 Model Detection Function
 def detect_drowsiness(image):
     """
     YOLOv8 drowsiness detection function
-    Replace MODEL_PATH with your actual model path
+    The model is loaded once per process by default_engine() (Config.MODEL_PATH)
+    Returns the detections of the frame, most confident first; an empty list when nothing was found
     """
     try:
-        # ========== GANTI PATH MODEL DI SINI ==========
-        MODEL_PATH = os.path.join("model", "best.pt") # <- GANTI INI DENGAN PATH MODEL ANDA
-        
-        # Load YOLOv8 model (uncomment when you have ultralytics installed)
-        model = YOLO(MODEL_PATH)
-        
-        # Class names sesuai dengan data.yaml Anda
-        CLASS_NAMES = ["Drowsiness", "awake", "yawn"]
-
-        
-        # ========== REAL YOLO INFERENCE (uncomment when ready) ==========
-        results = model(image)
-        
-        if results and len(results) > 0:
-            result = results[0]
-            if result.boxes is not None and len(result.boxes) > 0:
-                # Get the first detection
-                box = result.boxes[0]
-                class_id = int(box.cls)
-                confidence = float(box.conf)
-                bbox = box.xyxy[0].tolist()  # [x1, y1, x2, y2]
-                
-                return {
-                    'class': CLASS_NAMES[class_id],
-                    'confidence': confidence,
-                    'bbox': tuple(map(int, bbox)),
-                    'timestamp': datetime.now()
-                }
-        
-        # ========== MOCK DETECTION (remove when using real model) ==========
-        # Simulasi untuk testing - hapus bagian ini ketika model sudah siap
-        import random
-        detected_class = random.choice(CLASS_NAMES)
-        confidence = random.uniform(0.6, 0.95)
-        
-        height, width = image.shape[:2]
-        x1, y1 = random.randint(0, width//2), random.randint(0, height//2)
-        x2, y2 = x1 + random.randint(100, 200), y1 + random.randint(100, 200)
-        
-        return {
-            'class': detected_class,
-            'confidence': confidence,
-            'bbox': (x1, y1, x2, y2),
-            'timestamp': datetime.now()
-        }
+        detections = sorted(default_engine().detect(image).to_list(),
+                            key=lambda d: d['confidence'], reverse=True)
+        timestamp = datetime.now()
+        return [{
+            'class': detection['class'],
+            'confidence': detection['confidence'],
+            'bbox': tuple(map(int, detection['bbox'])),  # [x1, y1, x2, y2]
+            'timestamp': timestamp
+        } for detection in detections]
         
     except Exception as e:
         st.error(f"Error in detection: {e}")
-        # Return default result if error occurs
-        return {
-            'class': 'awake',
-            'confidence': 0.0,
-            'bbox': (0, 0, 100, 100),
-            'timestamp': datetime.now()
-        }
+        return []
+
+def draw_detections(frame, detections):
+    """Draw every detection box with its class color"""
+    for result in detections:
+        x1, y1, x2, y2 = result['bbox']
+        color = get_color_for_class(result['class'])
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(frame, f"{result['class']}: {result['confidence']:.2f}", 
+                   (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+
+def detection_html(detections):
+    """Detection info box for the most confident detection"""
+    if not detections:
+        return f"""
+    <div class="detection-result">
+        <strong>Detection:</strong> none<br>
+        <strong>Time:</strong> {datetime.now().strftime('%H:%M:%S')}
+    </div>
+    """
+    result = detections[0]
+    return f"""
+    <div class="detection-result">
+        <strong>Detection:</strong> {result['class']}<br>
+        <strong>Confidence:</strong> {result['confidence']:.2f}<br>
+        <strong>Time:</strong> {result['timestamp'].strftime('%H:%M:%S')}
+    </div>
+    """
 
 # Alarm functions
 # def play_alarm_sound(sound_choice):
@@ -347,11 +337,13 @@ def live_camera_detection():
                         break
                     
                     # Process frame
-                    result = detect_drowsiness(frame)
+                    detections = detect_drowsiness(frame)
+                    result = detections[0] if detections else None
                     
-                    # Update session stats
-                    st.session_state.current_session['total_detections'] += 1
-                    if result['class'] == 'Drowsiness':
+                    # Update session stats (frames without a detection are not counted)
+                    if result is not None:
+                        st.session_state.current_session['total_detections'] += 1
+                    if result is not None and result['class'] == 'Drowsiness':
                         st.session_state.current_session['drowsiness_count'] += 1
                         if drowsiness_start_time is None:
                             drowsiness_start_time = time.time()
@@ -360,6 +352,8 @@ def live_camera_detection():
                                 st.session_state.alarm_active = True
                                 play_alarm_sound(st.session_state.alarm_sound)
                                 st.rerun()
+                    elif result is None:
+                        drowsiness_start_time = None
                     else:
                         drowsiness_start_time = None
                         if result['class'] == 'awake':
@@ -367,28 +361,19 @@ def live_camera_detection():
                         elif result['class'] == 'yawn':
                             st.session_state.current_session['yawn_count'] += 1
                     
-                    # Draw bounding box
-                    x1, y1, x2, y2 = result['bbox']
-                    color = get_color_for_class(result['class'])
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-                    cv2.putText(frame, f"{result['class']}: {result['confidence']:.2f}", 
-                            (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+                    # Draw bounding boxes
+                    draw_detections(frame, detections)
 
                     
                     # Display frame
                     camera_placeholder.image(frame, channels="BGR")
                     
                     # Display detection result
-                    detection_placeholder.markdown(f"""
-                    <div class="detection-result">
-                        <strong>Detection:</strong> {result['class']}<br>
-                        <strong>Confidence:</strong> {result['confidence']:.2f}<br>
-                        <strong>Time:</strong> {result['timestamp'].strftime('%H:%M:%S')}
-                    </div>
-                    """, unsafe_allow_html=True)
+                    detection_placeholder.markdown(detection_html(detections), unsafe_allow_html=True)
                     
                     # Add to history
-                    st.session_state.detection_history.append(result)
+                    if result is not None:
+                        st.session_state.detection_history.append(result)
                     
                     time.sleep(0.1)  # Control frame rate
                 
@@ -396,24 +381,15 @@ def live_camera_detection():
 
 def process_frame(frame, placeholder):
     """Process a single frame for detection"""
-    result = detect_drowsiness(frame)
+    detections = detect_drowsiness(frame)
     
-    # Draw bounding box
-    x1, y1, x2, y2 = result['bbox']
-    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-    cv2.putText(frame, f"{result['class']}: {result['confidence']:.2f}", 
-               (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    # Draw bounding boxes
+    draw_detections(frame, detections)
     
     # Display detection result
-    placeholder.markdown(f"""
-    <div class="detection-result">
-        <strong>Detection:</strong> {result['class']}<br>
-        <strong>Confidence:</strong> {result['confidence']:.2f}<br>
-        <strong>Time:</strong> {result['timestamp'].strftime('%H:%M:%S')}
-    </div>
-    """, unsafe_allow_html=True)
+    placeholder.markdown(detection_html(detections), unsafe_allow_html=True)
     
-    return result
+    return detections
 
 # Upload detection
 def upload_detection():
@@ -436,30 +412,20 @@ def upload_detection():
             # Perform detection
             if st.button("Detect"):
                 with st.spinner("Processing..."):
-                    result = detect_drowsiness(cv_image)
+                    detections = detect_drowsiness(cv_image)
                     
-                    # Draw bounding box
-                    x1, y1, x2, y2 = result['bbox']
-                    color = get_color_for_class(result['class'])
-                    cv2.rectangle(cv_image, (x1, y1), (x2, y2), color, 2)
-                    cv2.putText(cv_image, f"{result['class']}: {result['confidence']:.2f}", 
-                            (x1, y1-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+                    # Draw bounding boxes
+                    draw_detections(cv_image, detections)
                                         
                     # Display result
                     result_image = cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB)
                     st.image(result_image, caption="Detection Result", use_column_width=True)
                     
                     # Show detection info
-                    st.markdown(f"""
-                    <div class="detection-result">
-                        <strong>Detection:</strong> {result['class']}<br>
-                        <strong>Confidence:</strong> {result['confidence']:.2f}<br>
-                        <strong>Time:</strong> {result['timestamp'].strftime('%H:%M:%S')}
-                    </div>
-                    """, unsafe_allow_html=True)
+                    st.markdown(detection_html(detections), unsafe_allow_html=True)
                     
                     # Add to results
-                    st.session_state.detection_results.append(result)
+                    st.session_state.detection_results.extend(detections)
     
     elif upload_type == "Video":
         uploaded_file = st.file_uploader("Choose a video...", type=['mp4', 'avi', 'mov'])
@@ -491,8 +457,9 @@ def upload_detection():
                         
                         # Process every 30th frame (for performance)
                         if frame_count % 30 == 0:
-                            result = detect_drowsiness(frame)
-                            frame_results.append(result)
+                            detections = detect_drowsiness(frame)
+                            if detections:
+                                frame_results.append((frame_count, detections[0]))
                         
                         frame_count += 1
                         progress_bar.progress(frame_count / total_frames)
@@ -505,11 +472,11 @@ def upload_detection():
                         
                         # Create DataFrame
                         df = pd.DataFrame([{
-                            'Frame': i * 30,
+                            'Frame': index,
                             'Class': r['class'],
                             'Confidence': r['confidence'],
                             'Timestamp': r['timestamp']
-                        } for i, r in enumerate(frame_results)])
+                        } for index, r in frame_results])
                         
                         st.dataframe(df)
                         
@@ -520,7 +487,7 @@ def upload_detection():
                         st.plotly_chart(fig)
                         
                         # Add to results
-                        st.session_state.detection_results.extend(frame_results)
+                        st.session_state.detection_results.extend(r for _, r in frame_results)
                 
                 # Clean up temp file
                 os.unlink(tmp_file_path)